@@ -49,6 +49,14 @@ osapi_opts = [
     cfg.StrOpt('osapi_glance_link_prefix',
                help='Base URL that will be presented to users in links '
                     'to glance resources'),
+    cfg.BoolOpt('osapi_server_page_tokens',
+                default=False,
+                help='Use an opaque page token holding the sort key values '
+                     'of the last server as the marker of the next link of '
+                     'the server lists, instead of the uuid of the last '
+                     'server. The next page can then be fetched without '
+                     'looking up the marker server. Server uuids are still '
+                     'accepted as markers.'),
 ]
 CONF = cfg.CONF
 CONF.register_opts(osapi_opts)
@@ -458,13 +466,17 @@ class ViewBuilder(object):
                               request,
                               items,
                               collection_name,
-                              id_key="uuid"):
+                              id_key="uuid",
+                              get_marker=None):
         """Retrieve 'next' link, if applicable. This is included if:
         1) 'limit' param is specified and equals the number of items.
         2) 'limit' param is specified but it exceeds CONF.osapi_max_limit,
         in this case the number of items is CONF.osapi_max_limit.
         3) 'limit' param is NOT specified but the number of items is
         CONF.osapi_max_limit.
+
+        The marker of the link is the id of the last item, or what
+        get_marker returns for the last item if given.
         """
         links = []
         max_items = min(
@@ -472,7 +484,9 @@ class ViewBuilder(object):
             CONF.osapi_max_limit)
         if max_items and max_items == len(items):
             last_item = items[-1]
-            if id_key in last_item:
+            if get_marker is not None:
+                last_item_id = get_marker(last_item)
+            elif id_key in last_item:
                 last_item_id = last_item[id_key]
             elif 'id' in last_item:
                 last_item_id = last_item["id"]
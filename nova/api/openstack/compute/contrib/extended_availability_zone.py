@@ -24,9 +24,9 @@ authorize = extensions.soft_extension_authorizer('compute',
 
 
 class ExtendedAZController(wsgi.Controller):
-    def _extend_server(self, context, server, instance):
+    def _extend_server(self, server, instance, zones):
         key = "%s:availability_zone" % Extended_availability_zone.alias
-        az = avail_zone.get_instance_availability_zone(context, instance)
+        az = zones.get(instance.get('host'))
         if not az and instance.get('availability_zone'):
             # Likely hasn't reached a viable compute node yet so give back the
             # desired availability_zone that *may* exist in the instance
@@ -40,16 +40,21 @@ class ExtendedAZController(wsgi.Controller):
         if authorize(context):
             server = resp_obj.obj['server']
             db_instance = req.get_db_instance(server['id'])
-            self._extend_server(context, server, db_instance)
+            zones = avail_zone.get_instances_availability_zones(
+                context, [db_instance])
+            self._extend_server(server, db_instance, zones)
 
     @wsgi.extends
     def detail(self, req, resp_obj):
         context = req.environ['nova.context']
         if authorize(context):
             servers = list(resp_obj.obj['servers'])
-            for server in servers:
-                db_instance = req.get_db_instance(server['id'])
-                self._extend_server(context, server, db_instance)
+            db_instances = [req.get_db_instance(server['id'])
+                            for server in servers]
+            zones = avail_zone.get_instances_availability_zones(
+                context, db_instances)
+            for server, db_instance in zip(servers, db_instances):
+                self._extend_server(server, db_instance, zones)
 
 
 class Extended_availability_zone(extensions.ExtensionDescriptor):
@@ -78,13 +78,14 @@ class AvailabilityZoneController(wsgi.Controller):
             host_services[service['availability_zone'] + service['host']].\
                     append(service)
 
+        up_map = self.servicegroup_api.get_up_map(enabled_services)
         result = []
         for zone in available_zones:
             hosts = {}
             for host in zone_hosts.get(zone, []):
                 hosts[host] = {}
                 for service in host_services[zone + host]:
-                    alive = self.servicegroup_api.service_is_up(service)
+                    alive = up_map[(service['host'], service['binary'])]
                     hosts[host][service['binary']] = {'available': alive,
                                       'active': True != service['disabled'],
                                       'updated_at': service['updated_at']}
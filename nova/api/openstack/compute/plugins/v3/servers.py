@@ -386,9 +386,11 @@ class ServersController(wsgi.Controller):
 
         if is_detail:
             instance_list.fill_faults()
-            response = self._view_builder.detail(req, instance_list)
+            response = self._view_builder.detail(req, instance_list,
+                                                 sort_keys=sort_keys)
         else:
-            response = self._view_builder.index(req, instance_list)
+            response = self._view_builder.index(req, instance_list,
+                                                sort_keys=sort_keys)
         req.cache_db_instances(instance_list)
         return response
 
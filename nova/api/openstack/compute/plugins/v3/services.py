@@ -51,8 +51,7 @@ class ServiceController(wsgi.Controller):
 
         return _services
 
-    def _get_service_detail(self, svc):
-        alive = self.servicegroup_api.service_is_up(svc)
+    def _get_service_detail(self, svc, alive):
         state = (alive and "up") or "down"
         active = 'enabled'
         if svc['disabled']:
@@ -70,7 +69,10 @@ class ServiceController(wsgi.Controller):
 
     def _get_services_list(self, req):
         _services = self._get_services(req)
-        return [self._get_service_detail(svc) for svc in _services]
+        up_map = self.servicegroup_api.get_up_map(_services)
+        return [self._get_service_detail(svc,
+                                         up_map[(svc['host'], svc['binary'])])
+                for svc in _services]
 
     def _enable(self, body, context):
         """Enable scheduling for a service."""
@@ -14,8 +14,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import hashlib
 
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import timeutils
 
@@ -25,10 +27,14 @@ from nova.api.openstack.compute.views import addresses as views_addresses
 from nova.api.openstack.compute.views import flavors as views_flavors
 from nova.api.openstack.compute.views import images as views_images
 from nova.i18n import _LW
+from nova import objects
 from nova.objects import base as obj_base
 from nova import utils
 
 
+CONF = cfg.CONF
+CONF.import_opt('osapi_server_page_tokens', 'nova.api.openstack.common')
+
 LOG = logging.getLogger(__name__)
 
 
@@ -115,17 +121,19 @@ class ViewBuilder(common.ViewBuilder):
 
         return server
 
-    def index(self, request, instances):
+    def index(self, request, instances, sort_keys=None):
         """Show a list of servers without many details."""
         coll_name = self._collection_name
-        return self._list_view(self.basic, request, instances, coll_name)
+        return self._list_view(self.basic, request, instances, coll_name,
+                               sort_keys=sort_keys)
 
-    def detail(self, request, instances):
+    def detail(self, request, instances, sort_keys=None):
         """Detailed view of a list of instance."""
         coll_name = self._collection_name + '/detail'
-        return self._list_view(self.show, request, instances, coll_name)
+        return self._list_view(self.show, request, instances, coll_name,
+                               sort_keys=sort_keys)
 
-    def _list_view(self, func, request, servers, coll_name):
+    def _list_view(self, func, request, servers, coll_name, sort_keys=None):
         """Provide a view for a list of servers.
 
         :param func: Function used to format the server data
@@ -133,12 +141,19 @@ class ViewBuilder(common.ViewBuilder):
         :param servers: List of servers in dictionary format
         :param coll_name: Name of collection, used to generate the next link
                           for a pagination query
+        :param sort_keys: Sort keys the servers were listed with, used to
+                          build the page token of the next link
         :returns: Server data in dictionary format
         """
         server_list = [func(request, server)["server"] for server in servers]
+        get_marker = None
+        if CONF.osapi_server_page_tokens:
+            get_marker = functools.partial(
+                objects.InstanceList.get_page_token, sort_keys=sort_keys)
         servers_links = self._get_collection_links(request,
                                                    servers,
-                                                   coll_name)
+                                                   coll_name,
+                                                   get_marker=get_marker)
         servers_dict = dict(servers=server_list)
 
         if servers_links:
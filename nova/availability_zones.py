@@ -25,6 +25,7 @@ from nova.openstack.common import memorycache
 # NOTE(vish): azs don't change that often, so cache them for an hour to
 #             avoid hitting the db multiple times on every request.
 AZ_CACHE_SECONDS = 60 * 60
+AZ_CACHE_KEY = 'azcache-hosts'
 MC = None
 
 availability_zone_opts = [
@@ -40,6 +41,56 @@ CONF = cfg.CONF
 CONF.register_opts(availability_zone_opts)
 
 
+class AvailabilityZoneIndex(object):
+    """Availability zones of the hosts, built from all the aggregates.
+
+    The map of the hosts to their zone is loaded with one query and kept
+    in the memorycache client for AZ_CACHE_SECONDS, or until the
+    aggregates of a zone change through the compute API. When
+    memcached_servers is set, all the API workers share the map and see
+    the changes made through any of them. Hosts which are in no zone
+    aggregate are in the default availability zone.
+    """
+
+    def _get_zones(self, context):
+        cache = _get_cache()
+        zones = cache.get(AZ_CACHE_KEY)
+        if zones is None:
+            aggregates = objects.AggregateList.get_by_metadata_key(
+                context, 'availability_zone')
+            zones = {host: u','.join(sorted(azs)) for host, azs in
+                     _build_metadata_by_host(aggregates).items()}
+            cache.set(AZ_CACHE_KEY, zones, AZ_CACHE_SECONDS)
+        return zones
+
+    def get_hosts_availability_zones(self, context, hosts):
+        """Return a dict of the availability zone of each host."""
+        if not hosts:
+            return {}
+        zones = self._get_zones(context)
+        return {host: zones.get(host, CONF.default_availability_zone)
+                for host in hosts}
+
+    def set_host_availability_zone(self, host, availability_zone):
+        """Record the new availability zone of a host."""
+        cache = _get_cache()
+        zones = cache.get(AZ_CACHE_KEY)
+        if zones is None:
+            return
+        zones = dict(zones)
+        if availability_zone == CONF.default_availability_zone:
+            zones.pop(host, None)
+        else:
+            zones[host] = availability_zone
+        cache.set(AZ_CACHE_KEY, zones, AZ_CACHE_SECONDS)
+
+    def reset(self):
+        _get_cache().delete(AZ_CACHE_KEY)
+
+
+INDEX = AvailabilityZoneIndex()
+
+
 def _get_cache():
     global MC
 
@@ -56,13 +107,10 @@ def reset_cache():
 
     global MC
 
+    INDEX.reset()
     MC = None
 
 
-def _make_cache_key(host):
-    return "azcache-%s" % host.encode('utf-8')
-
-
 def _build_metadata_by_host(aggregates, hosts=None):
     if hosts and not isinstance(hosts, set):
         hosts = set(hosts)
@@ -78,21 +126,13 @@ def _build_metadata_by_host(aggregates, hosts=None):
 def set_availability_zones(context, services):
     # Makes sure services isn't a sqlalchemy object
     services = [dict(service) for service in services]
-    hosts = set([service['host'] for service in services])
-    aggregates = objects.AggregateList.get_by_metadata_key(context,
-            'availability_zone', hosts=hosts)
-    metadata = _build_metadata_by_host(aggregates, hosts=hosts)
-    # gather all of the availability zones associated with a service host
+    hosts = set([service['host'] for service in services
+                 if service['topic'] == "compute"])
+    zones = INDEX.get_hosts_availability_zones(context, hosts)
     for service in services:
         az = CONF.internal_service_availability_zone
         if service['topic'] == "compute":
-            if metadata.get(service['host']):
-                az = u','.join(list(metadata[service['host']]))
-            else:
-                az = CONF.default_availability_zone
-                # update the cache
-                update_host_availability_zone_cache(context,
-                                                    service['host'], az)
+            az = zones[service['host']]
         service['availability_zone'] = az
     return services
 
@@ -110,10 +150,7 @@ def get_host_availability_zone(context, host):
 def update_host_availability_zone_cache(context, host, availability_zone=None):
     if not availability_zone:
         availability_zone = get_host_availability_zone(context, host)
-    cache = _get_cache()
-    cache_key = _make_cache_key(host)
-    cache.delete(cache_key)
-    cache.set(cache_key, availability_zone, AZ_CACHE_SECONDS)
+    INDEX.set_host_availability_zone(host, availability_zone)
 
 
 def get_availability_zones(context, get_only_available=False,
@@ -170,12 +207,17 @@ def get_instance_availability_zone(context, instance):
     host = str(instance.get('host'))
     if not host:
         return None
+    return INDEX.get_hosts_availability_zones(context.elevated(),
+                                              [host])[host]
 
-    cache_key = _make_cache_key(host)
-    cache = _get_cache()
-    az = cache.get(cache_key)
-    if not az:
-        elevated = context.elevated()
-        az = get_host_availability_zone(elevated, host)
-        cache.set(cache_key, az, AZ_CACHE_SECONDS)
-    return az
+
+def get_instances_availability_zones(context, instances):
+    """Return a dict of the availability zones of the hosts of instances.
+
+    The zones of all the hosts are looked up at once. The instances which
+    are not on a host have no entry in the dict.
+    """
+    hosts = set(instance.get('host') for instance in instances)
+    hosts.discard(None)
+    hosts.discard('')
+    return INDEX.get_hosts_availability_zones(context.elevated(), hosts)
@@ -65,6 +65,7 @@ from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_serialization import jsonutils
 from oslo_utils import importutils
 import six
 
@@ -80,6 +81,7 @@ from nova import objects
 from nova.openstack.common import cliutils
 from nova import quota
 from nova import rpc
+from nova.scheduler import rpcapi as scheduler_rpcapi
 from nova import servicegroup
 from nova import utils
 from nova import version
@@ -274,6 +276,7 @@ class ProjectCommands(object):
                 except exception.QuotaExists:
                     db.quota_update(ctxt, project_id, key, value,
                                     user_id=user_id)
+                quota.LIMIT_CACHE.invalidate(project_id=project_id)
             else:
                 print(_('%(key)s is not a valid quota key. Valid options are: '
                         '%(options)s.') % {'key': key,
@@ -898,6 +901,43 @@ class HostCommands(object):
             print("%-25s\t%-15s" % (h['host'], h['availability_zone']))
 
 
+class SchedulerCommands(object):
+    """Show scheduler statistics."""
+
+    @args('--host', metavar='<host>', help='Scheduler host')
+    @args('--reset', action='store_true', dest='reset', default=False,
+          help='Reset the statistics once shown')
+    def stats(self, host=None, reset=False):
+        """Show the time spent in each scheduler filter, weigher and host
+        manager step, for each scheduler or for the given host.
+        """
+        ctxt = context.get_admin_context()
+        if host:
+            hosts = [host]
+        else:
+            hosts = [service.host for service in
+                     objects.ServiceList.get_by_binary(ctxt,
+                                                       'nova-scheduler')]
+        rpcapi = scheduler_rpcapi.SchedulerAPI()
+        print_format = "%-48s %-8s %-10s %-10s %-10s %-10s"
+        for host in hosts:
+            stats = rpcapi.get_stats(ctxt, host, reset=reset)
+            print(_("Scheduler %s:") % host)
+            print(print_format % (_('Name'),
+                                  _('Count'),
+                                  _('Avg (ms)'),
+                                  _('Max (ms)'),
+                                  _('Hosts in'),
+                                  _('Hosts out')))
+            for name in sorted(stats):
+                stat = stats[name]
+                avg = stat['total'] / stat['count'] if stat['count'] else 0
+                print(print_format % (name, stat['count'],
+                                      '%.3f' % (avg * 1000),
+                                      '%.3f' % (stat['max'] * 1000),
+                                      stat['hosts_in'], stat['hosts_out']))
+
+
 class DbCommands(object):
     """Class for managing the main database."""
 
@@ -940,7 +980,21 @@ class DbCommands(object):
 
     @args('--max_rows', metavar='<number>',
             help='Maximum number of deleted rows to archive')
-    def archive_deleted_rows(self, max_rows):
+    @args('--rows_per_second', metavar='<number>',
+            help='Maximum number of rows archived per second, to run in the '
+                 'background without loading the database')
+    @args('--until_complete', action='store_true', dest='until_complete',
+          default=False,
+          help='Archive max_rows rows at a time until all the deleted rows '
+               'are archived')
+    @args('--cursor_file', metavar='<path>',
+            help='File recording where archiving stopped, so that an '
+                 'interrupted run resumes from there')
+    @args('--verbose', action='store_true', dest='verbose', default=False,
+          help='Print the number of rows archived from each table')
+    def archive_deleted_rows(self, max_rows, rows_per_second=None,
+                             until_complete=False, cursor_file=None,
+                             verbose=False):
         """Move up to max_rows deleted rows from production tables to shadow
         tables.
         """
@@ -949,8 +1003,36 @@ class DbCommands(object):
             if max_rows < 0:
                 print(_("Must supply a positive value for max_rows"))
                 return(1)
+        if rows_per_second is not None:
+            rows_per_second = float(rows_per_second)
+            if rows_per_second <= 0:
+                print(_("Must supply a positive value for rows_per_second"))
+                return(1)
+        cursor = {}
+        if cursor_file is not None and os.path.exists(cursor_file):
+            with open(cursor_file) as f:
+                cursor = jsonutils.load(f)
         admin_context = context.get_admin_context()
-        db.archive_deleted_rows(admin_context, max_rows)
+        table_to_rows_archived = {}
+        while True:
+            archived = db.archive_deleted_rows(
+                admin_context, max_rows, cursor=cursor,
+                rows_per_second=rows_per_second)
+            if cursor_file is not None:
+                with open(cursor_file, 'w') as f:
+                    jsonutils.dump(cursor, f)
+            for tablename, rows in six.iteritems(archived):
+                table_to_rows_archived[tablename] = (
+                    table_to_rows_archived.get(tablename, 0) + rows)
+                if verbose:
+                    print(_("%(rows)d rows archived from table %(table)s, "
+                            "%(total)d so far") %
+                          {'rows': rows, 'table': tablename,
+                           'total': table_to_rows_archived[tablename]})
+            if not until_complete or not archived:
+                break
+        if verbose and not table_to_rows_archived:
+            print(_("Nothing was archived."))
 
     @args('--delete', action='store_true', dest='delete',
           help='If specified, automatically delete any records found where '
@@ -1317,6 +1399,7 @@ CATEGORIES = {
     'logs': GetLogCommands,
     'network': NetworkCommands,
     'project': ProjectCommands,
+    'scheduler': SchedulerCommands,
     'service': ServiceCommands,
     'shell': ShellCommands,
     'vm': VmCommands,
@@ -148,6 +148,13 @@ interval_opts = [
                default=60,
                help="Number of seconds between instance network information "
                     "cache updates"),
+    cfg.IntOpt("heal_instance_info_cache_batch_size",
+               default=1,
+               help="Number of instances whose network information cache is "
+                    "updated at each heal_instance_info_cache_interval. "
+                    "With neutron, the ports, networks, subnets and floating "
+                    "IPs of the instances of a batch are fetched with one "
+                    "request each."),
     cfg.IntOpt('reclaim_instance_interval',
                default=0,
                help='Interval in seconds for reclaiming deleted instances'),
@@ -5304,13 +5311,17 @@ class ComputeManager(manager.Manager):
         list, pull the DB record, and try the call to the network API.
         If anything errors don't fail, as it's possible the instance
         has been deleted, etc.
+
+        With heal_instance_info_cache_batch_size set, as many instances are
+        popped off the list and refreshed with one network API call.
         """
         heal_interval = CONF.heal_instance_info_cache_interval
         if not heal_interval:
             return
 
+        batch_size = max(CONF.heal_instance_info_cache_batch_size, 1)
         instance_uuids = getattr(self, '_instance_uuids_to_heal', [])
-        instance = None
+        instances = []
 
         LOG.debug('Starting heal instance info cache')
 
@@ -5333,17 +5344,17 @@ class ComputeManager(manager.Manager):
                               'because it is being deleted.', instance=inst)
                     continue
 
-                if not instance:
-                    # Save the first one we find so we don't
-                    # have to get it again
-                    instance = inst
+                if len(instances) < batch_size:
+                    # Save the first ones we find so we don't
+                    # have to get them again
+                    instances.append(inst)
                 else:
                     instance_uuids.append(inst['uuid'])
 
             self._instance_uuids_to_heal = instance_uuids
         else:
-            # Find the next valid instance on the list
-            while instance_uuids:
+            # Find the next valid instances on the list
+            while instance_uuids and len(instances) < batch_size:
                 try:
                     inst = objects.Instance.get_by_uuid(
                             context, instance_uuids.pop(0),
@@ -5363,9 +5374,21 @@ class ComputeManager(manager.Manager):
                     LOG.debug('Skipping network cache update for instance '
                               'because it is being deleted.', instance=inst)
                 else:
-                    instance = inst
-                    break
+                    instances.append(inst)
+
+        if batch_size > 1 and instances:
+            try:
+                nw_infos = self.network_api.get_instances_nw_info(context,
+                                                                  instances)
+                LOG.debug('Updated the network info_cache for %d instances',
+                          len(nw_infos))
+            except Exception:
+                LOG.error(_LE('An error occurred while refreshing the network '
+                              'cache of %d instances.'), len(instances),
+                          exc_info=True)
+            return
 
+        instance = instances[0] if instances else None
         if instance:
             # We have an instance now to refresh
             try:
@@ -5737,11 +5760,22 @@ class ComputeManager(manager.Manager):
         number of virtual machines known by the database, we proceed in a lazy
         loop, one database record at a time, checking if the hypervisor has the
         same power state as is in the database.
+
+        If the driver can report the power states of all its instances at
+        once, only the instances whose records do not match them are synced.
         """
         db_instances = objects.InstanceList.get_by_host(context, self.host,
                                                         expected_attrs=[],
                                                         use_slave=True)
 
+        try:
+            vm_power_states = self.driver.get_power_states()
+        except NotImplementedError:
+            vm_power_states = None
+
+        # NOTE: The power states may include VMs which do not belong to this
+        # host, for instance the stopped VMs of a XenServer pool, so they are
+        # not counted from them.
         num_vm_instances = self.driver.get_num_instances()
         num_db_instances = len(db_instances)
 
@@ -5771,6 +5805,11 @@ class ComputeManager(manager.Manager):
             self._syncs_in_progress.pop(db_instance.uuid)
 
         for db_instance in db_instances:
+            if vm_power_states is not None:
+                vm_power_state = vm_power_states.get(db_instance.uuid,
+                                                     power_state.NOSTATE)
+                if self._power_state_in_sync(db_instance, vm_power_state):
+                    continue
             # process syncs asynchronously - don't want instance locking to
             # block entire periodic task thread
             uuid = db_instance.uuid
@@ -5781,6 +5820,36 @@ class ComputeManager(manager.Manager):
                 self._syncs_in_progress[uuid] = True
                 self._sync_power_pool.spawn_n(_sync, db_instance)
 
+    @staticmethod
+    def _power_state_in_sync(db_instance, vm_power_state):
+        """Check whether syncing an instance to the given power state would
+        leave it untouched.
+
+        Instances with a pending task are skipped by the sync, as are the
+        ones whose power state matches and which _sync_instance_power_state
+        would neither stop nor log about.
+        """
+        if db_instance.task_state is not None:
+            return True
+        if db_instance.power_state != vm_power_state:
+            return False
+
+        vm_state = db_instance.vm_state
+        if vm_state == vm_states.ACTIVE:
+            return vm_power_state == power_state.RUNNING
+        elif vm_state == vm_states.STOPPED:
+            return vm_power_state in (power_state.NOSTATE,
+                                      power_state.SHUTDOWN,
+                                      power_state.CRASHED)
+        elif vm_state == vm_states.PAUSED:
+            return vm_power_state not in (power_state.SHUTDOWN,
+                                          power_state.CRASHED)
+        elif vm_state in (vm_states.SOFT_DELETED,
+                          vm_states.DELETED):
+            return vm_power_state in (power_state.NOSTATE,
+                                      power_state.SHUTDOWN)
+        return True
+
     def _query_driver_power_state_and_sync(self, context, db_instance):
         if db_instance.task_state is not None:
             LOG.info(_LI("During sync_power_state the instance has a "
@@ -24,6 +24,7 @@ from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import importutils
+from oslo_utils import timeutils
 
 from nova.compute import claims
 from nova.compute import monitors
@@ -52,6 +53,16 @@ resource_tracker_opts = [
     cfg.ListOpt('compute_resources',
                 default=['vcpu'],
                 help='The names of the extra resources to track.'),
+    cfg.IntOpt('resource_audit_interval',
+               default=0,
+               help='Interval in seconds between two full audits of the '
+                    'resource usage of a node, which recompute it from the '
+                    'hypervisor, instance and migration records. In '
+                    'between, the usage is only updated by the claims, '
+                    'migrations and deletes, the periodic task refreshing '
+                    'the metrics, and each audit logs the drift it '
+                    'corrects. Leaving this at the default of 0 will audit '
+                    'the usage at every update_resources_interval.'),
 ]
 
 CONF = cfg.CONF
@@ -82,8 +93,9 @@ class ResourceTracker(object):
         self.monitors = monitor_handler.monitors
         self.ext_resources_handler = \
             ext_resources.ResourceHandler(CONF.compute_resources)
-        self.old_resources = objects.ComputeNode()
+        self.old_resources = {}
         self.scheduler_client = scheduler_client.SchedulerClient()
+        self.last_audit = None
 
     @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
     def instance_claim(self, context, instance_ref, limits=None):
@@ -313,6 +325,9 @@ class ResourceTracker(object):
             # no service record, disable resource
             return
 
+        # the values last reported belong to the previous compute node
+        self.old_resources = {}
+
         # now try to get the compute node record from the
         # database. If we get one we use resources to initialize
         self.compute_node = self._get_compute_node(context)
@@ -375,7 +390,14 @@ class ResourceTracker(object):
         Add in resource claims in progress to account for operations that have
         declared a need for resources, but not necessarily retrieved them from
         the hypervisor layer yet.
+
+        When resource_audit_interval is set, this only refreshes the metrics
+        of the node until the next audit is due.
         """
+        if not self._audit_due():
+            self._update_metrics(context)
+            return
+
         LOG.info(_LI("Auditing locally available compute resources for "
                      "node %(node)s"),
                  {'node': self.nodename})
@@ -407,9 +429,49 @@ class ResourceTracker(object):
 
         self._update_available_resource(context, resources)
 
+    def _audit_due(self):
+        """Check whether the usage of the node must be recomputed."""
+        if (CONF.resource_audit_interval <= 0 or self.disabled or
+                self.last_audit is None):
+            return True
+        return timeutils.is_older_than(self.last_audit,
+                                       CONF.resource_audit_interval)
+
+    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    def _update_metrics(self, context):
+        """Refresh the metrics of the node between two audits."""
+        if self.disabled:
+            return
+        metrics = self._get_host_metrics(context, self.nodename)
+        self.compute_node.metrics = jsonutils.dumps(metrics)
+        self._update(context)
+
+    def _get_tracked_usage(self):
+        """Return the usage tracked since the last audit."""
+        return {'memory_mb_used': self.compute_node.memory_mb_used,
+                'local_gb_used': self.compute_node.local_gb_used,
+                'running_vms': self.compute_node.running_vms,
+                'instances': set(self.tracked_instances),
+                'migrations': set(self.tracked_migrations)}
+
+    def _report_usage_drift(self, tracked):
+        """Log the usage the audit corrected since the last one."""
+        audited = self._get_tracked_usage()
+        drift = dict((key, {'tracked': tracked[key],
+                            'audited': audited[key]})
+                     for key in audited if tracked[key] != audited[key])
+        if drift:
+            LOG.warning(_LW("Resource usage of node %(node)s drifted since "
+                            "the last audit: %(drift)s"),
+                        {'node': self.nodename, 'drift': drift})
+
     @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
     def _update_available_resource(self, context, resources):
 
+        tracked = None
+        if CONF.resource_audit_interval > 0 and not self.disabled:
+            tracked = self._get_tracked_usage()
+
         # initialise the compute node object, creating it
         # if it does not already exist.
         self._init_compute_node(context, resources)
@@ -462,6 +524,9 @@ class ResourceTracker(object):
         orphans = self._find_orphaned_instances()
         self._update_usage_from_orphans(orphans)
 
+        if tracked is not None:
+            self._report_usage_drift(tracked)
+
         # NOTE(yjiang5): Because pci device tracker status is not cleared in
         # this periodic task, and also because the resource tracker is not
         # notified when instances are deleted, we need remove all usages
@@ -482,6 +547,7 @@ class ResourceTracker(object):
 
         # update the compute_node
         self._update(context)
+        self.last_audit = timeutils.utcnow()
         LOG.info(_LI('Compute_service record updated for %(host)s:%(node)s'),
                      {'host': self.host, 'node': self.nodename})
 
@@ -581,20 +647,43 @@ class ResourceTracker(object):
                   'used_vcpus': ucpu,
                   'pci_stats': pci_stats})
 
+    def _get_reported_value(self, field):
+        """Return the value of a compute node field as it is reported."""
+        value = getattr(self.compute_node, field)
+        if isinstance(value, list):
+            return [obj_base.obj_to_primitive(item) for item in value]
+        value = obj_base.obj_to_primitive(value)
+        if isinstance(value, dict):
+            return dict(value)
+        return value
+
     def _resource_change(self):
-        """Check to see if any resources have changed."""
-        if not obj_base.obj_equal_prims(self.compute_node, self.old_resources):
-            self.old_resources = copy.deepcopy(self.compute_node)
-            return True
-        return False
+        """Check to see if any resources have changed.
+
+        Only the fields set since the last update are compared with the values
+        last reported, and those set to the same value are reset so that the
+        compute node only saves the changed ones.
+        """
+        unchanged = []
+        for field in self.compute_node.obj_what_changed():
+            if (field in self.old_resources and
+                    self.old_resources[field] ==
+                    self._get_reported_value(field)):
+                unchanged.append(field)
+        if unchanged:
+            self.compute_node.obj_reset_changes(unchanged, recursive=True)
+        return bool(self.compute_node.obj_what_changed())
 
     def _update(self, context):
         """Update partial stats locally and populate them to Scheduler."""
         self._write_ext_resources(self.compute_node)
         if not self._resource_change():
             return
+        changed = dict((field, self._get_reported_value(field))
+                       for field in self.compute_node.obj_what_changed())
         # Persist the stats to the Scheduler
         self.scheduler_client.update_resource_stats(self.compute_node)
+        self.old_resources.update(changed)
         if self.pci_tracker:
             self.pci_tracker.save(context)
 
@@ -467,6 +467,9 @@ class ConductorManager(manager.Manager):
             if not objinst.obj_attr_is_set(name):
                 # Avoid demand-loading anything
                 continue
+            if objinst.obj_attr_is_lazy(name):
+                # Never deserialized, so neither read nor changed
+                continue
             if (not oldobj.obj_attr_is_set(name) or
                     getattr(oldobj, name) != getattr(objinst, name)):
                 updates[name] = field.to_primitive(objinst, name,
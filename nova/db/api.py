@@ -125,6 +125,17 @@ def service_get_all_by_binary(context, binary):
     return IMPL.service_get_all_by_binary(context, binary)
 
 
+def service_get_all_by_binary_changed_since(context, binary, changed_since):
+    """Get services for a given binary created, updated or deleted since a
+    given time.
+
+    Unlike service_get_all_by_binary(), disabled and deleted services are
+    returned so that callers can notice them going away.
+    """
+    return IMPL.service_get_all_by_binary_changed_since(context, binary,
+                                                        changed_since)
+
+
 def service_get_all_by_host(context, host):
     """Get all services for a given host."""
     return IMPL.service_get_all_by_host(context, host)
@@ -153,6 +164,14 @@ def service_update(context, service_id, values):
     return IMPL.service_update(context, service_id, values)
 
 
+def service_heartbeat(context, service_ids):
+    """Record a heartbeat of each of the given services in one update.
+
+    Returns the number of services updated.
+    """
+    return IMPL.service_heartbeat(context, service_ids)
+
+
 ###################
 
 
@@ -209,6 +228,19 @@ def compute_node_get_all(context):
     return IMPL.compute_node_get_all(context)
 
 
+def compute_node_get_all_changed_since(context, changed_since):
+    """Get all computeNodes created, updated or deleted since a given time.
+
+    :param context: The security context
+    :param changed_since: Only return the compute nodes whose created_at,
+                          updated_at or deleted_at is at or after this time
+
+    :returns: List of dictionaries each containing compute node properties,
+              including the deleted ones
+    """
+    return IMPL.compute_node_get_all_changed_since(context, changed_since)
+
+
 def compute_node_get_all_by_host(context, host, use_slave=False):
     """Get compute nodes by host name
 
@@ -657,7 +689,8 @@ def instance_get_all(context, columns_to_join=None):
 
 def instance_get_all_by_filters(context, filters, sort_key='created_at',
                                 sort_dir='desc', limit=None, marker=None,
-                                columns_to_join=None, use_slave=False):
+                                columns_to_join=None, use_slave=False,
+                                columns=None):
     """Get all instances that match all filters."""
     # Note: This function exists for backwards compatibility since calls to
     # the instance layer coming in over RPC may specify the single sort
@@ -667,21 +700,41 @@ def instance_get_all_by_filters(context, filters, sort_key='created_at',
                                             sort_dir, limit=limit,
                                             marker=marker,
                                             columns_to_join=columns_to_join,
-                                            use_slave=use_slave)
+                                            use_slave=use_slave,
+                                            columns=columns)
 
 
 def instance_get_all_by_filters_sort(context, filters, limit=None,
                                      marker=None, columns_to_join=None,
                                      use_slave=False, sort_keys=None,
-                                     sort_dirs=None):
+                                     sort_dirs=None, columns=None):
     """Get all instances that match all filters sorted by multiple keys.
 
-    sort_keys and sort_dirs must be a list of strings.
+    sort_keys and sort_dirs must be a list of strings. The marker is either
+    the uuid of an instance or a page token from instance_page_token().
+    If columns is given, only those columns of the instances, their id and
+    their uuid are loaded.
     """
     return IMPL.instance_get_all_by_filters_sort(
         context, filters, limit=limit, marker=marker,
         columns_to_join=columns_to_join, use_slave=use_slave,
-        sort_keys=sort_keys, sort_dirs=sort_dirs)
+        sort_keys=sort_keys, sort_dirs=sort_dirs, columns=columns)
+
+
+def is_instance_page_token(marker):
+    """Return True if a marker is a page token from instance_page_token()."""
+    return IMPL.is_instance_page_token(marker)
+
+
+def instance_page_token(instance, sort_keys=None):
+    """Return an opaque page token to use as the marker of the page of
+    instances following the given instance.
+
+    The token holds the values of the sort keys of the instance, so that the
+    next page can be queried without looking up the marker instance. It is
+    only valid for the same sort keys.
+    """
+    return IMPL.instance_page_token(instance, sort_keys)
 
 
 def instance_get_active_by_window_joined(context, begin, end=None,
@@ -700,18 +753,29 @@ def instance_get_active_by_window_joined(context, begin, end=None,
 
 
 def instance_get_all_by_host(context, host,
-                             columns_to_join=None, use_slave=False):
-    """Get all instances belonging to a host."""
+                             columns_to_join=None, use_slave=False,
+                             columns=None):
+    """Get all instances belonging to a host.
+
+    If columns is given, only those columns of the instances, their id and
+    their uuid are loaded.
+    """
     return IMPL.instance_get_all_by_host(context, host,
                                          columns_to_join,
-                                         use_slave=use_slave)
+                                         use_slave=use_slave,
+                                         columns=columns)
 
 
 def instance_get_all_by_host_and_node(context, host, node,
-                                      columns_to_join=None):
-    """Get all instances belonging to a node."""
+                                      columns_to_join=None, columns=None):
+    """Get all instances belonging to a node.
+
+    If columns is given, only those columns of the instances, their id and
+    their uuid are loaded.
+    """
     return IMPL.instance_get_all_by_host_and_node(
-        context, host, node, columns_to_join=columns_to_join)
+        context, host, node, columns_to_join=columns_to_join,
+        columns=columns)
 
 
 def instance_get_all_by_host_and_not_type(context, host, type_id=None):
@@ -1105,6 +1169,25 @@ def quota_reserve(context, resources, quotas, user_quotas, deltas, expire,
                               project_id=project_id, user_id=user_id)
 
 
+def quota_reserve_counters(context, resources, quotas, user_quotas, deltas,
+                           expire, project_id=None, user_id=None):
+    """Check quotas and create appropriate reservations, with conditional
+    updates of the usage counters instead of locking all of them.
+
+    The project limits are checked against the per-project totals, which
+    are updated the same way after the usages of the user.
+    """
+    return IMPL.quota_reserve_counters(context, resources, quotas,
+                                       user_quotas, deltas, expire,
+                                       project_id=project_id,
+                                       user_id=user_id)
+
+
+def quota_usage_reconcile(context, resources):
+    """Recount the quota usages of all the projects and users."""
+    return IMPL.quota_usage_reconcile(context, resources)
+
+
 def reservation_commit(context, reservations, project_id=None, user_id=None):
     """Commit quota reservations."""
     return IMPL.reservation_commit(context, reservations,
@@ -1119,6 +1202,15 @@ def reservation_rollback(context, reservations, project_id=None, user_id=None):
                                      user_id=user_id)
 
 
+def reservation_finalize(context, commit_reservations, rollback_reservations,
+                         project_id=None, user_id=None):
+    """Commit and roll back quota reservations in a single transaction."""
+    return IMPL.reservation_finalize(context, commit_reservations,
+                                     rollback_reservations,
+                                     project_id=project_id,
+                                     user_id=user_id)
+
+
 def quota_destroy_all_by_project_and_user(context, project_id, user_id):
     """Destroy all quotas associated with a given project and user."""
     return IMPL.quota_destroy_all_by_project_and_user(context,
@@ -1888,13 +1980,19 @@ def task_log_get(context, task_name, period_beginning,
 ####################
 
 
-def archive_deleted_rows(context, max_rows=None):
+def archive_deleted_rows(context, max_rows=None, cursor=None,
+                         rows_per_second=None):
     """Move up to max_rows rows from production tables to corresponding shadow
     tables.
 
-    :returns: number of rows archived.
+    :param cursor: dict updated with where archiving stopped, to resume from
+                   there on the next call.
+    :param rows_per_second: maximum rate of archiving, unlimited if None.
+    :returns: dict of the number of rows archived keyed by table name.
     """
-    return IMPL.archive_deleted_rows(context, max_rows=max_rows)
+    return IMPL.archive_deleted_rows(context, max_rows=max_rows,
+                                     cursor=cursor,
+                                     rows_per_second=rows_per_second)
 
 
 def archive_deleted_rows_for_table(context, tablename, max_rows=None):
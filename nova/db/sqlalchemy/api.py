@@ -17,12 +17,15 @@
 
 """Implementation of SQLAlchemy backend."""
 
+import base64
+import binascii
 import collections
 import copy
 import datetime
 import functools
 import sys
 import threading
+import time
 import uuid
 
 from oslo_config import cfg
@@ -32,12 +35,14 @@ from oslo_db import options as oslo_db_options
 from oslo_db.sqlalchemy import session as db_session
 from oslo_db.sqlalchemy import utils as sqlalchemyutils
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
 from six.moves import range
 from sqlalchemy import and_
+from sqlalchemy import DateTime
 from sqlalchemy.exc import NoSuchTableError
 from sqlalchemy import MetaData
 from sqlalchemy import or_
@@ -45,6 +50,7 @@ from sqlalchemy.orm import aliased
 from sqlalchemy.orm import contains_eager
 from sqlalchemy.orm import joinedload
 from sqlalchemy.orm import joinedload_all
+from sqlalchemy.orm import load_only
 from sqlalchemy.orm import noload
 from sqlalchemy.orm import undefer
 from sqlalchemy.schema import Table
@@ -71,6 +77,10 @@ db_opts = [
                help='When set, compute API will consider duplicate hostnames '
                     'invalid within the specified scope, regardless of case. '
                     'Should be empty, "project" or "global".'),
+    cfg.IntOpt('archive_deleted_rows_batch_size',
+               default=1000,
+               help='Number of deleted rows moved to the shadow tables in '
+                    'each transaction when archiving deleted rows.'),
 ]
 
 api_db_opts = [
@@ -484,6 +494,16 @@ def service_get_all_by_binary(context, binary):
                 all()
 
 
+def service_get_all_by_binary_changed_since(context, binary, changed_since):
+    changed_since = timeutils.normalize_time(changed_since)
+    return model_query(context, models.Service, read_deleted="yes").\
+                filter_by(binary=binary).\
+                filter(or_(models.Service.created_at >= changed_since,
+                           models.Service.updated_at >= changed_since,
+                           models.Service.deleted_at >= changed_since)).\
+                all()
+
+
 def service_get_by_host_and_binary(context, host, binary):
     result = model_query(context, models.Service, read_deleted="no").\
                     filter_by(host=host).\
@@ -547,6 +567,21 @@ def service_update(context, service_id, values):
     return service_ref
 
 
+def service_heartbeat(context, service_ids):
+    if not service_ids:
+        return 0
+    now = timeutils.utcnow()
+    session = get_session()
+    with session.begin():
+        return model_query(context, models.Service, session=session,
+                           read_deleted="no").\
+                    filter(models.Service.id.in_(service_ids)).\
+                    update({'report_count': models.Service.report_count + 1,
+                            'last_seen_up': now,
+                            'updated_at': now},
+                           synchronize_session=False)
+
+
 ###################
 
 def compute_node_get(context, compute_id):
@@ -602,6 +637,15 @@ def compute_node_get_all(context):
     return model_query(context, models.ComputeNode, read_deleted='no').all()
 
 
+def compute_node_get_all_changed_since(context, changed_since):
+    changed_since = timeutils.normalize_time(changed_since)
+    return model_query(context, models.ComputeNode, read_deleted='yes').\
+        filter(or_(models.ComputeNode.created_at >= changed_since,
+                   models.ComputeNode.updated_at >= changed_since,
+                   models.ComputeNode.deleted_at >= changed_since)).\
+        all()
+
+
 def compute_node_search_by_hypervisor(context, hypervisor_match):
     field = models.ComputeNode.hypervisor_hostname
     return model_query(context, models.ComputeNode).\
@@ -1779,7 +1823,8 @@ def _build_instance_get(context, session=None,
 
 
 def _instances_fill_metadata(context, instances,
-                             manual_joins=None, use_slave=False):
+                             manual_joins=None, use_slave=False,
+                             keys=None):
     """Selectively fill instances with manually-joined metadata. Note that
     instance will be converted to a dict.
 
@@ -1788,6 +1833,9 @@ def _instances_fill_metadata(context, instances,
     :param manual_joins: list of tables to manually join (can be any
                          combination of 'metadata' and 'system_metadata' or
                          None to take the default of both)
+    :param keys: list of the keys to copy from the instances to the dicts, or
+                 None to copy all of them. Must be given for instances loaded
+                 with only some of their columns, see _instance_load_only().
     """
     uuids = [inst['uuid'] for inst in instances]
 
@@ -1813,7 +1861,10 @@ def _instances_fill_metadata(context, instances,
 
     filled_instances = []
     for inst in instances:
-        inst = dict(inst)
+        if keys is None:
+            inst = dict(inst)
+        else:
+            inst = {key: inst[key] for key in keys}
         inst['system_metadata'] = sys_meta[inst['uuid']]
         inst['metadata'] = meta[inst['uuid']]
         if 'pci_devices' in manual_joins:
@@ -1823,6 +1874,21 @@ def _instances_fill_metadata(context, instances,
     return filled_instances
 
 
+def _instance_load_only(query, columns, joins):
+    """Only load some columns of the instances of a query.
+
+    The id and uuid columns are always loaded. Returns the query and the keys
+    to pass to _instances_fill_metadata(), or the query and None if columns
+    is None.
+    """
+    if columns is None:
+        return query, None
+    columns = set(columns) | set(['id', 'uuid'])
+    query = query.options(load_only(*columns))
+    keys = columns | set(join.split('.')[0] for join in joins)
+    return query, list(keys)
+
+
 def _manual_join_columns(columns_to_join):
     """Separate manually joined columns from columns_to_join
 
@@ -1870,7 +1936,7 @@ def instance_get_all(context, columns_to_join=None):
 @require_context
 def instance_get_all_by_filters(context, filters, sort_key, sort_dir,
                                 limit=None, marker=None, columns_to_join=None,
-                                use_slave=False):
+                                use_slave=False, columns=None):
     """Return instances matching all filters sorted by the primary key.
 
     See instance_get_all_by_filters_sort for more information.
@@ -1882,13 +1948,15 @@ def instance_get_all_by_filters(context, filters, sort_key, sort_dir,
                                             columns_to_join=columns_to_join,
                                             use_slave=use_slave,
                                             sort_keys=[sort_key],
-                                            sort_dirs=[sort_dir])
+                                            sort_dirs=[sort_dir],
+                                            columns=columns)
 
 
 @require_context
 def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
                                      columns_to_join=None, use_slave=False,
-                                     sort_keys=None, sort_dirs=None):
+                                     sort_keys=None, sort_dirs=None,
+                                     columns=None):
     """Return instances that match all filters sorted the the given keys.
     Deleted instances will be returned by default, unless there's a filter that
     says otherwise.
@@ -1967,6 +2035,8 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
             query_prefix = query_prefix.options(undefer(column))
         else:
             query_prefix = query_prefix.options(joinedload(column))
+    query_prefix, keys = _instance_load_only(query_prefix, columns,
+                                             columns_to_join_new)
 
     # Note: order_by is done in the sqlalchemy.utils.py paginate_query(),
     # no need to do it here as well
@@ -2056,7 +2126,11 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
     query_prefix = _tag_instance_filter(context, query_prefix, filters)
 
     # paginate query
-    if marker is not None:
+    if is_instance_page_token(marker):
+        # NOTE: A page token holds the sort key values of the last instance
+        # of the previous page, so there is no marker row to look up
+        marker = _instance_page_token_marker(marker, sort_keys)
+    elif marker is not None:
         try:
             if deleted:
                 marker = _instance_get_by_uuid(
@@ -2076,7 +2150,66 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
     except db_exc.InvalidSortKey:
         raise exception.InvalidSortKey()
 
-    return _instances_fill_metadata(context, query_prefix.all(), manual_joins)
+    return _instances_fill_metadata(context, query_prefix.all(), manual_joins,
+                                    keys=keys)
+
+
+# Prefix of the page tokens, which are never valid instance uuids
+_PAGE_TOKEN_PREFIX = 'page.'
+
+
+class _PageTokenMarker(object):
+    """Stand-in for the marker row of a page token."""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+def is_instance_page_token(marker):
+    return (isinstance(marker, six.string_types) and
+            marker.startswith(_PAGE_TOKEN_PREFIX))
+
+
+def instance_page_token(instance, sort_keys=None):
+    sort_keys, _sort_dirs = process_sort_params(sort_keys, None,
+                                                default_dir='desc')
+    values = []
+    for key in sort_keys:
+        value = instance[key]
+        if isinstance(value, datetime.datetime):
+            value = timeutils.normalize_time(value).isoformat()
+        values.append(value)
+    token = jsonutils.dumps([sort_keys, values]).encode('utf-8')
+    return _PAGE_TOKEN_PREFIX + base64.urlsafe_b64encode(token).decode('ascii')
+
+
+def _instance_page_token_marker(token, sort_keys):
+    """Return an object holding the sort key values of a page token.
+
+    Raises MarkerNotFound if the token is invalid or was built for other sort
+    keys.
+    """
+    try:
+        data = base64.urlsafe_b64decode(
+            token[len(_PAGE_TOKEN_PREFIX):].encode('ascii'))
+        token_keys, values = jsonutils.loads(data.decode('utf-8'))
+    except (TypeError, ValueError, binascii.Error):
+        raise exception.MarkerNotFound(marker=token)
+    if token_keys != sort_keys or len(values) != len(sort_keys):
+        raise exception.MarkerNotFound(marker=token)
+
+    columns = models.Instance.__table__.columns
+    marker_values = {}
+    for key, value in zip(sort_keys, values):
+        if (value is not None and key in columns and
+                isinstance(columns[key].type, DateTime)):
+            try:
+                value = timeutils.normalize_time(
+                    timeutils.parse_isotime(value))
+            except ValueError:
+                raise exception.MarkerNotFound(marker=token)
+        marker_values[key] = value
+    return _PageTokenMarker(marker_values)
 
 
 def _tag_instance_filter(context, query, filters):
@@ -2352,12 +2485,16 @@ def _instance_get_all_query(context, project_only=False,
 
 def instance_get_all_by_host(context, host,
                              columns_to_join=None,
-                             use_slave=False):
+                             use_slave=False,
+                             columns=None):
+    query = _instance_get_all_query(context, use_slave=use_slave)
+    query, keys = _instance_load_only(query, columns,
+                                      ['info_cache', 'security_groups'])
     return _instances_fill_metadata(context,
-      _instance_get_all_query(context,
-                              use_slave=use_slave).filter_by(host=host).all(),
-                              manual_joins=columns_to_join,
-                              use_slave=use_slave)
+                                    query.filter_by(host=host).all(),
+                                    manual_joins=columns_to_join,
+                                    use_slave=use_slave,
+                                    keys=keys)
 
 
 def _instance_get_all_uuids_by_host(context, host, session=None):
@@ -2376,18 +2513,21 @@ def _instance_get_all_uuids_by_host(context, host, session=None):
 
 
 def instance_get_all_by_host_and_node(context, host, node,
-                                      columns_to_join=None):
+                                      columns_to_join=None, columns=None):
     if columns_to_join is None:
         manual_joins = []
     else:
         candidates = ['system_metadata', 'metadata']
         manual_joins = [x for x in columns_to_join if x in candidates]
         columns_to_join = list(set(columns_to_join) - set(candidates))
+    query = _instance_get_all_query(context, joins=columns_to_join)
+    query, keys = _instance_load_only(
+        query, columns,
+        columns_to_join if columns_to_join is not None
+        else ['info_cache', 'security_groups'])
     return _instances_fill_metadata(context,
-            _instance_get_all_query(
-                context,
-                joins=columns_to_join).filter_by(host=host).
-                filter_by(node=node).all(), manual_joins=manual_joins)
+            query.filter_by(host=host).filter_by(node=node).all(),
+            manual_joins=manual_joins, keys=keys)
 
 
 def instance_get_all_by_host_and_not_type(context, host, type_id=None):
@@ -3472,6 +3612,7 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
 
         # Handle usage refresh
         work = set(deltas.keys())
+        refreshed = set()
         while work:
             resource = work.pop()
 
@@ -3495,6 +3636,7 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
                                                    user_id, session)
                     _refresh_quota_usages(user_usages[res], until_refresh,
                                           in_use)
+                    refreshed.add(res)
 
                     # Because more than one resource may be refreshed
                     # by the call to the sync routine, and we don't
@@ -3562,11 +3704,19 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
                 #            reserved value if the delta is positive.
                 if delta > 0:
                     user_usages[res].reserved += delta
+                    if res not in PER_PROJECT_QUOTAS:
+                        _project_quota_usage_update(session, project_id, res,
+                                                    reserved=delta)
 
         # Apply updates to the usages table
         for usage_ref in user_usages.values():
             session.add(usage_ref)
 
+        if refreshed:
+            session.flush()
+            _project_quota_usages_refresh(context, session, project_id,
+                                          refreshed, create=False)
+
     if unders:
         LOG.warning(_LW("Change will make usage less than 0 for the following "
                         "resources: %s"), unders)
@@ -3602,6 +3752,302 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
     return reservations
 
 
+def _quota_usage_reserve(session, usage, delta, limits):
+    """Add delta to the reserved count of a usage if the limits allow it.
+
+    The limits are checked by the UPDATE statement itself, so that two
+    concurrent reservations of one user can't both pass the check: the
+    second one waits for the row lock taken by the first one and then
+    checks the updated counters.
+
+    :returns: True if the usage was updated, False if it is over quota
+    """
+    usages = models.QuotaUsage.__table__
+    conditions = [usages.c.id == usage.id]
+    for limit in limits:
+        if limit is not None and limit >= 0:
+            conditions.append(usages.c.in_use + usages.c.reserved + delta <=
+                              limit)
+    result = session.execute(
+        usages.update().where(and_(*conditions)).
+        values(reserved=usages.c.reserved + delta))
+    return result.rowcount == 1
+
+
+def _project_quota_usage_update(session, project_id, resource, in_use=0,
+                                reserved=0, limit=None):
+    """Add to the project total of a resource if the limit allows it.
+
+    Like _quota_usage_reserve(), the limit is checked by the UPDATE
+    statement itself, so that the concurrent reservations of the users of
+    a project only serialize on the lock of this row.
+
+    :returns: True if the total was updated, False if it is over quota or
+              missing
+    """
+    totals = models.ProjectQuotaUsage.__table__
+    conditions = [totals.c.project_id == project_id,
+                  totals.c.resource == resource,
+                  totals.c.deleted == 0]
+    if limit is not None and limit >= 0:
+        conditions.append(totals.c.in_use + totals.c.reserved + in_use +
+                          reserved <= limit)
+    result = session.execute(
+        totals.update().where(and_(*conditions)).
+        values(in_use=totals.c.in_use + in_use,
+               reserved=totals.c.reserved + reserved))
+    return result.rowcount == 1
+
+
+def _project_quota_usages_refresh(context, session, project_id,
+                                  resources=None, create=True):
+    """Recount the project totals from the usages of the users.
+
+    :param resources: The resources to recount, all the existing totals of
+                      the project if None.
+    :param create:    Whether to create the missing totals of the given
+                      resources.
+    :returns:         dict of resource keys to ProjectQuotaUsage records
+    """
+    # NOTE: Lock the totals before summing the usages, so that a concurrent
+    # reservation which already updated its usage adds its delta after the
+    # recount instead of having it overwritten.
+    query = model_query(context, models.ProjectQuotaUsage,
+                        read_deleted="no", session=session).\
+        filter_by(project_id=project_id)
+    if resources is not None:
+        query = query.filter(
+            models.ProjectQuotaUsage.resource.in_(list(resources)))
+    totals = {row.resource: row
+              for row in query.order_by(models.ProjectQuotaUsage.resource).
+              with_lockmode('update').all()}
+    if resources is None:
+        resources = list(totals)
+    if not resources:
+        return totals
+
+    usages = models.QuotaUsage
+    rows = model_query(context, usages,
+                       (usages.resource, func.sum(usages.in_use),
+                        func.sum(usages.reserved)),
+                       read_deleted="no", session=session).\
+        filter(usages.project_id == project_id).\
+        filter(usages.resource.in_(list(resources))).\
+        group_by(usages.resource).\
+        all()
+    sums = {resource: (int(in_use or 0), int(reserved or 0))
+            for resource, in_use, reserved in rows}
+    for resource in resources:
+        total = totals.get(resource)
+        if total is None:
+            if not create:
+                continue
+            total = models.ProjectQuotaUsage(project_id=project_id,
+                                             resource=resource)
+            totals[resource] = total
+        total.in_use, total.reserved = sums.get(resource, (0, 0))
+        session.add(total)
+    try:
+        session.flush()
+    except db_exc.DBDuplicateEntry as e:
+        # A concurrent reservation created the same total, start over.
+        raise db_exc.RetryRequest(e)
+    return totals
+
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True,
+                           retry_on_request=True)
+def quota_reserve_counters(context, resources, project_quotas, user_quotas,
+                           deltas, expire, project_id=None, user_id=None):
+    if project_id is None:
+        project_id = context.project_id
+    if user_id is None:
+        user_id = context.user_id
+
+    session = get_session()
+    with session.begin():
+        rows = model_query(context, models.QuotaUsage, read_deleted="no",
+                           session=session).\
+            filter_by(project_id=project_id).\
+            filter(models.QuotaUsage.resource.in_(list(deltas))).\
+            filter(or_(models.QuotaUsage.user_id == user_id,
+                       models.QuotaUsage.user_id == null())).\
+            all()
+        user_usages = {row.resource: row for row in rows}
+        created = set(resource for resource in deltas
+                      if _create_quota_usage_if_missing(user_usages,
+                                                        resource, None,
+                                                        project_id, user_id,
+                                                        session))
+
+        # A new usage has to be counted, and a negative in_use count
+        # indicates a desync or a usage reset by usage_reset(). Recount them
+        # now instead of waiting for the reconciler.
+        syncs = set(resources[res].sync for res in deltas
+                    if res in created or user_usages[res].in_use < 0)
+        refreshed = set()
+        for sync in syncs:
+            updates = QUOTA_SYNC_FUNCTIONS[sync](context.elevated(),
+                                                 project_id, user_id,
+                                                 session)
+            for res, in_use in updates.items():
+                if res in user_usages:
+                    _refresh_quota_usages(user_usages[res], None, in_use)
+                    refreshed.add(res)
+        if syncs:
+            session.flush()
+        refreshed.difference_update(PER_PROJECT_QUOTAS)
+        if refreshed:
+            _project_quota_usages_refresh(context, session, project_id,
+                                          refreshed, create=False)
+
+        # Check for deltas that would go negative
+        unders = [res for res, delta in deltas.items()
+                  if delta < 0 and
+                  delta + user_usages[res].in_use < 0]
+
+        # NOTE: Update the usages of the user, then the totals of the
+        # project, each in a stable order, so that concurrent reservations
+        # lock the rows in the same order. The usages of the per-project
+        # resources are the totals of the project already.
+        overs = []
+        reserved = []
+        for res, delta in sorted(deltas.items()):
+            # We're only concerned about positive increments, see
+            # quota_reserve().
+            if delta <= 0:
+                continue
+            if user_quotas[res] < 0:
+                limits = ()
+            elif res in PER_PROJECT_QUOTAS:
+                limits = (user_quotas[res], project_quotas[res])
+            else:
+                limits = (user_quotas[res],)
+            if not _quota_usage_reserve(session, user_usages[res], delta,
+                                        limits):
+                overs.append(res)
+            elif res not in PER_PROJECT_QUOTAS:
+                reserved.append((res, delta))
+
+        for res, delta in reserved:
+            if overs:
+                break
+            limit = project_quotas[res] if user_quotas[res] >= 0 else None
+            if _project_quota_usage_update(session, project_id, res,
+                                           reserved=delta, limit=limit):
+                continue
+            # Either over quota, or the first reservation of the project
+            # with this driver: count the total, this usage included.
+            total = _project_quota_usages_refresh(
+                context, session, project_id, [res]).get(res)
+            if (limit is not None and limit >= 0 and
+                    total.in_use + total.reserved > limit):
+                overs.append(res)
+
+        if overs:
+            usages = _quota_usage_totals(context, session, project_id,
+                                         user_id, overs)
+            LOG.debug('Raise OverQuota exception because: '
+                      'project_quotas: %(project_quotas)s, '
+                      'user_quotas: %(user_quotas)s, deltas: %(deltas)s, '
+                      'overs: %(overs)s, usages: %(usages)s',
+                      {'project_quotas': project_quotas,
+                       'user_quotas': user_quotas,
+                       'overs': overs, 'deltas': deltas,
+                       'usages': usages})
+            # NOTE: Raising here rolls back the reserved counts updated
+            # for the other resources.
+            raise exception.OverQuota(overs=sorted(overs),
+                                      quotas=user_quotas, usages=usages)
+
+        reservations = []
+        for res, delta in deltas.items():
+            reservation = _reservation_create(str(uuid.uuid4()),
+                                              user_usages[res],
+                                              project_id, user_id,
+                                              res, delta, expire,
+                                              session=session)
+            reservations.append(reservation.uuid)
+
+    if unders:
+        LOG.warning(_LW("Change will make usage less than 0 for the following "
+                        "resources: %s"), unders)
+
+    return reservations
+
+
+def _quota_usage_totals(context, session, project_id, user_id, resources):
+    usages = {}
+    rows = model_query(context, models.QuotaUsage, read_deleted="no",
+                       session=session).\
+        populate_existing().\
+        filter_by(project_id=project_id).\
+        filter(models.QuotaUsage.resource.in_(resources)).\
+        filter(or_(models.QuotaUsage.user_id == user_id,
+                   models.QuotaUsage.user_id == null())).\
+        all()
+    for row in rows:
+        usages[row.resource] = dict(in_use=row.in_use, reserved=row.reserved)
+    return usages
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def _quota_usage_reconcile(context, resources, project_id, user_id, skip):
+    session = get_session()
+    with session.begin():
+        _project_usages, user_usages = _get_project_user_quota_usages(
+                context, session, project_id, user_id)
+        syncs = set()
+        for res in user_usages:
+            sync = getattr(resources.get(res), 'sync', None)
+            if sync is not None and res not in skip:
+                syncs.add(sync)
+        refreshed = []
+        for sync in syncs:
+            updates = QUOTA_SYNC_FUNCTIONS[sync](context, project_id, user_id,
+                                                 session)
+            for res, in_use in updates.items():
+                usage = user_usages.get(res)
+                if usage is None:
+                    continue
+                refreshed.append(res)
+                if usage.in_use != in_use:
+                    _refresh_quota_usages(usage, usage.until_refresh, in_use)
+    return refreshed
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def _project_quota_usages_reconcile(context, project_id):
+    session = get_session()
+    with session.begin():
+        _project_quota_usages_refresh(context, session, project_id)
+
+
+@require_admin_context
+def quota_usage_reconcile(context, resources):
+    """Recount the usages of all the projects and users."""
+    rows = model_query(context, models.QuotaUsage,
+                       (models.QuotaUsage.project_id,
+                        models.QuotaUsage.user_id),
+                       read_deleted="no").distinct().all()
+    users_by_project = collections.defaultdict(set)
+    for project_id, user_id in rows:
+        users_by_project[project_id].add(user_id)
+    for project_id, user_ids in users_by_project.items():
+        if len(user_ids) > 1:
+            user_ids.discard(None)
+        # The per-project usages are the same for all the users, recount
+        # them only once.
+        skip = set()
+        for user_id in user_ids:
+            refreshed = _quota_usage_reconcile(context, resources,
+                                               project_id, user_id, skip)
+            skip.update(res for res in refreshed
+                        if res in PER_PROJECT_QUOTAS)
+        _project_quota_usages_reconcile(context, project_id)
+
+
 def _quota_reservations_query(session, context, reservations):
     """Return the relevant reservations."""
 
@@ -3613,37 +4059,62 @@ def _quota_reservations_query(session, context, reservations):
                    with_lockmode('update')
 
 
+def _reservations_finalize(context, session, user_usages, reservations,
+                           commit):
+    reservation_query = _quota_reservations_query(session, context,
+                                                  reservations)
+    totals = collections.defaultdict(lambda: [0, 0])
+    for reservation in reservation_query.all():
+        usage = user_usages[reservation.resource]
+        total = totals[(reservation.project_id, reservation.resource)]
+        if reservation.delta >= 0:
+            usage.reserved -= reservation.delta
+            total[1] -= reservation.delta
+        if commit:
+            usage.in_use += reservation.delta
+            total[0] += reservation.delta
+    reservation_query.soft_delete(synchronize_session=False)
+    _project_quota_usages_adjust(session, totals)
+
+
+def _project_quota_usages_adjust(session, totals):
+    """Apply the changes of the usages to the project totals.
+
+    :param totals: dict of (project_id, resource) keys to [in_use, reserved]
+                   changes
+    """
+    for (project_id, resource), (in_use, reserved) in sorted(totals.items()):
+        if resource not in PER_PROJECT_QUOTAS and (in_use or reserved):
+            _project_quota_usage_update(session, project_id, resource,
+                                        in_use=in_use, reserved=reserved)
+
+
 @require_context
-@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 def reservation_commit(context, reservations, project_id=None, user_id=None):
-    session = get_session()
-    with session.begin():
-        _project_usages, user_usages = _get_project_user_quota_usages(
-                context, session, project_id, user_id)
-        reservation_query = _quota_reservations_query(session, context,
-                                                      reservations)
-        for reservation in reservation_query.all():
-            usage = user_usages[reservation.resource]
-            if reservation.delta >= 0:
-                usage.reserved -= reservation.delta
-            usage.in_use += reservation.delta
-        reservation_query.soft_delete(synchronize_session=False)
+    reservation_finalize(context, reservations, [], project_id=project_id,
+                         user_id=user_id)
 
 
 @require_context
-@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 def reservation_rollback(context, reservations, project_id=None, user_id=None):
+    reservation_finalize(context, [], reservations, project_id=project_id,
+                         user_id=user_id)
+
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def reservation_finalize(context, commit_reservations, rollback_reservations,
+                         project_id=None, user_id=None):
     session = get_session()
     with session.begin():
         _project_usages, user_usages = _get_project_user_quota_usages(
                 context, session, project_id, user_id)
-        reservation_query = _quota_reservations_query(session, context,
-                                                      reservations)
-        for reservation in reservation_query.all():
-            usage = user_usages[reservation.resource]
-            if reservation.delta >= 0:
-                usage.reserved -= reservation.delta
-        reservation_query.soft_delete(synchronize_session=False)
+        if commit_reservations:
+            _reservations_finalize(context, session, user_usages,
+                                   commit_reservations, True)
+        if rollback_reservations:
+            _reservations_finalize(context, session, user_usages,
+                                   rollback_reservations, False)
 
 
 def quota_destroy_all_by_project_and_user(context, project_id, user_id):
@@ -3667,6 +4138,8 @@ def quota_destroy_all_by_project_and_user(context, project_id, user_id):
                 filter_by(user_id=user_id).\
                 soft_delete(synchronize_session=False)
 
+        _project_quota_usages_refresh(context, session, project_id)
+
 
 def quota_destroy_all_by_project(context, project_id):
     session = get_session()
@@ -3691,6 +4164,11 @@ def quota_destroy_all_by_project(context, project_id):
                 filter_by(project_id=project_id).\
                 soft_delete(synchronize_session=False)
 
+        model_query(context, models.ProjectQuotaUsage,
+                    session=session, read_deleted="no").\
+                filter_by(project_id=project_id).\
+                soft_delete(synchronize_session=False)
+
 
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 def reservation_expire(context):
@@ -3701,12 +4179,16 @@ def reservation_expire(context):
                                         session=session, read_deleted="no").\
                             filter(models.Reservation.expire < current_time)
 
+        totals = collections.defaultdict(lambda: [0, 0])
         for reservation in reservation_query.join(models.QuotaUsage).all():
             if reservation.delta >= 0:
                 reservation.usage.reserved -= reservation.delta
                 session.add(reservation.usage)
+                totals[(reservation.project_id,
+                        reservation.resource)][1] -= reservation.delta
 
         reservation_query.soft_delete(synchronize_session=False)
+        _project_quota_usages_adjust(session, totals)
 
 
 ###################
@@ -5894,18 +6376,79 @@ def task_log_end_task(context, task_name, period_beginning, period_ending,
             raise exception.TaskNotRunning(task_name=task_name, host=host)
 
 
-def archive_deleted_rows_for_table(context, tablename, max_rows):
-    """Move up to max_rows rows from one tables to the corresponding
-    shadow table. The context argument is only used for the decorator.
+class _ArchiveThrottle(object):
+    """Keep archiving under a given number of rows per second."""
 
-    :returns: number of rows archived
+    def __init__(self, rows_per_second):
+        self.rows_per_second = rows_per_second
+        self._start = time.time()
+        self._rows = 0
+
+    def wait(self, rows):
+        self._rows += rows
+        delay = (self._start + float(self._rows) / self.rows_per_second -
+                 time.time())
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _archive_tablenames():
+    """Return the names of the soft-deleted tables, ordered so that the
+    tables referencing another table come before it.
     """
-    # NOTE(guochbo): There is a circular import, nova.db.sqlalchemy.utils
-    # imports nova.db.sqlalchemy.api.
-    from nova.db.sqlalchemy import utils as db_utils
+    return [table.name
+            for table in reversed(models.BASE.metadata.sorted_tables)
+            if 'deleted' in table.c]
+
+
+def _archive_rows(conn, tablename, table, shadow_table, column, keys):
+    """Move the deleted rows with the given keys to the shadow table.
 
+    :returns: number of rows archived
+    """
+    deleted_column = table.c.deleted
+    where = and_(column.in_(keys),
+                 deleted_column != deleted_column.default.arg)
+    columns = [c.name for c in table.c]
+    insert = shadow_table.insert(inline=True).\
+        from_select(columns, sql.select([table], where))
+    delete = table.delete().where(where)
+    try:
+        # Group the insert and delete in a transaction.
+        with conn.begin():
+            conn.execute(insert)
+            return conn.execute(delete).rowcount
+    except db_exc.DBError:
+        # TODO(ekudryashova): replace by DBReferenceError when db layer
+        # raise it.
+        # A foreign key constraint keeps us from deleting some of
+        # these rows until we clean up a dependent table.  Archive the
+        # other rows one by one and skip these ones for now; we'll come
+        # back to them later.
+        if len(keys) > 1:
+            LOG.warning(_LW("IntegrityError detected when archiving table "
+                            "%s, archiving rows one by one"), tablename)
+            return sum(_archive_rows(conn, tablename, table, shadow_table,
+                                     column, [key])
+                       for key in keys)
+        LOG.warning(_LW("IntegrityError detected when archiving row "
+                        "%(key)s of table %(table)s"),
+                    {'key': keys[0], 'table': tablename})
+        return 0
+
+
+def _archive_deleted_rows_for_table(tablename, max_rows, batch_size,
+                                    marker=None, throttle=None):
+    """Move up to max_rows deleted rows from one table to the corresponding
+    shadow table, in batches of batch_size rows ordered by key.
+
+    Only the rows with a key greater than marker are archived.
+
+    :returns: tuple of the number of rows archived and the key of the last
+              row looked at, which is None once all the deleted rows of the
+              table have been looked at
+    """
     engine = get_engine()
-    conn = engine.connect()
     metadata = MetaData()
     metadata.bind = engine
     # NOTE(tdurakov): table metadata should be received
@@ -5920,7 +6463,7 @@ def archive_deleted_rows_for_table(context, tablename, max_rows):
         shadow_table = Table(shadow_tablename, metadata, autoload=True)
     except NoSuchTableError:
         # No corresponding shadow table; skip it.
-        return rows_archived
+        return rows_archived, None
 
     if tablename == "dns_domains":
         # We have one table (dns_domains) where the key is called
@@ -5928,58 +6471,85 @@ def archive_deleted_rows_for_table(context, tablename, max_rows):
         column = table.c.domain
     else:
         column = table.c.id
-    # NOTE(guochbo): Use DeleteFromSelect to avoid
-    # database's limit of maximum parameter in one SQL statement.
     deleted_column = table.c.deleted
-    columns = [c.name for c in table.c]
-    insert = shadow_table.insert(inline=True).\
-        from_select(columns,
-                    sql.select([table],
-                               deleted_column != deleted_column.default.arg).
-                    order_by(column).limit(max_rows))
-    query_delete = sql.select([column],
-                          deleted_column != deleted_column.default.arg).\
-                          order_by(column).limit(max_rows)
-
-    delete_statement = db_utils.DeleteFromSelect(table, query_delete, column)
+
+    conn = engine.connect()
     try:
-        # Group the insert and delete in a transaction.
-        with conn.begin():
-            conn.execute(insert)
-            result_delete = conn.execute(delete_statement)
-    except db_exc.DBError:
-        # TODO(ekudryashova): replace by DBReferenceError when db layer
-        # raise it.
-        # A foreign key constraint keeps us from deleting some of
-        # these rows until we clean up a dependent table.  Just
-        # skip this table for now; we'll come back to it later.
-        msg = _("IntegrityError detected when archiving table %s") % tablename
-        LOG.warn(msg)
-        return rows_archived
+        while rows_archived < max_rows:
+            limit = min(batch_size, max_rows - rows_archived)
+            # NOTE: Walk the table by key from the last batch, so that each
+            # batch is a short range scan of the primary key instead of a
+            # scan of all the rows already archived or skipped.
+            query = sql.select([column],
+                               deleted_column != deleted_column.default.arg)
+            if marker is not None:
+                query = query.where(column > marker)
+            keys = [row[0] for row in
+                    conn.execute(query.order_by(column).limit(limit))]
+            if not keys:
+                return rows_archived, None
+            rows = _archive_rows(conn, tablename, table, shadow_table,
+                                 column, keys)
+            rows_archived += rows
+            marker = keys[-1]
+            if throttle is not None:
+                throttle.wait(rows)
+            if len(keys) < limit:
+                return rows_archived, None
+    finally:
+        conn.close()
+    return rows_archived, marker
+
 
-    rows_archived = result_delete.rowcount
+def archive_deleted_rows_for_table(context, tablename, max_rows):
+    """Move up to max_rows rows from one tables to the corresponding
+    shadow table. The context argument is only used for the decorator.
 
-    return rows_archived
+    :returns: number of rows archived
+    """
+    if max_rows is None:
+        max_rows = sys.maxsize
+    return _archive_deleted_rows_for_table(
+        tablename, max_rows, CONF.archive_deleted_rows_batch_size)[0]
 
 
-def archive_deleted_rows(context, max_rows=None):
+def archive_deleted_rows(context, max_rows=None, cursor=None,
+                         rows_per_second=None):
     """Move up to max_rows rows from production tables to the corresponding
     shadow tables.
 
-    :returns: Number of rows archived.
+    The tables are archived in foreign key dependency order, in batches of
+    archive_deleted_rows_batch_size rows. If cursor is a dict, it is updated
+    with the key of the last row looked at in the table where archiving
+    stopped, and the next call given the same dict resumes from there.
+
+    :returns: dict of the number of rows archived keyed by table name
     """
     # The context argument is only used for the decorator.
-    tablenames = []
-    for model_class in six.itervalues(models.__dict__):
-        if hasattr(model_class, "__tablename__"):
-            tablenames.append(model_class.__tablename__)
+    if max_rows is None:
+        max_rows = sys.maxsize
+    if cursor is None:
+        cursor = {}
+    throttle = None
+    if rows_per_second:
+        throttle = _ArchiveThrottle(rows_per_second)
     rows_archived = 0
-    for tablename in tablenames:
-        rows_archived += archive_deleted_rows_for_table(context, tablename,
-                                         max_rows=max_rows - rows_archived)
+    table_to_rows_archived = {}
+    for tablename in _archive_tablenames():
+        rows, marker = _archive_deleted_rows_for_table(
+            tablename, max_rows - rows_archived,
+            CONF.archive_deleted_rows_batch_size,
+            marker=cursor.get(tablename), throttle=throttle)
+        if marker is None:
+            cursor.pop(tablename, None)
+        else:
+            cursor[tablename] = marker
+        if rows:
+            table_to_rows_archived[tablename] = rows
+            rows_archived += rows
         if rows_archived >= max_rows:
             break
-    return rows_archived
+    return table_to_rows_archived
 
 
 ####################
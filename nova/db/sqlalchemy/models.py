@@ -205,6 +205,10 @@ class Instance(BASE, NovaBase):
               'host', 'node', 'deleted'),
         Index('instances_host_deleted_cleaned_idx',
               'host', 'deleted', 'cleaned'),
+        Index('instances_deleted_created_at_id_idx',
+              'deleted', 'created_at', 'id'),
+        Index('instances_deleted_project_id_created_at_id_idx',
+              'deleted', 'project_id', 'created_at', 'id'),
         schema.UniqueConstraint('uuid', name='uniq_instances0uuid'),
     )
     injected_files = []
@@ -491,6 +495,28 @@ class QuotaUsage(BASE, NovaBase):
     until_refresh = Column(Integer)
 
 
+class ProjectQuotaUsage(BASE, NovaBase):
+    """Represents the usage of a resource by all the users of a project.
+
+    Only kept by the counter based reservations, which check the project
+    limits against these totals instead of summing the usages of the users.
+    """
+
+    __tablename__ = 'project_quota_usages'
+    __table_args__ = (
+        schema.UniqueConstraint("project_id", "resource", "deleted",
+        name="uniq_project_quota_usages0project_id0resource0deleted"
+        ),
+    )
+    id = Column(Integer, primary_key=True)
+
+    project_id = Column(String(255), nullable=False)
+    resource = Column(String(255), nullable=False)
+
+    in_use = Column(Integer, nullable=False)
+    reserved = Column(Integer, nullable=False)
+
+
 class Reservation(BASE, NovaBase):
     """Represents a resource reservation for quotas."""
 
@@ -17,6 +17,8 @@
 Filter support
 """
 
+import time
+
 from oslo_log import log as logging
 
 from nova.i18n import _LI
@@ -65,17 +67,28 @@ class BaseFilterHandler(loadables.BaseLoader):
     This class should be subclassed where one needs to use filters.
     """
 
+    def _record_filter(self, filter_, elapsed, num_in, num_out):
+        """Called with the duration and the number of objects going in and
+        out of each filter run.  Override in a subclass to collect filter
+        statistics.
+        """
+        pass
+
     def get_filtered_objects(self, filters, objs, filter_properties, index=0):
         list_objs = list(objs)
         LOG.debug("Starting with %d host(s)", len(list_objs))
         for filter_ in filters:
             if filter_.run_filter_for_index(index):
                 cls_name = filter_.__class__.__name__
+                start = time.time()
                 objs = filter_.filter_all(list_objs, filter_properties)
                 if objs is None:
                     LOG.debug("Filter %s says to stop filtering", cls_name)
                     return
+                num_in = len(list_objs)
                 list_objs = list(objs)
+                self._record_filter(filter_, time.time() - start, num_in,
+                                    len(list_objs))
                 if not list_objs:
                     LOG.info(_LI("Filter %s returned 0 hosts"), cls_name)
                     break
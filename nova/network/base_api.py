@@ -21,6 +21,7 @@ from oslo_log import log as logging
 from oslo_utils import excutils
 
 from nova.db import base
+from nova import exception
 from nova import hooks
 from nova.i18n import _, _LE
 from nova.network import model as network_model
@@ -251,6 +252,26 @@ class NetworkAPI(base.Base):
                                                update_cells=False)
         return result
 
+    def get_instances_nw_info(self, context, instances):
+        """Refresh the network info of several instances.
+
+        Returns a dict of the refreshed network info, keyed by the uuid of
+        the instances. The instances which could not be refreshed are left
+        out of it.
+        """
+        nw_infos = {}
+        for instance in instances:
+            try:
+                nw_infos[instance.uuid] = self.get_instance_nw_info(context,
+                                                                    instance)
+            except exception.InstanceNotFound:
+                LOG.debug('Instance no longer exists. Unable to refresh',
+                          instance=instance)
+            except Exception:
+                LOG.exception(_LE('An error occurred while refreshing the '
+                                  'network cache.'), instance=instance)
+        return nw_infos
+
     def _get_instance_nw_info(self, context, instance, **kwargs):
         """Template method, so a subclass can implement for neutron/network."""
         raise NotImplementedError()
@@ -27,6 +27,7 @@ from neutronclient.v2_0 import client as clientv20
 from oslo_concurrency import lockutils
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
 from oslo_utils import uuidutils
 import six
@@ -872,6 +873,87 @@ class API(base_api.NetworkAPI):
                                                  preexisting_port_ids)
         return network_model.NetworkInfo.hydrate(nw_info)
 
+    def get_instances_nw_info(self, context, instances):
+        """Refresh the network info of several instances.
+
+        The ports of the instances and their networks, subnets, DHCP ports
+        and floating IPs are fetched with one request each, and the info
+        cache of an instance is only saved when its network info changed.
+        """
+        client = get_client(context, admin=True)
+        data = client.list_ports(device_id=[instance.uuid
+                                            for instance in instances])
+        ports = data.get('ports', [])
+        neutron_data = self._get_nw_info_neutron_data(client, ports)
+
+        nw_infos = {}
+        for instance in instances:
+            instance_ports = [port for port in ports
+                              if port['device_id'] == instance.uuid and
+                              port['tenant_id'] == instance.project_id]
+            try:
+                with lockutils.lock('refresh_cache-%s' % instance.uuid):
+                    compute_utils.refresh_info_cache_for_instance(context,
+                                                                  instance)
+                    nw_info = network_model.NetworkInfo.hydrate(
+                        self._build_network_info_model(
+                            context, instance, admin_client=client,
+                            neutron_ports=instance_ports,
+                            neutron_data=neutron_data))
+                    cached_nw_info = compute_utils.get_nw_info_for_instance(
+                        instance)
+                    if (jsonutils.loads(nw_info.json()) !=
+                            jsonutils.loads(cached_nw_info.json())):
+                        base_api.update_instance_cache_with_nw_info(
+                            self, context, instance, nw_info=nw_info,
+                            update_cells=False)
+                nw_infos[instance.uuid] = nw_info
+            except exception.InstanceNotFound:
+                LOG.debug('Instance no longer exists. Unable to refresh',
+                          instance=instance)
+            except Exception:
+                LOG.exception(_LE('An error occurred while refreshing the '
+                                  'network cache.'), instance=instance)
+        return nw_infos
+
+    def _get_nw_info_neutron_data(self, client, ports):
+        """Fetch the Neutron resources needed to build the network info of
+        the given ports, with one request per resource type.
+        """
+        network_ids = list(set(port['network_id'] for port in ports))
+        subnet_ids = list(set(fixed_ip['subnet_id'] for port in ports
+                              for fixed_ip in port['fixed_ips']))
+        port_ids = [port['id'] for port in ports]
+
+        neutron_data = {'networks': [], 'subnets': [], 'dhcp_ports': {},
+                        'floatingips': {}}
+        if network_ids:
+            neutron_data['networks'] = client.list_networks(
+                id=network_ids).get('networks', [])
+        if subnet_ids:
+            neutron_data['subnets'] = client.list_subnets(
+                id=subnet_ids).get('subnets', [])
+            dhcp_ports = client.list_ports(
+                network_id=network_ids,
+                device_owner='network:dhcp').get('ports', [])
+            for dhcp_port in dhcp_ports:
+                neutron_data['dhcp_ports'].setdefault(
+                    dhcp_port['network_id'], []).append(dhcp_port)
+        if port_ids:
+            try:
+                floatingips = client.list_floatingips(
+                    port_id=port_ids)['floatingips']
+            # If a neutron plugin does not implement the L3 API a 404 from
+            # list_floatingips will be raised.
+            except neutron_client_exc.NeutronClientException as e:
+                if e.status_code != 404:
+                    raise
+                floatingips = []
+            for fip in floatingips:
+                neutron_data['floatingips'].setdefault(
+                    fip['port_id'], []).append(fip)
+        return neutron_data
+
     def _gather_port_ids_and_networks(self, context, instance, networks=None,
                                       port_ids=None):
         """Return an instance's complete list of port_ids and networks."""
@@ -1488,12 +1570,18 @@ class API(base_api.NetworkAPI):
         """Force add a network to the project."""
         raise NotImplementedError()
 
-    def _nw_info_get_ips(self, client, port):
+    def _nw_info_get_ips(self, client, port, neutron_data=None):
         network_IPs = []
         for fixed_ip in port['fixed_ips']:
             fixed = network_model.FixedIP(address=fixed_ip['ip_address'])
-            floats = self._get_floating_ips_by_fixed_and_port(
-                client, fixed_ip['ip_address'], port['id'])
+            if neutron_data is None:
+                floats = self._get_floating_ips_by_fixed_and_port(
+                    client, fixed_ip['ip_address'], port['id'])
+            else:
+                floats = [fip for fip in
+                          neutron_data['floatingips'].get(port['id'], [])
+                          if fip['fixed_ip_address'] ==
+                          fixed_ip['ip_address']]
             for ip in floats:
                 fip = network_model.IP(address=ip['floating_ip_address'],
                                        type='floating')
@@ -1501,8 +1589,9 @@ class API(base_api.NetworkAPI):
             network_IPs.append(fixed)
         return network_IPs
 
-    def _nw_info_get_subnets(self, context, port, network_IPs):
-        subnets = self._get_subnets_from_port(context, port)
+    def _nw_info_get_subnets(self, context, port, network_IPs,
+                             neutron_data=None):
+        subnets = self._get_subnets_from_port(context, port, neutron_data)
         for subnet in subnets:
             subnet['ips'] = [fixed_ip for fixed_ip in network_IPs
                              if fixed_ip.is_in_subnet(subnet)]
@@ -1583,7 +1672,8 @@ class API(base_api.NetworkAPI):
 
     def _build_network_info_model(self, context, instance, networks=None,
                                   port_ids=None, admin_client=None,
-                                  preexisting_port_ids=None):
+                                  preexisting_port_ids=None,
+                                  neutron_ports=None, neutron_data=None):
         """Return list of ordered VIFs attached to instance.
 
         :param context - request context.
@@ -1600,21 +1690,33 @@ class API(base_api.NetworkAPI):
         allocate and there shouldn't be deleted when an instance is
         de-allocated. Supplied list will be added to the cached list of
         preexisting port IDs for this instance.
+        :param neutron_ports - The ports of the instance, when already
+        fetched from Neutron along with neutron_data.
+        :param neutron_data - The networks, subnets, DHCP ports and floating
+        IPs of the ports of a set of instances, as returned by
+        _get_nw_info_neutron_data(), when refreshing their cache at once.
         """
 
-        search_opts = {'tenant_id': instance.project_id,
-                       'device_id': instance.uuid, }
         if admin_client is None:
             client = get_client(context, admin=True)
         else:
             client = admin_client
 
-        data = client.list_ports(**search_opts)
-
-        current_neutron_ports = data.get('ports', [])
+        if neutron_ports is None:
+            search_opts = {'tenant_id': instance.project_id,
+                           'device_id': instance.uuid, }
+            data = client.list_ports(**search_opts)
+            current_neutron_ports = data.get('ports', [])
+        else:
+            current_neutron_ports = neutron_ports
         nw_info_refresh = networks is None and port_ids is None
-        networks, port_ids = self._gather_port_ids_and_networks(
-                context, instance, networks, port_ids)
+        if neutron_data is None:
+            networks, port_ids = self._gather_port_ids_and_networks(
+                    context, instance, networks, port_ids)
+        else:
+            ifaces = compute_utils.get_nw_info_for_instance(instance)
+            port_ids = [iface['id'] for iface in ifaces]
+            networks = neutron_data['networks']
         nw_info = network_model.NetworkInfo()
 
         if preexisting_port_ids is None:
@@ -1641,10 +1743,12 @@ class API(base_api.NetworkAPI):
                     vif_active = True
 
                 network_IPs = self._nw_info_get_ips(client,
-                                                    current_neutron_port)
+                                                    current_neutron_port,
+                                                    neutron_data)
                 subnets = self._nw_info_get_subnets(context,
                                                     current_neutron_port,
-                                                    network_IPs)
+                                                    network_IPs,
+                                                    neutron_data)
 
                 devname = "tap" + current_neutron_port['id']
                 devname = devname[:network_model.NIC_NAME_LEN]
@@ -1677,7 +1781,7 @@ class API(base_api.NetworkAPI):
 
         return nw_info
 
-    def _get_subnets_from_port(self, context, port):
+    def _get_subnets_from_port(self, context, port, neutron_data=None):
         """Return the subnets for a given port."""
 
         fixed_ips = port['fixed_ips']
@@ -1688,9 +1792,14 @@ class API(base_api.NetworkAPI):
         # related to the port. To avoid this, the method returns here.
         if not fixed_ips:
             return []
-        search_opts = {'id': [ip['subnet_id'] for ip in fixed_ips]}
-        data = get_client(context).list_subnets(**search_opts)
-        ipam_subnets = data.get('subnets', [])
+        if neutron_data is None:
+            search_opts = {'id': [ip['subnet_id'] for ip in fixed_ips]}
+            data = get_client(context).list_subnets(**search_opts)
+            ipam_subnets = data.get('subnets', [])
+        else:
+            subnet_ids = set(ip['subnet_id'] for ip in fixed_ips)
+            ipam_subnets = [subnet for subnet in neutron_data['subnets']
+                            if subnet['id'] in subnet_ids]
         subnets = []
 
         for subnet in ipam_subnets:
@@ -1701,10 +1810,14 @@ class API(base_api.NetworkAPI):
             }
 
             # attempt to populate DHCP server field
-            search_opts = {'network_id': subnet['network_id'],
-                           'device_owner': 'network:dhcp'}
-            data = get_client(context).list_ports(**search_opts)
-            dhcp_ports = data.get('ports', [])
+            if neutron_data is None:
+                search_opts = {'network_id': subnet['network_id'],
+                               'device_owner': 'network:dhcp'}
+                data = get_client(context).list_ports(**search_opts)
+                dhcp_ports = data.get('ports', [])
+            else:
+                dhcp_ports = neutron_data['dhcp_ports'].get(
+                    subnet['network_id'], [])
             for p in dhcp_ports:
                 for ip_pair in p['fixed_ips']:
                     if ip_pair['subnet_id'] == subnet['id']:
@@ -15,11 +15,13 @@
 """Nova common internal object model"""
 
 import contextlib
+import copy
 import datetime
 import functools
 import traceback
 
 import netaddr
+from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_utils import timeutils
@@ -33,6 +35,17 @@ from nova.objects import fields as obj_fields
 from nova import utils
 
 
+object_opts = [
+    cfg.BoolOpt('lazy_object_deserialization',
+                default=False,
+                help='Keep the fields of the objects received over RPC in '
+                     'their primitive form and only deserialize each field '
+                     'the first time it is accessed.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(object_opts)
+
 LOG = logging.getLogger('object')
 
 
@@ -67,6 +80,104 @@ class NovaObject(ovoo_base.VersionedObject):
     OBJ_SERIAL_NAMESPACE = 'nova_object'
     OBJ_PROJECT_NAMESPACE = 'nova'
 
+    @classmethod
+    def _obj_from_primitive(cls, context, objver, primitive):
+        if not CONF.lazy_object_deserialization:
+            return super(NovaObject, cls)._obj_from_primitive(
+                context, objver, primitive)
+        self = cls()
+        self._context = context
+        self.VERSION = objver
+        objdata = cls._obj_primitive_field(primitive, 'data')
+        changes = cls._obj_primitive_field(primitive, 'changes', [])
+        # NOTE: The fields are deserialized by __getattr__() when first
+        # accessed, the ones which are never used are never deserialized.
+        self._lazy_primitives = {name: value
+                                 for name, value in six.iteritems(objdata)
+                                 if name in self.fields}
+        self._obj_drop_lazy_defaults()
+        self._changed_fields = set([x for x in changes if x in self.fields])
+        return self
+
+    def _obj_drop_lazy_defaults(self):
+        # NOTE: Constructors may set default values, for instance
+        # ObjectListBase sets objects to [], those would hide the primitives
+        # from __getattr__().
+        for name in self._lazy_primitives:
+            self.__dict__.pop(get_attrname(name), None)
+
+    def _obj_lazy_primitive(self, attrname):
+        """Return the primitive of a field which is not deserialized yet."""
+        return self._lazy_primitives[attrname]
+
+    def __getattr__(self, name):
+        # NOTE: This is only called when name is not found the normal way,
+        # which is how the field properties check that a field is set.
+        lazy = self.__dict__.get('_lazy_primitives')
+        if lazy and name.startswith('_obj_'):
+            field_name = name[len('_obj_'):]
+            if field_name in lazy:
+                field = self.fields[field_name]
+                value = field.coerce(self, field_name,
+                                     field.from_primitive(self, field_name,
+                                                          lazy[field_name]))
+                self.__dict__[name] = value
+                return value
+        raise AttributeError(name)
+
+    def __delattr__(self, name):
+        super(NovaObject, self).__delattr__(name)
+        lazy = self.__dict__.get('_lazy_primitives')
+        field_name = name[len('_obj_'):]
+        if lazy and name.startswith('_obj_') and field_name in lazy:
+            # NOTE: The primitives may be shared with clones of this
+            # object, so replace them rather than modify them.
+            self._lazy_primitives = {key: value
+                                     for key, value in six.iteritems(lazy)
+                                     if key != field_name}
+
+    def __deepcopy__(self, memo):
+        lazy = self.__dict__.get('_lazy_primitives')
+        if not lazy:
+            return super(NovaObject, self).__deepcopy__(memo)
+        # Copy the deserialized fields and share the primitives of the
+        # others, which are never modified.
+        nobj = self.__class__()
+        nobj._context = self._context
+        nobj._lazy_primitives = lazy
+        nobj._obj_drop_lazy_defaults()
+        for name in self.fields:
+            attrname = get_attrname(name)
+            if attrname in self.__dict__:
+                setattr(nobj, name,
+                        copy.deepcopy(self.__dict__[attrname], memo))
+        nobj._changed_fields = set(self._changed_fields)
+        return nobj
+
+    def obj_attr_is_lazy(self, attrname):
+        """Test if attrname is set but has not been deserialized yet."""
+        lazy = self.__dict__.get('_lazy_primitives')
+        return bool(lazy and attrname in lazy and
+                    get_attrname(attrname) not in self.__dict__)
+
+    def obj_attr_is_set(self, attrname):
+        if self.obj_attr_is_lazy(attrname):
+            return True
+        return super(NovaObject, self).obj_attr_is_set(attrname)
+
+    def obj_what_changed(self):
+        if not self.__dict__.get('_lazy_primitives'):
+            return super(NovaObject, self).obj_what_changed()
+        # NOTE: The fields which have not been deserialized cannot have
+        # been modified, only the sub-objects of the others are checked.
+        changes = set(self._changed_fields)
+        for name in self.fields:
+            value = self.__dict__.get(get_attrname(name))
+            if (isinstance(value, ovoo_base.VersionedObject) and
+                    value.obj_what_changed()):
+                changes.add(name)
+        return changes
+
     # NOTE(danms): Keep the compatibility bits in nova separate from o.vo
     # for the time being so that we can keep changes required to use
     # the base version of those risky methods separate from the rest of the
@@ -13,6 +13,7 @@
 #    under the License.
 
 from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 import six
 
 from nova import db
@@ -313,7 +314,8 @@ class ComputeNodeList(base.ObjectListBase, base.NovaObject):
     # Version 1.10 ComputeNode version 1.10
     # Version 1.11 ComputeNode version 1.11
     # Version 1.12 ComputeNode version 1.12
-    VERSION = '1.12'
+    # Version 1.13 Add get_all_changed_since()
+    VERSION = '1.13'
     fields = {
         'objects': fields.ListOfObjectsField('ComputeNode'),
         }
@@ -323,7 +325,7 @@ class ComputeNodeList(base.ObjectListBase, base.NovaObject):
                     ('1.3', '1.4'), ('1.4', '1.5'), ('1.5', '1.5'),
                     ('1.6', '1.6'), ('1.7', '1.7'), ('1.8', '1.8'),
                     ('1.9', '1.9'), ('1.10', '1.10'), ('1.11', '1.11'),
-                    ('1.12', '1.12')],
+                    ('1.12', '1.12'), ('1.13', '1.12')],
         }
 
     @base.remotable_classmethod
@@ -332,6 +334,24 @@ class ComputeNodeList(base.ObjectListBase, base.NovaObject):
         return base.obj_make_list(context, cls(context), objects.ComputeNode,
                                   db_computes)
 
+    @base.remotable_classmethod
+    def _get_all_changed_since(cls, context, changed_since):
+        # NOTE: The timestamp is passed as a string primitive for the remote
+        # call.
+        changed_since = timeutils.parse_isotime(changed_since)
+        db_computes = db.compute_node_get_all_changed_since(context,
+                                                            changed_since)
+        return base.obj_make_list(context, cls(context), objects.ComputeNode,
+                                  db_computes)
+
+    @classmethod
+    def get_all_changed_since(cls, context, changed_since):
+        """Return the compute nodes created, updated or deleted since a given
+        time, including the deleted ones.
+        """
+        return cls._get_all_changed_since(context,
+                                          timeutils.isotime(changed_since))
+
     @base.remotable_classmethod
     def get_by_hypervisor(cls, context, hypervisor_match):
         db_computes = db.compute_node_search_by_hypervisor(context,
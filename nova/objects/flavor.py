@@ -90,23 +90,30 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
 
         self._load_projects()
 
+    def _copy_field(self, name, copy_fn):
+        if self.obj_attr_is_lazy(name):
+            # NOTE: The primitive of a dict or list of strings is the value
+            # itself, copy it rather than deserializing the field.
+            return copy_fn(self._obj_lazy_primitive(name))
+        return copy_fn(getattr(self, name) if self.obj_attr_is_set(name)
+                       else ())
+
     def obj_reset_changes(self, fields=None):
         super(Flavor, self).obj_reset_changes(fields=fields)
         if fields is None or 'extra_specs' in fields:
-            self._orig_extra_specs = (dict(self.extra_specs)
-                                      if self.obj_attr_is_set('extra_specs')
-                                      else {})
+            self._orig_extra_specs = self._copy_field('extra_specs', dict)
         if fields is None or 'projects' in fields:
-            self._orig_projects = (list(self.projects)
-                                   if self.obj_attr_is_set('projects')
-                                   else [])
+            self._orig_projects = self._copy_field('projects', list)
 
     def obj_what_changed(self):
         changes = super(Flavor, self).obj_what_changed()
+        # NOTE: The fields which are not deserialized yet are unchanged.
         if ('extra_specs' in self and
-            self.extra_specs != self._orig_extra_specs):
+                not self.obj_attr_is_lazy('extra_specs') and
+                self.extra_specs != self._orig_extra_specs):
             changes.add('extra_specs')
-        if 'projects' in self and self.projects != self._orig_projects:
+        if ('projects' in self and not self.obj_attr_is_lazy('projects') and
+                self.projects != self._orig_projects):
             changes.add('projects')
         return changes
 
@@ -117,14 +124,10 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
         changes = self.obj_what_changed()
         if 'extra_specs' not in changes:
             # This call left extra_specs "clean" so update our tracker
-            self._orig_extra_specs = (dict(self.extra_specs)
-                                      if self.obj_attr_is_set('extra_specs')
-                                      else {})
+            self._orig_extra_specs = self._copy_field('extra_specs', dict)
         if 'projects' not in changes:
             # This call left projects "clean" so update our tracker
-            self._orig_projects = (list(self.projects)
-                                   if self.obj_attr_is_set('projects')
-                                   else [])
+            self._orig_projects = self._copy_field('projects', list)
         return self
 
     @base.remotable_classmethod
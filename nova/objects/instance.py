@@ -240,15 +240,24 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
 
     def __init__(self, *args, **kwargs):
         super(Instance, self).__init__(*args, **kwargs)
+        # NOTE: Set by _from_db_object() when only some of the column fields
+        # were loaded, the others can then be lazy-loaded.
+        self._projected = False
         self._reset_metadata_tracking()
 
+    def _metadata_copy(self, name):
+        if self.obj_attr_is_lazy(name):
+            # NOTE: The primitive of a dict of strings is the dict itself,
+            # copy it rather than deserializing the field.
+            return dict(self._obj_lazy_primitive(name))
+        return dict(getattr(self, name)) if name in self else {}
+
     def _reset_metadata_tracking(self, fields=None):
         if fields is None or 'system_metadata' in fields:
-            self._orig_system_metadata = (dict(self.system_metadata) if
-                                          'system_metadata' in self else {})
+            self._orig_system_metadata = self._metadata_copy(
+                'system_metadata')
         if fields is None or 'metadata' in fields:
-            self._orig_metadata = (dict(self.metadata) if
-                                   'metadata' in self else {})
+            self._orig_metadata = self._metadata_copy('metadata')
 
     def obj_reset_changes(self, fields=None):
         super(Instance, self).obj_reset_changes(fields)
@@ -256,10 +265,13 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
 
     def obj_what_changed(self):
         changes = super(Instance, self).obj_what_changed()
-        if 'metadata' in self and self.metadata != self._orig_metadata:
+        # NOTE: The fields which are not deserialized yet are unchanged.
+        if ('metadata' in self and not self.obj_attr_is_lazy('metadata') and
+                self.metadata != self._orig_metadata):
             changes.add('metadata')
-        if 'system_metadata' in self and (self.system_metadata !=
-                                          self._orig_system_metadata):
+        if ('system_metadata' in self and
+                not self.obj_attr_is_lazy('system_metadata') and
+                self.system_metadata != self._orig_system_metadata):
             changes.add('system_metadata')
         return changes
 
@@ -341,18 +353,24 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
         self.obj_reset_changes(['flavor', 'old_flavor', 'new_flavor'])
 
     @staticmethod
-    def _from_db_object(context, instance, db_inst, expected_attrs=None):
+    def _from_db_object(context, instance, db_inst, expected_attrs=None,
+                        fields=None):
         """Method to help with migration to objects.
 
-        Converts a database entity to a formal object.
+        Converts a database entity to a formal object. If fields is given,
+        only those fields were loaded from the database and the others are
+        left unset.
         """
         instance._context = context
+        instance._projected = fields is not None
         if expected_attrs is None:
             expected_attrs = []
         # Most of the field names match right now, so be quick
         for field in instance.fields:
             if field in INSTANCE_OPTIONAL_ATTRS:
                 continue
+            elif fields is not None and field not in fields:
+                continue
             elif field == 'deleted':
                 instance.deleted = db_inst['deleted'] == db_inst['id']
             elif field == 'cleaned':
@@ -794,6 +812,22 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
         self.fault = objects.InstanceFault.get_latest_for_instance(
             self._context, self.uuid)
 
+    def _load_columns(self):
+        """Load the unset column fields of an instance which was loaded with
+        only some of its fields.
+        """
+        instance = self.__class__.get_by_uuid(self._context, uuid=self.uuid,
+                                              expected_attrs=[])
+        loaded = []
+        for field in self.fields:
+            if (field in INSTANCE_OPTIONAL_ATTRS or
+                    self.obj_attr_is_set(field) or
+                    not instance.obj_attr_is_set(field)):
+                continue
+            self[field] = instance[field]
+            loaded.append(field)
+        self.obj_reset_changes(loaded)
+
     def _load_numa_topology(self, db_topology=None):
         if db_topology is not None:
             self.numa_topology = \
@@ -862,7 +896,10 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
         self.ec2_ids = objects.EC2Ids.get_by_instance(self._context, self)
 
     def obj_load_attr(self, attrname):
-        if attrname not in INSTANCE_OPTIONAL_ATTRS:
+        # NOTE: The column fields can only be lazy-loaded on instances which
+        # were loaded from the database with only some of their fields.
+        if (attrname not in INSTANCE_OPTIONAL_ATTRS and
+                not (self._projected and attrname in self.fields)):
             raise exception.ObjectActionError(
                 action='obj_load_attr',
                 reason='attribute %s not lazy-loadable' % attrname)
@@ -891,6 +928,8 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self._load_ec2_ids()
         elif 'flavor' in attrname:
             self._load_flavor()
+        elif attrname not in INSTANCE_OPTIONAL_ATTRS:
+            self._load_columns()
         else:
             # FIXME(comstud): This should be optimized to only load the attr.
             self._load_generic(attrname)
@@ -987,7 +1026,32 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self._normalize_cell_name()
 
 
-def _make_instance_list(context, inst_list, db_inst_list, expected_attrs):
+def _projected_columns(fields):
+    """Return the columns to load for the given Instance fields.
+
+    The uuid and id are always loaded, so that the other fields can be
+    lazy-loaded.
+    """
+    if fields is None:
+        return None
+    for field in fields:
+        if field in INSTANCE_OPTIONAL_ATTRS or field not in Instance.fields:
+            raise exception.ObjectActionError(
+                action='load',
+                reason='%s is not a column field' % field)
+    columns = set(fields) | set(['id', 'uuid'])
+    # NOTE: The scheduled_at field is not loaded from the database
+    columns.discard('scheduled_at')
+    return sorted(columns)
+
+
+def _columns_kwargs(columns):
+    """Return the DB API keyword arguments restricting the loaded columns."""
+    return {'columns': columns} if columns is not None else {}
+
+
+def _make_instance_list(context, inst_list, db_inst_list, expected_attrs,
+                        fields=None):
     get_fault = expected_attrs and 'fault' in expected_attrs
     inst_faults = {}
     if get_fault:
@@ -1004,10 +1068,11 @@ def _make_instance_list(context, inst_list, db_inst_list, expected_attrs):
     for db_inst in db_inst_list:
         inst_obj = objects.Instance._from_db_object(
                 context, objects.Instance(context), db_inst,
-                expected_attrs=expected_attrs)
+                expected_attrs=expected_attrs, fields=fields)
         if get_fault:
             inst_obj.fault = inst_faults.get(inst_obj.uuid, None)
         inst_list.objects.append(inst_obj)
+    inst_list.projected_fields = fields
     inst_list.obj_reset_changes()
     return inst_list
 
@@ -1035,10 +1100,14 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
     # Version 1.17: Instance <= version 1.20
     # Version 1.18: Instance <= version 1.21
     # Version 1.19: Erronenous removal of get_hung_in_rebooting(). Reverted.
-    VERSION = '1.19'
+    # Version 1.20: Added fields to get_by_filters, get_by_host and
+    #               get_by_host_and_node
+    # Version 1.21: Added projected_fields
+    VERSION = '1.21'
 
     fields = {
         'objects': fields.ListOfObjectsField('Instance'),
+        'projected_fields': fields.ListOfStringsField(nullable=True),
     }
     # NOTE(danms): Instance was at 1.9 before we added this
     obj_relationships = {
@@ -1048,42 +1117,84 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
                     ('1.10', '1.16'), ('1.11', '1.16'), ('1.12', '1.16'),
                     ('1.13', '1.17'), ('1.14', '1.18'), ('1.15', '1.19'),
                     ('1.16', '1.19'), ('1.17', '1.20'), ('1.18', '1.21'),
-                    ('1.19', '1.21')],
+                    ('1.19', '1.21'), ('1.20', '1.21'), ('1.21', '1.21')],
     }
 
+    @classmethod
+    def _obj_from_primitive(cls, context, objver, primitive):
+        self = super(InstanceList, cls)._obj_from_primitive(context, objver,
+                                                            primitive)
+        # NOTE: Instances only know that they were loaded with some of their
+        # fields through the list, which is the object sent over RPC.
+        if (self.obj_attr_is_set('projected_fields') and
+                self.projected_fields is not None):
+            for inst in self.objects:
+                inst._projected = True
+        return self
+
+    def obj_make_compatible(self, primitive, target_version):
+        super(InstanceList, self).obj_make_compatible(primitive,
+                                                      target_version)
+        target_version = utils.convert_version_to_tuple(target_version)
+        if target_version < (1, 21) and 'projected_fields' in primitive:
+            del primitive['projected_fields']
+
+    @staticmethod
+    def get_page_token(instance, sort_keys=None):
+        """Return a page token to use as the marker of get_by_filters().
+
+        The token holds the values of the sort keys of the instance, the
+        next page is queried without looking up the marker instance. It is
+        only valid for the same sort keys.
+        """
+        return db.instance_page_token(instance, sort_keys)
+
+    # NOTE: The fields argument of the get_by_* methods below restricts the
+    # column fields loaded from the database. The instances only have those
+    # fields, their id, their uuid and the expected_attrs set. Their other
+    # fields are lazy-loaded, including when the list was received over RPC
+    # since projected_fields is sent with it.
+
     @base.remotable_classmethod
     def get_by_filters(cls, context, filters,
                        sort_key='created_at', sort_dir='desc', limit=None,
                        marker=None, expected_attrs=None, use_slave=False,
-                       sort_keys=None, sort_dirs=None):
+                       sort_keys=None, sort_dirs=None, fields=None):
+        columns = _projected_columns(fields)
         if sort_keys or sort_dirs:
             db_inst_list = db.instance_get_all_by_filters_sort(
                 context, filters, limit=limit, marker=marker,
                 columns_to_join=_expected_cols(expected_attrs),
-                use_slave=use_slave, sort_keys=sort_keys, sort_dirs=sort_dirs)
+                use_slave=use_slave, sort_keys=sort_keys, sort_dirs=sort_dirs,
+                **_columns_kwargs(columns))
         else:
             db_inst_list = db.instance_get_all_by_filters(
                 context, filters, sort_key, sort_dir, limit=limit,
                 marker=marker, columns_to_join=_expected_cols(expected_attrs),
-                use_slave=use_slave)
+                use_slave=use_slave, **_columns_kwargs(columns))
         return _make_instance_list(context, cls(), db_inst_list,
-                                   expected_attrs)
+                                   expected_attrs, fields=columns)
 
     @base.remotable_classmethod
-    def get_by_host(cls, context, host, expected_attrs=None, use_slave=False):
+    def get_by_host(cls, context, host, expected_attrs=None, use_slave=False,
+                    fields=None):
+        columns = _projected_columns(fields)
         db_inst_list = db.instance_get_all_by_host(
             context, host, columns_to_join=_expected_cols(expected_attrs),
-            use_slave=use_slave)
+            use_slave=use_slave, **_columns_kwargs(columns))
         return _make_instance_list(context, cls(), db_inst_list,
-                                   expected_attrs)
+                                   expected_attrs, fields=columns)
 
     @base.remotable_classmethod
-    def get_by_host_and_node(cls, context, host, node, expected_attrs=None):
+    def get_by_host_and_node(cls, context, host, node, expected_attrs=None,
+                             fields=None):
+        columns = _projected_columns(fields)
         db_inst_list = db.instance_get_all_by_host_and_node(
             context, host, node,
-            columns_to_join=_expected_cols(expected_attrs))
+            columns_to_join=_expected_cols(expected_attrs),
+            **_columns_kwargs(columns))
         return _make_instance_list(context, cls(), db_inst_list,
-                                   expected_attrs)
+                                   expected_attrs, fields=columns)
 
     @base.remotable_classmethod
     def get_by_host_and_not_type(cls, context, host, type_id=None,
@@ -136,6 +136,7 @@ class Quotas(base.NovaObject,
         # doesn't map very well to objects. Since there is quite a bit of
         # logic in the db api layer for this, just pass this through for now.
         db.quota_create(context, project_id, resource, limit, user_id=user_id)
+        quota.LIMIT_CACHE.invalidate(project_id=project_id)
 
     @base.remotable_classmethod
     def update_limit(cls, context, project_id, resource, limit, user_id=None):
@@ -143,6 +144,7 @@ class Quotas(base.NovaObject,
         # doesn't map very well to objects. Since there is quite a bit of
         # logic in the db api layer for this, just pass this through for now.
         db.quota_update(context, project_id, resource, limit, user_id=user_id)
+        quota.LIMIT_CACHE.invalidate(project_id=project_id)
 
 
 @base.NovaObjectRegistry.register
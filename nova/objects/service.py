@@ -13,6 +13,7 @@
 #    under the License.
 
 from oslo_log import log as logging
+from oslo_utils import timeutils
 
 from nova import availability_zones
 from nova import db
@@ -20,6 +21,7 @@ from nova import exception
 from nova import objects
 from nova.objects import base
 from nova.objects import fields
+from nova.servicegroup import heartbeat
 from nova import utils
 
 
@@ -206,7 +208,9 @@ class ServiceList(base.ObjectListBase, base.NovaObject):
     # Version 1.11: Service version 1.13
     # Version 1.12: Service version 1.14
     # Version 1.13: Service version 1.15
-    VERSION = '1.13'
+    # Version 1.14: Added report_heartbeats()
+    # Version 1.15: Added get_by_binary_changed_since()
+    VERSION = '1.15'
 
     fields = {
         'objects': fields.ListOfObjectsField('Service'),
@@ -217,7 +221,8 @@ class ServiceList(base.ObjectListBase, base.NovaObject):
                     ('1.3', '1.5'), ('1.4', '1.6'), ('1.5', '1.7'),
                     ('1.6', '1.8'), ('1.7', '1.9'), ('1.8', '1.10'),
                     ('1.9', '1.11'), ('1.10', '1.12'), ('1.11', '1.13'),
-                    ('1.12', '1.14'), ('1.13', '1.15')],
+                    ('1.12', '1.14'), ('1.13', '1.15'), ('1.14', '1.15'),
+                    ('1.15', '1.15')],
         }
 
     @base.remotable_classmethod
@@ -232,6 +237,29 @@ class ServiceList(base.ObjectListBase, base.NovaObject):
         return base.obj_make_list(context, cls(context), objects.Service,
                                   db_services)
 
+    @base.remotable_classmethod
+    def report_heartbeats(cls, context, service_ids):
+        """Record a heartbeat of the services, written in the next batch."""
+        heartbeat.HEARTBEATS.add(service_ids)
+
+    @base.remotable_classmethod
+    def _get_by_binary_changed_since(cls, context, binary, changed_since):
+        # NOTE: The timestamp is passed as a string primitive for the remote
+        # call.
+        changed_since = timeutils.parse_isotime(changed_since)
+        db_services = db.service_get_all_by_binary_changed_since(
+            context, binary, changed_since)
+        return base.obj_make_list(context, cls(context), objects.Service,
+                                  db_services)
+
+    @classmethod
+    def get_by_binary_changed_since(cls, context, binary, changed_since):
+        """Return the services of a binary created, updated or deleted since
+        a given time, including the disabled and deleted ones.
+        """
+        return cls._get_by_binary_changed_since(
+            context, binary, timeutils.isotime(changed_since))
+
     @base.remotable_classmethod
     def get_by_host(cls, context, host):
         db_services = db.service_get_all_by_host(context, host)
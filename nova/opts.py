@@ -44,6 +44,7 @@ import nova.keymgr.barbican
 import nova.keymgr.conf_key_mgr
 import nova.netconf
 import nova.notifications
+import nova.objects.base
 import nova.objects.network
 import nova.objectstore.s3server
 import nova.paths
@@ -54,6 +55,7 @@ import nova.rdp
 import nova.service
 import nova.servicegroup.api
 import nova.servicegroup.drivers.zk
+import nova.servicegroup.heartbeat
 import nova.spice
 import nova.utils
 import nova.vnc
@@ -90,6 +92,7 @@ def list_opts():
              nova.image.s3.s3_opts,
              nova.netconf.netconf_opts,
              nova.notifications.notify_opts,
+             nova.objects.base.object_opts,
              nova.objects.network.network_opts,
              nova.objectstore.s3server.s3_opts,
              nova.paths.path_opts,
@@ -97,6 +100,7 @@ def list_opts():
              nova.pci.whitelist.pci_opts,
              nova.quota.quota_opts,
              nova.service.service_opts,
+             nova.servicegroup.heartbeat.heartbeat_opts,
              nova.utils.monkey_patch_opts,
              nova.utils.utils_opts,
              nova.vnc.vnc_opts,
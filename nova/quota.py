@@ -17,6 +17,9 @@
 """Quotas for instances, and floating ips."""
 
 import datetime
+import threading
+import time
+import uuid
 
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -28,6 +31,7 @@ from nova import db
 from nova import exception
 from nova.i18n import _LE
 from nova import objects
+from nova.openstack.common import memorycache
 
 LOG = logging.getLogger(__name__)
 
@@ -96,12 +100,184 @@ quota_opts = [
     cfg.StrOpt('quota_driver',
                default='nova.quota.DbQuotaDriver',
                help='Default driver to use for quota checks'),
+    cfg.IntOpt('quota_usage_reconcile_interval',
+               default=-1,
+               help='Interval in seconds between recounts of the quota '
+                    'usages of all the projects by the scheduler. This is '
+                    'how the usages are kept in sync with the '
+                    'nova.quota.CounterQuotaDriver, which ignores '
+                    'until_refresh and max_age. Set to -1 to disable. '
+                    'Setting this to 0 will run at the default rate.'),
+    cfg.FloatOpt('quota_finalize_batch_window',
+                 default=0.0,
+                 help='Number of seconds during which the commits and '
+                      'rollbacks of the quota reservations of one project '
+                      'and user are gathered, to finalize them in a single '
+                      'database transaction. Each caller still waits for '
+                      'that transaction to complete. Set to 0 to finalize '
+                      'each request in its own transaction.'),
+    cfg.IntOpt('quota_limit_cache_ttl',
+               default=0,
+               help='Number of seconds the quota limits of the projects, '
+                    'users and quota classes are cached, instead of being '
+                    'read from the database on every quota check. Limits '
+                    'changed through another API process are seen after at '
+                    'most this delay, unless memcached_servers is set. Set '
+                    'to 0 to disable the cache.'),
     ]
 
 CONF = cfg.CONF
 CONF.register_opts(quota_opts)
 
 
+class _ReservationBatch(object):
+    def __init__(self):
+        self.commit = []
+        self.rollback = []
+        self.done = threading.Event()
+        self.error = None
+
+
+class ReservationFinalizer(object):
+    """Commit and roll back the reservations of one project and user in a
+    single transaction.
+
+    The first caller for a project and user waits for
+    quota_finalize_batch_window seconds, gathering the reservations of the
+    callers arriving meanwhile, then finalizes them all with one
+    db.reservation_finalize() call. Every caller returns once that
+    transaction is committed, or raises its exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Dict of the batches being gathered keyed by (project, user)
+        self._batches = {}
+
+    def finalize(self, context, project_id, user_id, commit=None,
+                 rollback=None):
+        key = (project_id, user_id)
+        with self._lock:
+            batch = self._batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._batches[key] = _ReservationBatch()
+            batch.commit.extend(commit or [])
+            batch.rollback.extend(rollback or [])
+
+        if not leader:
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            return
+
+        time.sleep(CONF.quota_finalize_batch_window)
+        with self._lock:
+            del self._batches[key]
+        try:
+            db.reservation_finalize(context, batch.commit, batch.rollback,
+                                    project_id=project_id, user_id=user_id)
+        except Exception as e:
+            batch.error = e
+            raise
+        finally:
+            batch.done.set()
+
+
+class QuotaLimitCache(object):
+    """Cache of the quota limits read from the database.
+
+    Entries expire after quota_limit_cache_ttl seconds and are dropped by
+    invalidate() when the limits are changed. They are kept by the
+    memorycache client, so they are shared by the processes using the same
+    memcached_servers, and private to each process otherwise.
+    """
+
+    def __init__(self):
+        self._client = None
+
+    def reset(self):
+        self._client = None
+
+    @property
+    def enabled(self):
+        return CONF.quota_limit_cache_ttl > 0
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = memorycache.get_client()
+        return self._client
+
+    @staticmethod
+    def _make_key(*parts):
+        return 'quota-limits-%s' % '-'.join(parts)
+
+    def _get(self, key, load, *args):
+        client = self._get_client()
+        value = client.get(key)
+        if value is None:
+            value = load(*args)
+            client.set(key, value, CONF.quota_limit_cache_ttl)
+        return value
+
+    def _get_project(self, context, project_id):
+        # NOTE: The project entry carries a version, part of the keys of
+        # the entries of its users, so that invalidating a project drops
+        # the limits of all its users too.
+        return self._get(self._make_key('project', project_id),
+                         lambda: (uuid.uuid4().hex,
+                                  db.quota_get_all_by_project(context,
+                                                              project_id)))
+
+    def get_project_limits(self, context, project_id):
+        """Same as db.quota_get_all_by_project()."""
+        if not self.enabled:
+            return db.quota_get_all_by_project(context, project_id)
+        return dict(self._get_project(context, project_id)[1])
+
+    def get_user_limits(self, context, project_id, user_id):
+        """Same as db.quota_get_all_by_project_and_user()."""
+        if not self.enabled:
+            return db.quota_get_all_by_project_and_user(context, project_id,
+                                                        user_id)
+        version = self._get_project(context, project_id)[0]
+        return dict(self._get(self._make_key('user', project_id, user_id,
+                                             version),
+                              db.quota_get_all_by_project_and_user,
+                              context, project_id, user_id))
+
+    def get_class_limits(self, context, quota_class):
+        """Same as db.quota_class_get_all_by_name()."""
+        if not self.enabled:
+            return db.quota_class_get_all_by_name(context, quota_class)
+        return dict(self._get(self._make_key('class', quota_class),
+                              db.quota_class_get_all_by_name,
+                              context, quota_class))
+
+    def get_default_limits(self, context):
+        """Same as db.quota_class_get_default()."""
+        if not self.enabled:
+            return db.quota_class_get_default(context)
+        return dict(self._get(self._make_key('defaults'),
+                              db.quota_class_get_default, context))
+
+    def invalidate(self, project_id=None, quota_class=None):
+        """Drop the cached limits of a project and its users, or of a quota
+        class.
+        """
+        if not self.enabled:
+            return
+        client = self._get_client()
+        if project_id is not None:
+            client.delete(self._make_key('project', project_id))
+        if quota_class is not None:
+            client.delete(self._make_key('class', quota_class))
+            client.delete(self._make_key('defaults'))
+
+
+LIMIT_CACHE = QuotaLimitCache()
+
+
 class DbQuotaDriver(object):
     """Driver to perform necessary checks to enforce quotas and obtain
     quota information.  The default driver utilizes the local
@@ -109,6 +285,9 @@ class DbQuotaDriver(object):
     """
     UNLIMITED_VALUE = -1
 
+    def __init__(self):
+        self._finalizer = ReservationFinalizer()
+
     def get_by_project_and_user(self, context, project_id, user_id, resource):
         """Get a specific quota by project and user."""
 
@@ -134,7 +313,7 @@ class DbQuotaDriver(object):
         """
 
         quotas = {}
-        default_quotas = db.quota_class_get_default(context)
+        default_quotas = LIMIT_CACHE.get_default_limits(context)
         for resource in resources.values():
             quotas[resource.name] = default_quotas.get(resource.name,
                                                        resource.default)
@@ -156,7 +335,7 @@ class DbQuotaDriver(object):
         """
 
         quotas = {}
-        class_quotas = db.quota_class_get_all_by_name(context, quota_class)
+        class_quotas = LIMIT_CACHE.get_class_limits(context, quota_class)
         for resource in resources.values():
             if defaults or resource.name in class_quotas:
                 quotas[resource.name] = class_quotas.get(resource.name,
@@ -175,7 +354,7 @@ class DbQuotaDriver(object):
         if project_id == context.project_id:
             quota_class = context.quota_class
         if quota_class:
-            class_quotas = db.quota_class_get_all_by_name(context, quota_class)
+            class_quotas = LIMIT_CACHE.get_class_limits(context, quota_class)
         else:
             class_quotas = {}
 
@@ -241,11 +420,10 @@ class DbQuotaDriver(object):
         if user_quotas:
             user_quotas = user_quotas.copy()
         else:
-            user_quotas = db.quota_get_all_by_project_and_user(context,
-                                                               project_id,
-                                                               user_id)
+            user_quotas = LIMIT_CACHE.get_user_limits(context, project_id,
+                                                      user_id)
         # Use the project quota for default user quota.
-        proj_quotas = project_quotas or db.quota_get_all_by_project(
+        proj_quotas = project_quotas or LIMIT_CACHE.get_project_limits(
             context, project_id)
         for key, value in six.iteritems(proj_quotas):
             if key not in user_quotas.keys():
@@ -283,7 +461,7 @@ class DbQuotaDriver(object):
                         will be returned.
         :param project_quotas: Quotas dictionary for the specified project.
         """
-        project_quotas = project_quotas or db.quota_get_all_by_project(
+        project_quotas = project_quotas or LIMIT_CACHE.get_project_limits(
             context, project_id)
         project_usages = None
         if usages:
@@ -459,7 +637,7 @@ class DbQuotaDriver(object):
             user_id = context.user_id
 
         # Get the applicable quotas
-        project_quotas = db.quota_get_all_by_project(context, project_id)
+        project_quotas = LIMIT_CACHE.get_project_limits(context, project_id)
         quotas = self._get_quotas(context, resources, values.keys(),
                                   has_sync=False, project_id=project_id,
                                   project_quotas=project_quotas)
@@ -553,7 +731,7 @@ class DbQuotaDriver(object):
         # NOTE(Vek): We're not worried about races at this point.
         #            Yes, the admin may be in the process of reducing
         #            quotas, but that's a pretty rare thing.
-        project_quotas = db.quota_get_all_by_project(context, project_id)
+        project_quotas = LIMIT_CACHE.get_project_limits(context, project_id)
         LOG.debug('Quota limits for project %(project_id)s: '
                   '%(project_quotas)s', {'project_id': project_id,
                                          'project_quotas': project_quotas})
@@ -577,6 +755,11 @@ class DbQuotaDriver(object):
         #            which means access to the session.  Since the
         #            session isn't available outside the DBAPI, we
         #            have to do the work there.
+        return self._reserve(context, resources, quotas, user_quotas, deltas,
+                             expire, project_id, user_id)
+
+    def _reserve(self, context, resources, quotas, user_quotas, deltas,
+                 expire, project_id, user_id):
         return db.quota_reserve(context, resources, quotas, user_quotas,
                                 deltas, expire,
                                 CONF.until_refresh, CONF.max_age,
@@ -602,8 +785,12 @@ class DbQuotaDriver(object):
         if user_id is None:
             user_id = context.user_id
 
-        db.reservation_commit(context, reservations, project_id=project_id,
-                              user_id=user_id)
+        if CONF.quota_finalize_batch_window > 0:
+            self._finalizer.finalize(context, project_id, user_id,
+                                     commit=reservations)
+        else:
+            db.reservation_commit(context, reservations,
+                                  project_id=project_id, user_id=user_id)
 
     def rollback(self, context, reservations, project_id=None, user_id=None):
         """Roll back reservations.
@@ -625,8 +812,12 @@ class DbQuotaDriver(object):
         if user_id is None:
             user_id = context.user_id
 
-        db.reservation_rollback(context, reservations, project_id=project_id,
-                                user_id=user_id)
+        if CONF.quota_finalize_batch_window > 0:
+            self._finalizer.finalize(context, project_id, user_id,
+                                     rollback=reservations)
+        else:
+            db.reservation_rollback(context, reservations,
+                                    project_id=project_id, user_id=user_id)
 
     def usage_reset(self, context, resources):
         """Reset the usage records for a particular user on a list of
@@ -667,6 +858,7 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project_and_user(context, project_id, user_id)
+        LIMIT_CACHE.invalidate(project_id=project_id)
 
     def destroy_all_by_project(self, context, project_id):
         """Destroy all quotas, usages, and reservations associated with a
@@ -677,6 +869,7 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project(context, project_id)
+        LIMIT_CACHE.invalidate(project_id=project_id)
 
     def expire(self, context):
         """Expire reservations.
@@ -689,6 +882,39 @@ class DbQuotaDriver(object):
 
         db.reservation_expire(context)
 
+    def usage_reconcile(self, context, resources):
+        """Recount the usages of all the projects and users.
+
+        :param context: The request context, for access checks.
+        :param resources: A dictionary of the registered resources.
+        """
+
+        db.quota_usage_reconcile(context, resources)
+
+
+class CounterQuotaDriver(DbQuotaDriver):
+    """Driver reserving resources with conditional updates of the usage
+    counters.
+
+    Each usage of the user is checked against the user limit and updated
+    by a single UPDATE statement, then the per-project total of the
+    resource is checked against the project limit the same way. Nothing is
+    read with SELECT ... FOR UPDATE: concurrent reservations of one user
+    serialize on the locks of its usages, and the reservations of the
+    users of a project only on the locks of the project totals. The usages
+    are only refreshed by the reservations when they are created or
+    negative, until_refresh and max_age being ignored: they are recounted
+    with the project totals every quota_usage_reconcile_interval seconds
+    instead.
+    """
+
+    def _reserve(self, context, resources, quotas, user_quotas, deltas,
+                 expire, project_id, user_id):
+        return db.quota_reserve_counters(context, resources, quotas,
+                                         user_quotas, deltas, expire,
+                                         project_id=project_id,
+                                         user_id=user_id)
+
 
 class NoopQuotaDriver(object):
     """Driver that turns quotas calls into no-ops and pretends that quotas
@@ -962,6 +1188,14 @@ class NoopQuotaDriver(object):
         """
         pass
 
+    def usage_reconcile(self, context, resources):
+        """Recount the usages of all the projects and users.
+
+        :param context: The request context, for access checks.
+        :param resources: A dictionary of the registered resources.
+        """
+        pass
+
 
 class BaseResource(object):
     """Describe a single resource for quota checking."""
@@ -1443,6 +1677,14 @@ class QuotaEngine(object):
 
         self._driver.expire(context)
 
+    def usage_reconcile(self, context):
+        """Recount the usages of all the projects and users.
+
+        :param context: The request context, for access checks.
+        """
+
+        self._driver.usage_reconcile(context, self._resources)
+
     @property
     def resources(self):
         return sorted(self._resources.keys())
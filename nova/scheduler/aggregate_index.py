@@ -0,0 +1,109 @@
+# Copyright (c) 2015 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Index of the aggregate metadata of each host.
+
+The HostManager keeps the aggregates of each host in an
+AggregateMetadataIndex and updates it when it is told about aggregate
+changes. Filters then get the merged metadata of a host, or the hosts having
+a given metadata value, without scanning the aggregates again on every
+request.
+"""
+
+import collections
+
+import six
+
+from nova.scheduler.filters import utils
+
+
+class AggregateMetadataIndex(object):
+    """Aggregates of each host and the metadata computed from them.
+
+    The metadata is computed lazily, the first time it is looked up after
+    the aggregates of a host changed.
+    """
+
+    def __init__(self):
+        # Dict of lists of aggregates keyed by host
+        self._aggregates = {}
+        # Dict of dicts of computed values keyed by host, see _get_cached()
+        self._host_cache = collections.defaultdict(dict)
+        # Dict of (hosts with the key, dict of sets of hosts keyed by value)
+        # tuples keyed by metadata key
+        self._hosts_by_key = {}
+
+    def __contains__(self, host):
+        return host in self._aggregates
+
+    def update_host(self, host, aggregates):
+        """Set the aggregates a host belongs to."""
+        self._aggregates[host] = list(aggregates)
+        self._host_cache.pop(host, None)
+        self._hosts_by_key = {}
+
+    def get_aggregates(self, host):
+        return self._aggregates.get(host, [])
+
+    def _get_cached(self, host, cache_key, func, *args):
+        cache = self._host_cache[host]
+        if cache_key not in cache:
+            cache[cache_key] = func(self.get_aggregates(host), *args)
+        return cache[cache_key]
+
+    def metadata_get_by_host(self, host, key=None):
+        """Same as filters.utils.aggregate_metadata_get_by_host()."""
+        metadata = self._get_cached(host, ('metadata', key),
+                                    utils.aggregate_metadata_get, key)
+        return collections.defaultdict(set, metadata)
+
+    def values_from_key(self, host, key_name):
+        """Same as filters.utils.aggregate_values_from_key()."""
+        return self._get_cached(host, ('values', key_name),
+                                utils.aggregate_values_get, key_name)
+
+    def metadata_fingerprint(self, host):
+        """Same as filters.utils.aggregate_metadata_fingerprint()."""
+        return self._get_cached(host, ('fingerprint',),
+                                utils.aggregate_metadata_get_fingerprint)
+
+    def _get_hosts_by_key(self, key):
+        hosts_by_key = self._hosts_by_key.get(key)
+        if hosts_by_key is None:
+            hosts = set()
+            hosts_by_value = collections.defaultdict(set)
+            for host, aggregates in six.iteritems(self._aggregates):
+                for aggr in aggregates:
+                    if key not in aggr.metadata:
+                        continue
+                    hosts.add(host)
+                    for x in aggr.metadata[key].split(','):
+                        hosts_by_value[x.strip()].add(host)
+            hosts_by_key = (hosts, hosts_by_value)
+            self._hosts_by_key[key] = hosts_by_key
+        return hosts_by_key
+
+    def get_hosts_with_key(self, key):
+        """Return the set of hosts belonging to an aggregate with the given
+        metadata key.
+        """
+        return self._get_hosts_by_key(key)[0]
+
+    def get_hosts(self, key, value):
+        """Return the set of hosts belonging to an aggregate with the given
+        metadata value.
+        """
+        return self._get_hosts_by_key(key)[1].get(value, set())
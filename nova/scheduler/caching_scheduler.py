@@ -13,7 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from oslo_config import cfg
+
 from nova.scheduler import filter_scheduler
+from nova.scheduler import shared_cache
+
+CONF = cfg.CONF
 
 
 class CachingScheduler(filter_scheduler.FilterScheduler):
@@ -44,6 +49,10 @@ class CachingScheduler(filter_scheduler.FilterScheduler):
     copy of the cache. So if you run multiple schedulers, you will get
     more retries, because the data stored on any additional scheduler will
     be more out of date, than if it was fetched from the database.
+    Workers running on the same host can reduce this by sharing their
+    claims through the file set by scheduler_shared_cache_file: the
+    resources consumed by one worker are then applied to the cache of the
+    other workers before they process their next request.
 
     In a similar way, if you have a high number of server deletes, the
     extra capacity from those deletes will not show up until the cache is
@@ -53,6 +62,15 @@ class CachingScheduler(filter_scheduler.FilterScheduler):
     def __init__(self, *args, **kwargs):
         super(CachingScheduler, self).__init__(*args, **kwargs)
         self.all_host_states = None
+        self.shared_claims = None
+        if CONF.scheduler_shared_cache_file:
+            self.shared_claims = shared_cache.SharedHostClaims(
+                CONF.scheduler_shared_cache_file,
+                CONF.scheduler_shared_cache_slots)
+        # Dict of the shared claim totals already applied to our cache,
+        # keyed by (host, node)
+        self._seen_claims = {}
+        self._seen_generation = None
 
     def run_periodic_tasks(self, context):
         """Called from a periodic tasks in the manager."""
@@ -69,9 +87,61 @@ class CachingScheduler(filter_scheduler.FilterScheduler):
             # comes in before the first run of the periodic task.
             # Rather than raise an error, we fetch the list of hosts.
             self.all_host_states = self._get_up_hosts(context)
+        elif self.shared_claims is not None:
+            self._apply_shared_claims(self.all_host_states)
 
         return self.all_host_states
 
     def _get_up_hosts(self, context):
         all_hosts_iterator = self.host_manager.get_all_host_states(context)
-        return list(all_hosts_iterator)
+        host_states = list(all_hosts_iterator)
+        if self.shared_claims is not None:
+            # NOTE: freshly loaded host states are expected to already
+            # account for the claims made so far.
+            keys = [(host_state.host, host_state.nodename)
+                    for host_state in host_states]
+            generation, totals = self.shared_claims.get_totals(keys)
+            self._seen_claims = dict(zip(keys, totals))
+            self._seen_generation = generation
+        return host_states
+
+    def _apply_shared_claims(self, host_states):
+        """Consume the resources claimed by the other workers since our
+        last look at the shared claims.
+        """
+        if self.shared_claims.generation == self._seen_generation:
+            return
+        keys = [(host_state.host, host_state.nodename)
+                for host_state in host_states]
+        generation, totals = self.shared_claims.get_totals(keys)
+        for host_state, key, total in zip(host_states, keys, totals):
+            claim = shared_cache.subtract_claims(
+                total, self._seen_claims.get(key, shared_cache.NO_CLAIM))
+            if any(claim):
+                shared_cache.apply_claim(host_state, claim)
+            self._seen_claims[key] = total
+        self._seen_generation = generation
+
+    def _consume_host(self, host_state, instance_properties):
+        if self.shared_claims is None:
+            return super(CachingScheduler, self)._consume_host(
+                host_state, instance_properties)
+
+        before = shared_cache.get_claim_values(host_state)
+        super(CachingScheduler, self)._consume_host(host_state,
+                                                    instance_properties)
+        claim = shared_cache.subtract_claims(
+            shared_cache.get_claim_values(host_state), before)
+        key = (host_state.host, host_state.nodename)
+        total = self.shared_claims.claim(host_state.host,
+                                         host_state.nodename, claim)
+        if total is None:
+            return
+        # Also apply the claims made by the other workers on that host
+        # since we last looked at it
+        seen = self._seen_claims.get(key, shared_cache.NO_CLAIM)
+        unseen = shared_cache.subtract_claims(
+            shared_cache.subtract_claims(total, seen), claim)
+        if any(unseen):
+            shared_cache.apply_claim(host_state, unseen)
+        self._seen_claims[key] = total
@@ -19,6 +19,7 @@ You can customize this scheduler by specifying your own Host Filters and
 Weighing Functions.
 """
 
+import bisect
 import random
 
 from oslo_config import cfg
@@ -30,6 +31,7 @@ from nova.i18n import _
 from nova import rpc
 from nova.scheduler import driver
 from nova.scheduler import scheduler_options
+from nova.scheduler import stats
 
 
 CONF = cfg.CONF
@@ -45,7 +47,14 @@ filter_scheduler_opts = [
                     'chosen from. A value of 1 chooses the '
                     'first host returned by the weighing functions. '
                     'This value must be at least 1. Any value less than 1 '
-                    'will be ignored, and 1 will be used instead')
+                    'will be ignored, and 1 will be used instead'),
+    cfg.BoolOpt('scheduler_batch_placement',
+                default=False,
+                help='When a request asks for several instances, filter and '
+                     'weigh all the hosts only once, then only re-check the '
+                     'host chosen for each instance before placing the next '
+                     'one. Requests for instances of a server group are '
+                     'still filtered once per instance.'),
 ]
 
 CONF.register_opts(filter_scheduler_opts)
@@ -60,6 +69,11 @@ class FilterScheduler(driver.Scheduler):
 
     def select_destinations(self, context, request_spec, filter_properties):
         """Selects a filtered set of hosts and nodes."""
+        with stats.STATS.request_timer('select_destinations'):
+            return self._select_destinations(context, request_spec,
+                                             filter_properties)
+
+    def _select_destinations(self, context, request_spec, filter_properties):
         self.notifier.info(context, 'scheduler.select_destinations.start',
                            dict(request_spec=request_spec))
 
@@ -126,8 +140,13 @@ class FilterScheduler(driver.Scheduler):
         # are being scanned in a filter or weighing function.
         hosts = self._get_all_host_states(elevated)
 
-        selected_hosts = []
         num_instances = request_spec.get('num_instances', 1)
+        if (CONF.scheduler_batch_placement and num_instances > 1 and
+                update_group_hosts is not True):
+            return self._schedule_batch(hosts, filter_properties,
+                                        instance_properties, num_instances)
+
+        selected_hosts = []
         for num in range(num_instances):
             # Filter local hosts based on requirements ...
             hosts = self.host_manager.get_filtered_hosts(hosts,
@@ -138,12 +157,13 @@ class FilterScheduler(driver.Scheduler):
 
             LOG.debug("Filtered %(hosts)s", {'hosts': hosts})
 
+            scheduler_host_subset_size = max(
+                CONF.scheduler_host_subset_size, 1)
             weighed_hosts = self.host_manager.get_weighed_hosts(hosts,
-                    filter_properties)
+                    filter_properties, limit=scheduler_host_subset_size)
 
             LOG.debug("Weighed %(hosts)s", {'hosts': weighed_hosts})
 
-            scheduler_host_subset_size = CONF.scheduler_host_subset_size
             if scheduler_host_subset_size > len(weighed_hosts):
                 scheduler_host_subset_size = len(weighed_hosts)
             if scheduler_host_subset_size < 1:
@@ -156,7 +176,7 @@ class FilterScheduler(driver.Scheduler):
 
             # Now consume the resources so the filter/weights
             # will change for the next instance.
-            chosen_host.obj.consume_from_instance(instance_properties)
+            self._consume_host(chosen_host.obj, instance_properties)
             if update_group_hosts is True:
                 # NOTE(sbauza): Group details are serialized into a list now
                 # that they are populated by the conductor, we need to
@@ -167,6 +187,65 @@ class FilterScheduler(driver.Scheduler):
                 filter_properties['group_hosts'].add(chosen_host.obj.host)
         return selected_hosts
 
+    def _schedule_batch(self, hosts, filter_properties, instance_properties,
+                        num_instances):
+        """Returns a list of hosts for all the instances of a request,
+        filtering and weighing the hosts only once.
+
+        Choosing a host for an instance only changes the state of that host,
+        so it is the only one filtered and weighed again before choosing the
+        host of the next instance.
+        """
+        selected_hosts = []
+        hosts = self.host_manager.get_filtered_hosts(hosts,
+                filter_properties, index=0)
+        if not hosts:
+            return selected_hosts
+
+        LOG.debug("Filtered %(hosts)s", {'hosts': hosts})
+
+        weighed_hosts = self.host_manager.get_weighed_hosts(hosts,
+                filter_properties)
+        # The chosen hosts are weighed again against the same bounds
+        bounds = self.host_manager.get_weight_bounds()
+
+        LOG.debug("Weighed %(hosts)s", {'hosts': weighed_hosts})
+
+        # Negated weights of weighed_hosts, so that it stays sorted in
+        # ascending order for bisect
+        sort_keys = [-weighed_host.weight for weighed_host in weighed_hosts]
+        for num in range(num_instances):
+            if not weighed_hosts:
+                break
+
+            scheduler_host_subset_size = min(
+                max(CONF.scheduler_host_subset_size, 1), len(weighed_hosts))
+            index = random.randrange(scheduler_host_subset_size)
+            chosen_host = weighed_hosts.pop(index)
+            del sort_keys[index]
+            LOG.debug("Selected host: %(host)s", {'host': chosen_host})
+            selected_hosts.append(chosen_host)
+
+            # Now consume the resources so the filter/weights
+            # will change for the next instance.
+            self._consume_host(chosen_host.obj, instance_properties)
+            if num + 1 == num_instances:
+                break
+            if not self.host_manager.get_filtered_hosts([chosen_host.obj],
+                    filter_properties, index=num + 1):
+                continue
+            chosen_host = self.host_manager.get_weighed_host(
+                chosen_host.obj, filter_properties, bounds)
+            index = bisect.bisect_right(sort_keys, -chosen_host.weight)
+            weighed_hosts.insert(index, chosen_host)
+            sort_keys.insert(index, -chosen_host.weight)
+        return selected_hosts
+
+    def _consume_host(self, host_state, instance_properties):
+        """Template method, so a subclass can track the consumed resources.
+        """
+        host_state.consume_from_instance(instance_properties)
+
     def _get_all_host_states(self, context):
         """Template method, so a subclass can implement caching."""
         return self.host_manager.get_all_host_states(context)
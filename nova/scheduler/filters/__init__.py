@@ -17,26 +17,150 @@
 Scheduler host filters
 """
 
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
 from nova import filters
+from nova.i18n import _LI
+from nova.scheduler.filters import utils
+from nova.scheduler import stats
+
+filter_memo_opts = [
+    cfg.IntOpt('scheduler_filter_memo_size',
+               default=1024,
+               help='Number of results remembered by each filter which only '
+                    'depends on static host attributes and on the request, '
+                    'so that identical requests do not evaluate those '
+                    'filters again. 0 disables the memoization.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(filter_memo_opts)
+
+LOG = logging.getLogger(__name__)
 
 
 class BaseHostFilter(filters.BaseFilter):
     """Base class for host filters."""
+
+    # Set to True in a subclass which implements host_columns_passes() so
+    # that it can be evaluated against all hosts at once
+    supports_host_columns = False
+
+    # Set to True in a subclass which implements host_passes_key() so that
+    # the results of host_passes() are memoized
+    memoize_host_passes = False
+
+    # LRU cache of the memoized results, created on first use
+    _host_passes_memo = None
+
     def _filter_one(self, obj, filter_properties):
         """Return True if the object passes the filter, otherwise False."""
+        if self.memoize_host_passes and CONF.scheduler_filter_memo_size > 0:
+            return self._memoized_host_passes(obj, filter_properties)
         return self.host_passes(obj, filter_properties)
 
+    def _memoized_host_passes(self, host_state, filter_properties):
+        key = self.host_passes_key(host_state, filter_properties)
+        if key is None:
+            return self.host_passes(host_state, filter_properties)
+        memo = self._host_passes_memo
+        if memo is None or memo.size != CONF.scheduler_filter_memo_size:
+            memo = utils.LRUCache(CONF.scheduler_filter_memo_size)
+            self._host_passes_memo = memo
+        result = memo.get(key)
+        if result is None:
+            result = self.host_passes(host_state, filter_properties)
+            memo.set(key, result)
+        return result
+
     def host_passes(self, host_state, filter_properties):
         """Return True if the HostState passes the filter, otherwise False.
         Override this in a subclass.
         """
         raise NotImplementedError()
 
+    def host_columns_passes(self, host_columns, filter_properties):
+        """Return a boolean array telling which hosts of a HostColumnsView
+        pass the filter.  Override this in a subclass which sets
+        supports_host_columns.
+        """
+        raise NotImplementedError()
+
+    def host_passes_key(self, host_state, filter_properties):
+        """Return a hashable key of everything host_passes() looks at, or
+        None if the result should not be memoized.  Override this in a
+        subclass which sets memoize_host_passes.
+
+        Two calls of host_passes() with equal keys must return the same
+        result, even for different hosts or requests.
+        """
+        raise NotImplementedError()
+
 
 class HostFilterHandler(filters.BaseFilterHandler):
     def __init__(self):
         super(HostFilterHandler, self).__init__(BaseHostFilter)
 
+    def _record_filter(self, filter_, elapsed, num_in, num_out):
+        stats.STATS.add('filter:%s' % filter_.__class__.__name__, elapsed,
+                        hosts_in=num_in, hosts_out=num_out)
+
+    def get_filtered_objects(self, filters, objs, filter_properties, index=0,
+                             host_columns=None):
+        """Filter HostStates, using the columnar path when possible.
+
+        If host_columns is a HostStateColumns, filters supporting it are
+        evaluated as array operations over all hosts at once while the
+        other filters fall back to filtering host by host.
+        """
+        list_objs = list(objs)
+        view = None
+        if host_columns is not None:
+            view = host_columns.view(list_objs)
+        if view is None:
+            return super(HostFilterHandler, self).get_filtered_objects(
+                filters, list_objs, filter_properties, index)
+
+        list_objs = None
+        LOG.debug("Starting with %d host(s)", len(view))
+        for filter_ in filters:
+            if not filter_.run_filter_for_index(index):
+                continue
+            cls_name = filter_.__class__.__name__
+            start = time.time()
+            if filter_.supports_host_columns:
+                if list_objs is not None:
+                    view = host_columns.view(list_objs)
+                    list_objs = None
+                num_in = len(view)
+                view = view.compress(
+                    filter_.host_columns_passes(view, filter_properties))
+                num_objs = len(view)
+            else:
+                if list_objs is None:
+                    list_objs = view.host_states
+                num_in = len(list_objs)
+                objs = filter_.filter_all(list_objs, filter_properties)
+                if objs is None:
+                    LOG.debug("Filter %s says to stop filtering", cls_name)
+                    return
+                list_objs = list(objs)
+                num_objs = len(list_objs)
+            self._record_filter(filter_, time.time() - start, num_in,
+                                num_objs)
+            if not num_objs:
+                LOG.info(_LI("Filter %s returned 0 hosts"), cls_name)
+                break
+            LOG.debug("Filter %(cls_name)s returned "
+                      "%(obj_len)d host(s)",
+                      {'cls_name': cls_name, 'obj_len': num_objs})
+        if list_objs is None:
+            list_objs = view.host_states
+        return list_objs
+
 
 def all_filters():
     """Return a list of filter classes found in this directory.
@@ -40,6 +40,17 @@ class AggregateImagePropertiesIsolation(filters.BaseHostFilter):
     # Aggregate data and instance type does not change within a request
     run_filter_once_per_request = True
 
+    # The result only depends on the aggregate metadata and the image
+    memoize_host_passes = True
+
+    def host_passes_key(self, host_state, filter_properties):
+        spec = filter_properties.get('request_spec', {})
+        image_props = spec.get('image', {}).get('properties', {})
+        return (utils.aggregate_metadata_fingerprint(host_state),
+                utils.freeze(image_props),
+                CONF.aggregate_image_properties_isolation_namespace,
+                CONF.aggregate_image_properties_isolation_separator)
+
     def host_passes(self, host_state, filter_properties):
         """Checks a host in an aggregate that metadata key/value match
         with image properties.
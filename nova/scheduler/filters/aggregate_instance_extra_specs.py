@@ -33,6 +33,16 @@ class AggregateInstanceExtraSpecsFilter(filters.BaseHostFilter):
     # Aggregate data and instance type does not change within a request
     run_filter_once_per_request = True
 
+    # The result only depends on the aggregate metadata and the extra specs
+    memoize_host_passes = True
+
+    def host_passes_key(self, host_state, filter_properties):
+        instance_type = filter_properties.get('instance_type')
+        if 'extra_specs' not in instance_type:
+            return None
+        return (utils.aggregate_metadata_fingerprint(host_state),
+                utils.freeze(instance_type['extra_specs']))
+
     def host_passes(self, host_state, filter_properties):
         """Return a list of hosts that can create instance_type
 
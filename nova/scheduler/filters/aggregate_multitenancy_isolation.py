@@ -40,6 +40,13 @@ class AggregateMultiTenancyIsolation(filters.BaseHostFilter):
         props = spec.get('instance_properties', {})
         tenant_id = props.get('project_id')
 
+        index = getattr(host_state, 'aggregate_index', None)
+        if index is not None:
+            if (host_state.host not in index.get_hosts_with_key(
+                    'filter_tenant_id') or host_state.host in
+                    index.get_hosts('filter_tenant_id', tenant_id)):
+                return True
+
         metadata = utils.aggregate_metadata_get_by_host(host_state,
                                                         key="filter_tenant_id")
 
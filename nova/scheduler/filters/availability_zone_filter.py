@@ -36,6 +36,8 @@ class AvailabilityZoneFilter(filters.BaseHostFilter):
     # Availability zones do not change within a request
     run_filter_once_per_request = True
 
+    supports_host_columns = True
+
     def host_passes(self, host_state, filter_properties):
         spec = filter_properties.get('request_spec', {})
         props = spec.get('instance_properties', {})
@@ -44,6 +46,17 @@ class AvailabilityZoneFilter(filters.BaseHostFilter):
         if not availability_zone:
             return True
 
+        index = getattr(host_state, 'aggregate_index', None)
+        if index is not None:
+            zone_hosts = index.get_hosts('availability_zone',
+                                              availability_zone)
+            if host_state.host in zone_hosts:
+                return True
+            if (availability_zone == CONF.default_availability_zone and
+                    host_state.host not in index.get_hosts_with_key(
+                        'availability_zone')):
+                return True
+
         metadata = utils.aggregate_metadata_get_by_host(
                 host_state, key='availability_zone')
 
@@ -62,3 +75,16 @@ class AvailabilityZoneFilter(filters.BaseHostFilter):
                        'host_az': host_az})
 
         return hosts_passes
+
+    def host_columns_passes(self, host_columns, filter_properties):
+        spec = filter_properties.get('request_spec', {})
+        props = spec.get('instance_properties', {})
+        availability_zone = props.get('availability_zone')
+
+        if not availability_zone:
+            return host_columns.full_mask(True)
+
+        passes = host_columns.zone_mask(availability_zone)
+        if availability_zone == CONF.default_availability_zone:
+            passes |= host_columns.zone_mask(None)
+        return passes
@@ -34,6 +34,8 @@ class ComputeFilter(filters.BaseHostFilter):
     # Host state does not change within a request
     run_filter_once_per_request = True
 
+    supports_host_columns = True
+
     def host_passes(self, host_state, filter_properties):
         """Returns True for only active compute nodes."""
         service = host_state.service
@@ -48,3 +50,17 @@ class ComputeFilter(filters.BaseHostFilter):
                                 "while"), {'host_state': host_state})
                 return False
         return True
+
+    def host_columns_passes(self, host_columns, filter_properties):
+        """Returns True for only active compute nodes."""
+        passes = ~host_columns.disabled
+        host_states = host_columns.host_states
+        # NOTE: service liveness is owned by the servicegroup driver, so it
+        # still needs to be checked host by host, but only for enabled hosts.
+        for index in passes.nonzero()[0].tolist():
+            host_state = host_states[index]
+            if not self.servicegroup_api.service_is_up(host_state.service):
+                LOG.warning(_LW("%(host_state)s has not been heard from in a "
+                                "while"), {'host_state': host_state})
+                passes[index] = False
+        return passes
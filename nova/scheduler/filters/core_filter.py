@@ -77,9 +77,32 @@ class BaseCoreFilter(filters.BaseHostFilter):
 class CoreFilter(BaseCoreFilter):
     """CoreFilter filters based on CPU core utilization."""
 
+    supports_host_columns = True
+
     def _get_cpu_allocation_ratio(self, host_state, filter_properties):
         return CONF.cpu_allocation_ratio
 
+    def host_columns_passes(self, host_columns, filter_properties):
+        """Return True for hosts having sufficient CPU cores."""
+        instance_type = filter_properties.get('instance_type')
+        if not instance_type:
+            return host_columns.full_mask(True)
+
+        passes = host_columns.vcpus_total == 0
+        if passes.any():
+            # Fail safe
+            LOG.warning(_LW("VCPUs not set; assuming CPU collection broken"))
+
+        vcpus_total = host_columns.vcpus_total * CONF.cpu_allocation_ratio
+        free_vcpus = vcpus_total - host_columns.vcpus_used
+        passes |= free_vcpus >= instance_type['vcpus']
+
+        # Only provide a VCPU limit to compute if the virt driver is reporting
+        # an accurate count of installed VCPUs. (XenServer driver does not)
+        host_columns.set_limits('vcpu', vcpus_total,
+                                passes & (vcpus_total > 0))
+        return passes
+
 
 class AggregateCoreFilter(BaseCoreFilter):
     """AggregateCoreFilter with per-aggregate CPU subscription flag.
@@ -22,6 +22,7 @@ from nova.compute import arch
 from nova.compute import hv_type
 from nova.compute import vm_mode
 from nova.scheduler import filters
+from nova.scheduler.filters import utils as filters_utils
 from nova import utils
 
 
@@ -41,6 +42,21 @@ class ImagePropertiesFilter(filters.BaseHostFilter):
     # a request
     run_filter_once_per_request = True
 
+    # The result only depends on the image and on the hypervisor
+    memoize_host_passes = True
+
+    # Image properties looked at by this filter
+    _IMAGE_PROPS = ('architecture', 'hypervisor_type', 'vm_mode',
+                    'hypervisor_version_requires')
+
+    def host_passes_key(self, host_state, filter_properties):
+        spec = filter_properties.get('request_spec', {})
+        image_props = spec.get('image', {}).get('properties', {})
+        return (tuple(filters_utils.freeze(image_props.get(prop))
+                      for prop in self._IMAGE_PROPS),
+                filters_utils.freeze(host_state.supported_instances),
+                host_state.hypervisor_version)
+
     def _instance_supported(self, host_state, image_props,
                             hypervisor_version):
         img_arch = image_props.get('architecture', None)
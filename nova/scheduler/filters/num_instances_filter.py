@@ -33,6 +33,8 @@ CONF.register_opt(max_instances_per_host_opt)
 class NumInstancesFilter(filters.BaseHostFilter):
     """Filter out hosts with too many instances."""
 
+    supports_host_columns = True
+
     def _get_max_instances_per_host(self, host_state, filter_properties):
         return CONF.max_instances_per_host
 
@@ -48,6 +50,11 @@ class NumInstancesFilter(filters.BaseHostFilter):
                          'max_instances': max_instances})
         return passes
 
+    def host_columns_passes(self, host_columns, filter_properties):
+        """Filter out hosts having max_instances_per_host or more instances.
+        """
+        return host_columns.num_instances < CONF.max_instances_per_host
+
 
 class AggregateNumInstancesFilter(NumInstancesFilter):
     """AggregateNumInstancesFilter with per-aggregate the max num instances.
@@ -56,6 +63,8 @@ class AggregateNumInstancesFilter(NumInstancesFilter):
     found.
     """
 
+    supports_host_columns = False
+
     def _get_max_instances_per_host(self, host_state, filter_properties):
         aggregate_vals = utils.aggregate_values_from_key(
             host_state,
@@ -26,7 +26,16 @@ LOG = logging.getLogger(__name__)
 
 def aggregate_values_from_key(host_state, key_name):
     """Returns a set of values based on a metadata key for a specific host."""
-    aggrlist = host_state.aggregates
+    index = getattr(host_state, 'aggregate_index', None)
+    if index is not None:
+        return index.values_from_key(host_state.host, key_name)
+    return aggregate_values_get(host_state.aggregates, key_name)
+
+
+def aggregate_values_get(aggrlist, key_name):
+    """Returns a set of values based on a metadata key for a list of
+    aggregates.
+    """
     return {aggr.metadata[key_name]
               for aggr in aggrlist
               if key_name in aggr.metadata
@@ -37,7 +46,16 @@ def aggregate_metadata_get_by_host(host_state, key=None):
     """Returns a dict of all metadata based on a metadata key for a specific
     host. If the key is not provided, returns a dict of all metadata.
     """
-    aggrlist = host_state.aggregates
+    index = getattr(host_state, 'aggregate_index', None)
+    if index is not None:
+        return index.metadata_get_by_host(host_state.host, key)
+    return aggregate_metadata_get(host_state.aggregates, key)
+
+
+def aggregate_metadata_get(aggrlist, key=None):
+    """Returns a dict of all metadata based on a metadata key for a list of
+    aggregates. If the key is not provided, returns a dict of all metadata.
+    """
     metadata = collections.defaultdict(set)
     for aggr in aggrlist:
         if key is None or key in aggr.metadata:
@@ -46,6 +64,61 @@ def aggregate_metadata_get_by_host(host_state, key=None):
     return metadata
 
 
+def aggregate_metadata_fingerprint(host_state):
+    """Returns a hashable value which only depends on the metadata of the
+    aggregates of a host, so that two hosts with the same fingerprint get
+    the same result from aggregate_metadata_get_by_host().
+    """
+    index = getattr(host_state, 'aggregate_index', None)
+    if index is not None:
+        return index.metadata_fingerprint(host_state.host)
+    return aggregate_metadata_get_fingerprint(host_state.aggregates)
+
+
+def aggregate_metadata_get_fingerprint(aggrlist):
+    """Returns the metadata fingerprint of a list of aggregates."""
+    return frozenset((k, v) for aggr in aggrlist
+                     for k, v in aggr.metadata.items())
+
+
+def freeze(value):
+    """Returns a hashable copy of a structure of dicts, lists and sets."""
+    if isinstance(value, dict):
+        return frozenset((k, freeze(v)) for k, v in six.iteritems(value))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    return value
+
+
+class LRUCache(object):
+    """Mapping holding at most size items, dropping the least recently used
+    one when full.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._items = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            return default
+        self._items[key] = value
+        return value
+
+    def set(self, key, value):
+        self._items.pop(key, None)
+        self._items[key] = value
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+
 def validate_num_values(vals, default=None, cast_to=int, based_on=min):
     """Returns a correctly casted value based on a set of values.
 
@@ -0,0 +1,137 @@
+# Copyright (c) 2015 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Columnar view of HostStates used for vectorized filtering.
+
+The HostManager can keep the numeric resources of all of its HostStates in
+a set of NumPy arrays, one array per resource. Filters which only compare
+those resources against the request can then evaluate every host with a
+single array operation instead of one Python call per host.
+"""
+
+import collections
+
+from oslo_utils import importutils
+
+from nova.scheduler.filters import utils
+
+numpy = importutils.try_import('numpy')
+
+
+class HostStateColumns(object):
+    """Per-resource arrays for a list of HostStates.
+
+    Each HostState gets a back-reference to this object and its row index so
+    that consume_from_instance() can keep the arrays in sync with the
+    HostState attributes.
+    """
+
+    # HostState attributes mirrored in the arrays
+    FIELDS = ('free_ram_mb', 'total_usable_ram_mb', 'free_disk_mb',
+              'total_usable_disk_gb', 'vcpus_total', 'vcpus_used',
+              'num_io_ops', 'num_instances')
+
+    def __init__(self, host_states):
+        self.host_states = list(host_states)
+        size = len(self.host_states)
+        for field in self.FIELDS:
+            setattr(self, field, numpy.zeros(size, dtype=numpy.float64))
+        self.disabled = numpy.zeros(size, dtype=bool)
+        # Dict of row indexes keyed by availability zone name
+        self._zone_rows = collections.defaultdict(list)
+        for index, host_state in enumerate(self.host_states):
+            host_state.host_columns = self
+            host_state.host_columns_index = index
+            self.update_row(index)
+            self.disabled[index] = bool(
+                getattr(host_state, 'service', {}).get('disabled'))
+            metadata = utils.aggregate_metadata_get_by_host(
+                host_state, key='availability_zone')
+            zones = metadata.get('availability_zone') or [None]
+            for zone in zones:
+                self._zone_rows[zone].append(index)
+
+    def update_row(self, index):
+        """Copy the resources of the index-th HostState into the arrays."""
+        host_state = self.host_states[index]
+        for field in self.FIELDS:
+            getattr(self, field)[index] = getattr(host_state, field)
+
+    def zone_mask(self, zone):
+        """Return a boolean array of the hosts belonging to a zone."""
+        mask = numpy.zeros(len(self.host_states), dtype=bool)
+        rows = self._zone_rows.get(zone)
+        if rows:
+            mask[rows] = True
+        return mask
+
+    def view(self, host_states):
+        """Return a HostColumnsView restricted to the given HostStates.
+
+        Returns None if any of the HostStates is not tracked by this object.
+        """
+        rows = []
+        for host_state in host_states:
+            if getattr(host_state, 'host_columns', None) is not self:
+                return None
+            rows.append(host_state.host_columns_index)
+        return HostColumnsView(self, numpy.array(rows, dtype=numpy.intp))
+
+
+class HostColumnsView(object):
+    """Subset of the rows of a HostStateColumns.
+
+    Filters evaluate against a view and return a boolean mask with one entry
+    per row of the view.
+    """
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+        for field in columns.FIELDS:
+            setattr(self, field, getattr(columns, field)[rows])
+        self.disabled = columns.disabled[rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def host_states(self):
+        host_states = self.columns.host_states
+        return [host_states[row] for row in self.rows.tolist()]
+
+    def full_mask(self, value):
+        """Return a boolean mask with every host of this view set to value.
+        """
+        return numpy.full(len(self.rows), value, dtype=bool)
+
+    def zone_mask(self, zone):
+        """Return a boolean mask of the hosts of this view in a zone.
+
+        Hosts without any availability zone are in the None zone.
+        """
+        return self.columns.zone_mask(zone)[self.rows]
+
+    def compress(self, mask):
+        """Return a new view holding only the rows selected by mask."""
+        return HostColumnsView(self.columns, self.rows[mask])
+
+    def set_limits(self, key, values, mask):
+        """Store per-host oversubscription limits for the selected rows."""
+        host_states = self.columns.host_states
+        for row, value in zip(self.rows[mask].tolist(),
+                              values[mask].tolist()):
+            host_states[row].limits[key] = value
@@ -18,6 +18,7 @@ Manage hosts in the current zone.
 """
 
 import collections
+import datetime
 import time
 try:
     from collections import UserDict as IterableUserDict   # Python 3
@@ -39,7 +40,10 @@ from nova import exception
 from nova.i18n import _, _LI, _LW
 from nova import objects
 from nova.pci import stats as pci_stats
+from nova.scheduler import aggregate_index
 from nova.scheduler import filters
+from nova.scheduler import host_columns
+from nova.scheduler import stats
 from nova.scheduler import weights
 from nova import utils
 from nova.virt import hardware
@@ -71,6 +75,22 @@ host_manager_opts = [
                default=True,
                help='Determines if the Scheduler tracks changes to instances '
                     'to help with its filtering decisions.'),
+    cfg.BoolOpt('scheduler_use_host_columns',
+                default=False,
+                help='Keep the resources of all hosts in NumPy arrays so '
+                     'that the core resource filters can evaluate every host '
+                     'in a single operation. Other filters fall back to '
+                     'checking hosts one by one. Requires NumPy.'),
+    cfg.BoolOpt('scheduler_incremental_host_refresh',
+                default=False,
+                help='Only reload the compute nodes and services which '
+                     'changed since the previous refresh of the host states '
+                     'instead of reloading all of them for each request.'),
+    cfg.IntOpt('scheduler_full_host_refresh_interval',
+               default=300,
+               help='Interval in seconds between two full reloads of the '
+                  'host states when scheduler_incremental_host_refresh is '
+                  'enabled.'),
 ]
 
 CONF = cfg.CONF
@@ -78,6 +98,9 @@ CONF.register_opts(host_manager_opts)
 
 LOG = logging.getLogger(__name__)
 HOST_INSTANCE_SEMAPHORE = "host_instance"
+# Seconds by which incremental refreshes overlap, so that rows committed
+# while the previous refresh was running are not missed.
+HOST_REFRESH_OVERLAP = 5
 
 
 class ReadOnlyDict(IterableUserDict):
@@ -111,6 +134,33 @@ MetricItem = collections.namedtuple(
              'MetricItem', ['value', 'timestamp', 'source'])
 
 
+class InstanceView(object):
+    """The fields of an instance used by the scheduler filters.
+
+    The HostManager keeps one of these for every instance of the cloud in
+    _instance_info, instead of a full Instance object.
+    """
+
+    FIELDS = ('uuid', 'host', 'instance_type_id')
+    __slots__ = FIELDS
+
+    def __init__(self, uuid, host=None, instance_type_id=None):
+        self.uuid = uuid
+        self.host = host
+        self.instance_type_id = instance_type_id
+
+    @classmethod
+    def from_instance(cls, instance):
+        # Only read the fields which are set, so that no lazy-load happens
+        values = {field: getattr(instance, field) for field in cls.FIELDS
+                  if instance.obj_attr_is_set(field)}
+        return cls(**values)
+
+    def __repr__(self):
+        return ("InstanceView(uuid=%r, host=%r, instance_type_id=%r)" %
+                (self.uuid, self.host, self.instance_type_id))
+
+
 class HostState(object):
     """Mutable and immutable information tracked for a host.
     This is an attempt to remove the ad-hoc data structures
@@ -153,10 +203,18 @@ class HostState(object):
 
         # List of aggregates the host belongs to
         self.aggregates = []
+        # AggregateMetadataIndex of the HostManager, used by the filters to
+        # look up the metadata of the aggregates
+        self.aggregate_index = None
 
         # Instances on this host
         self.instances = {}
 
+        # HostStateColumns tracking this host, if any, and the row of this
+        # host in it
+        self.host_columns = None
+        self.host_columns_index = None
+
         self.updated = None
         if compute:
             self.update_from_compute_node(compute)
@@ -300,6 +358,9 @@ class HostState(object):
                 task_states.RESCUING]:
             self.num_io_ops += 1
 
+        if self.host_columns is not None:
+            self.host_columns.update_row(self.host_columns_index)
+
     def __repr__(self):
         return ("(%s, %s) ram:%s disk:%s io_ops:%s instances:%s" %
                 (self.host, self.nodename, self.free_ram_mb, self.free_disk_mb,
@@ -325,11 +386,26 @@ class HostManager(object):
         weigher_classes = self.weight_handler.get_matching_classes(
                 CONF.scheduler_weight_classes)
         self.weighers = [cls() for cls in weigher_classes]
+        self.use_host_columns = CONF.scheduler_use_host_columns
+        if self.use_host_columns and host_columns.numpy is None:
+            LOG.warning(_LW("scheduler_use_host_columns is set but NumPy "
+                            "is not installed, host filters will be run "
+                            "host by host."))
+            self.use_host_columns = False
+        self.host_columns = None
+        self.incremental_host_refresh = CONF.scheduler_incremental_host_refresh
+        # Dict of nova-compute services keyed by their host
+        self._service_refs = {}
+        self._last_refresh = None
+        self._last_full_refresh = None
         # Dict of aggregates keyed by their ID
         self.aggs_by_id = {}
         # Dict of set of aggregate IDs keyed by the name of the host belonging
         # to those aggregates
         self.host_aggregates_map = collections.defaultdict(set)
+        # Aggregates and aggregate metadata of each host, kept in sync with
+        # host_aggregates_map
+        self.aggregate_index = aggregate_index.AggregateMetadataIndex()
         self._init_aggregates()
         self.tracks_instance_changes = CONF.scheduler_tracks_instance_changes
         # Dict of instances and status, keyed by host
@@ -347,6 +423,13 @@ class HostManager(object):
             self.aggs_by_id[agg.id] = agg
             for host in agg.hosts:
                 self.host_aggregates_map[host].add(agg.id)
+        for host in self.host_aggregates_map:
+            self._index_host_aggregates(host)
+
+    def _index_host_aggregates(self, host):
+        self.aggregate_index.update_host(
+            host, [self.aggs_by_id[agg_id] for agg_id in
+                   self.host_aggregates_map[host]])
 
     def update_aggregates(self, aggregates):
         """Updates internal HostManager information about aggregates."""
@@ -358,6 +441,7 @@ class HostManager(object):
 
     def _update_aggregate(self, aggregate):
         self.aggs_by_id[aggregate.id] = aggregate
+        changed_hosts = set(aggregate.hosts)
         for host in aggregate.hosts:
             self.host_aggregates_map[host].add(aggregate.id)
         # Refreshing the mapping dict to remove all hosts that are no longer
@@ -366,6 +450,9 @@ class HostManager(object):
             if (aggregate.id in self.host_aggregates_map[host]
                     and host not in aggregate.hosts):
                 self.host_aggregates_map[host].remove(aggregate.id)
+                changed_hosts.add(host)
+        for host in changed_hosts:
+            self._index_host_aggregates(host)
 
     def delete_aggregate(self, aggregate):
         """Deletes internal HostManager information about a specific aggregate.
@@ -375,6 +462,7 @@ class HostManager(object):
         for host in aggregate.hosts:
             if aggregate.id in self.host_aggregates_map[host]:
                 self.host_aggregates_map[host].remove(aggregate.id)
+            self._index_host_aggregates(host)
 
     def _init_instance_info(self):
         """Creates the initial view of instances for all hosts.
@@ -402,12 +490,15 @@ class HostManager(object):
                 end_node += batch_size
                 filters = {"host": [curr_node.host
                                     for curr_node in curr_nodes]}
-                result = objects.InstanceList.get_by_filters(context,
-                                                             filters)
+                # Only load the fields needed by the filters
+                result = objects.InstanceList.get_by_filters(
+                    context, filters, expected_attrs=[],
+                    fields=InstanceView.FIELDS)
                 instances = result.objects
                 LOG.debug("Adding %s instances for hosts %s-%s",
                           len(instances), start_node, end_node)
                 for instance in instances:
+                    instance = InstanceView.from_instance(instance)
                     host = instance.host
                     if host not in self._instance_info:
                         self._instance_info[host] = {"instances": {},
@@ -520,24 +611,104 @@ class HostManager(object):
             hosts = six.itervalues(name_to_cls_map)
 
         return self.filter_handler.get_filtered_objects(filters,
-                hosts, filter_properties, index)
+                hosts, filter_properties, index,
+                host_columns=self.host_columns)
 
-    def get_weighed_hosts(self, hosts, weight_properties):
-        """Weigh the hosts."""
+    def get_weighed_hosts(self, hosts, weight_properties, limit=None):
+        """Weigh the hosts.
+
+        If limit is set, only the limit best weighed hosts are returned.
+        """
+        if self.host_columns is not None:
+            return self.weight_handler.get_weighed_objects(self.weighers,
+                    hosts, weight_properties, limit=limit,
+                    host_columns=self.host_columns)
         return self.weight_handler.get_weighed_objects(self.weighers,
-                hosts, weight_properties)
+                hosts, weight_properties, limit=limit)
+
+    def get_weight_bounds(self):
+        """Return the weight bounds recorded by the last get_weighed_hosts().
+        """
+        return self.weight_handler.get_weight_bounds(self.weighers)
+
+    def get_weighed_host(self, host, weight_properties, bounds):
+        """Weigh a single host against the hosts weighed previously.
+
+        bounds are the get_weight_bounds() taken after weighing them.
+        """
+        return self.weight_handler.get_weighed_object(self.weighers,
+                host, weight_properties, bounds)
 
+    @stats.timed('host_manager:get_all_host_states')
     def get_all_host_states(self, context):
         """Returns a list of HostStates that represents all the hosts
         the HostManager knows about. Also, each of the consumable resources
         in HostState are pre-populated and adjusted based on data in the db.
         """
+        now = timeutils.utcnow()
+        if self._needs_full_refresh():
+            self._refresh_all_host_states(context)
+            self._last_full_refresh = now
+        else:
+            changed_since = self._last_refresh - datetime.timedelta(
+                seconds=HOST_REFRESH_OVERLAP)
+            self._refresh_changed_host_states(context, changed_since)
+        self._last_refresh = now
+
+        for host_state in six.itervalues(self.host_state_map):
+            # We force to update the aggregates info each time a new request
+            # comes in, because some changes on the aggregates could have been
+            # happening after setting this field for the first time. The index
+            # is kept up to date by update_aggregates() and delete_aggregate()
+            # so this is only a lookup.
+            if host_state.host not in self.aggregate_index:
+                self._index_host_aggregates(host_state.host)
+            host_state.aggregates = self.aggregate_index.get_aggregates(
+                host_state.host)
+            host_state.aggregate_index = self.aggregate_index
+            host_state.update_service(
+                dict(self._service_refs[host_state.host]))
+            self._add_instance_info(context, host_state)
+
+        if self.use_host_columns:
+            self.host_columns = host_columns.HostStateColumns(
+                six.itervalues(self.host_state_map))
 
-        service_refs = {service.host: service
-                        for service in objects.ServiceList.get_by_binary(
-                            context, 'nova-compute')}
-        # Get resource usage across the available compute nodes:
-        compute_nodes = objects.ComputeNodeList.get_all(context)
+        return six.itervalues(self.host_state_map)
+
+    def _needs_full_refresh(self):
+        if not self.incremental_host_refresh or self._last_refresh is None:
+            return True
+        return timeutils.is_older_than(
+            self._last_full_refresh,
+            CONF.scheduler_full_host_refresh_interval)
+
+    def _update_host_state(self, compute):
+        host = compute.host
+        node = compute.hypervisor_hostname
+        state_key = (host, node)
+        host_state = self.host_state_map.get(state_key)
+        if host_state:
+            host_state.update_from_compute_node(compute)
+        else:
+            host_state = self.host_state_cls(host, node, compute=compute)
+            self.host_state_map[state_key] = host_state
+        return state_key
+
+    def _remove_host_state(self, state_key):
+        host, node = state_key
+        LOG.info(_LI("Removing dead compute node %(host)s:%(node)s "
+                     "from scheduler"), {'host': host, 'node': node})
+        del self.host_state_map[state_key]
+
+    def _refresh_all_host_states(self, context):
+        """Reload every compute node and nova-compute service."""
+        with stats.STATS.db_timer():
+            service_refs = {service.host: service
+                            for service in objects.ServiceList.get_by_binary(
+                                context, 'nova-compute')}
+            # Get resource usage across the available compute nodes:
+            compute_nodes = objects.ComputeNodeList.get_all(context)
         seen_nodes = set()
         for compute in compute_nodes:
             service = service_refs.get(compute.host)
@@ -547,36 +718,69 @@ class HostManager(object):
                     "No compute service record found for host %(host)s"),
                     {'host': compute.host})
                 continue
-            host = compute.host
-            node = compute.hypervisor_hostname
-            state_key = (host, node)
-            host_state = self.host_state_map.get(state_key)
-            if host_state:
-                host_state.update_from_compute_node(compute)
-            else:
-                host_state = self.host_state_cls(host, node, compute=compute)
-                self.host_state_map[state_key] = host_state
-            # We force to update the aggregates info each time a new request
-            # comes in, because some changes on the aggregates could have been
-            # happening after setting this field for the first time
-            host_state.aggregates = [self.aggs_by_id[agg_id] for agg_id in
-                                     self.host_aggregates_map[
-                                         host_state.host]]
-            host_state.update_service(dict(service))
-            self._add_instance_info(context, compute, host_state)
-            seen_nodes.add(state_key)
+            seen_nodes.add(self._update_host_state(compute))
+        self._service_refs = service_refs
 
         # remove compute nodes from host_state_map if they are not active
         dead_nodes = set(self.host_state_map.keys()) - seen_nodes
         for state_key in dead_nodes:
-            host, node = state_key
-            LOG.info(_LI("Removing dead compute node %(host)s:%(node)s "
-                         "from scheduler"), {'host': host, 'node': node})
-            del self.host_state_map[state_key]
+            self._remove_host_state(state_key)
+
+    def _refresh_changed_host_states(self, context, changed_since):
+        """Only reload the compute nodes and nova-compute services which were
+        created, updated or deleted since the given time.
+
+        Resources consumed locally by consume_from_instance() on a node that
+        did not change are kept until the node reports again, exactly as a
+        full refresh keeps them: update_from_compute_node() ignores records
+        older than the last local claim. Any report newer than that claim is
+        newer than the previous refresh too, so it is picked up here and
+        reverts the claim.
+        """
+        new_hosts = set()
+        with stats.STATS.db_timer():
+            services = objects.ServiceList.get_by_binary_changed_since(
+                context, 'nova-compute', changed_since)
+            compute_nodes = list(
+                objects.ComputeNodeList.get_all_changed_since(
+                    context, changed_since))
+        for service in services:
+            if service.deleted or service.disabled:
+                self._service_refs.pop(service.host, None)
+            else:
+                if service.host not in self._service_refs:
+                    new_hosts.add(service.host)
+                self._service_refs[service.host] = service
+
+        # The compute nodes of a newly enabled service may not have changed
+        for host in new_hosts:
+            try:
+                with stats.STATS.db_timer():
+                    compute_nodes.extend(
+                        objects.ComputeNodeList.get_all_by_host(context,
+                                                                host))
+            except exception.ComputeHostNotFound:
+                pass
 
-        return six.itervalues(self.host_state_map)
+        for compute in compute_nodes:
+            if compute.deleted:
+                state_key = (compute.host, compute.hypervisor_hostname)
+                if state_key in self.host_state_map:
+                    self._remove_host_state(state_key)
+            elif compute.host not in self._service_refs:
+                LOG.warning(_LW(
+                    "No compute service record found for host %(host)s"),
+                    {'host': compute.host})
+            else:
+                self._update_host_state(compute)
+
+        # remove compute nodes whose service is gone or disabled
+        for state_key in list(self.host_state_map.keys()):
+            if state_key[0] not in self._service_refs:
+                self._remove_host_state(state_key)
 
-    def _add_instance_info(self, context, compute, host_state):
+    @stats.timed('host_manager:_add_instance_info')
+    def _add_instance_info(self, context, host_state):
         """Adds the host instance info to the host_state object.
 
         Some older compute nodes may not be sending instance change updates to
@@ -586,13 +790,16 @@ class HostManager(object):
         In those cases, we need to grab the current InstanceList instead of
         relying on the version in _instance_info.
         """
-        host_name = compute.host
+        host_name = host_state.host
         host_info = self._instance_info.get(host_name)
         if host_info and host_info.get("updated"):
             inst_dict = host_info["instances"]
         else:
             # Host is running old version, or updates aren't flowing.
-            inst_list = objects.InstanceList.get_by_host(context, host_name)
+            with stats.STATS.db_timer():
+                inst_list = objects.InstanceList.get_by_host(
+                    context, host_name, expected_attrs=[],
+                    fields=InstanceView.FIELDS)
             inst_dict = {instance.uuid: instance
                          for instance in inst_list.objects}
         host_state.instances = inst_dict
@@ -601,8 +808,10 @@ class HostManager(object):
         """Get the InstanceList for the specified host, and store it in the
         _instance_info dict.
         """
-        instances = objects.InstanceList.get_by_host(context, host_name)
-        inst_dict = {instance.uuid: instance for instance in instances}
+        instances = objects.InstanceList.get_by_host(
+            context, host_name, expected_attrs=[], fields=InstanceView.FIELDS)
+        inst_dict = {instance.uuid: InstanceView.from_instance(instance)
+                     for instance in instances}
         host_info = self._instance_info[host_name] = {}
         host_info["instances"] = inst_dict
         host_info["updated"] = False
@@ -620,15 +829,17 @@ class HostManager(object):
             inst_dict = host_info.get("instances")
             for instance in instance_info.objects:
                 # Overwrite the entry (if any) with the new info.
-                inst_dict[instance.uuid] = instance
+                inst_dict[instance.uuid] = InstanceView.from_instance(
+                    instance)
             host_info["updated"] = True
         else:
             instances = instance_info.objects
             if len(instances) > 1:
                 # This is a host sending its full instance list, so use it.
                 host_info = self._instance_info[host_name] = {}
-                host_info["instances"] = {instance.uuid: instance
-                                          for instance in instances}
+                host_info["instances"] = {
+                    instance.uuid: InstanceView.from_instance(instance)
+                    for instance in instances}
                 host_info["updated"] = True
             else:
                 self._recreate_instance_info(context, host_name)
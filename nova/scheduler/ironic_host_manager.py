@@ -95,6 +95,9 @@ class IronicNodeState(host_manager.HostState):
         # NOTE(sbauza): Objects are UTC tz-aware by default
         self.updated = now.replace(tzinfo=iso8601.iso8601.Utc())
 
+        if self.host_columns is not None:
+            self.host_columns.update_row(self.host_columns_index)
+
 
 class IronicHostManager(host_manager.HostManager):
     """Ironic HostManager class."""
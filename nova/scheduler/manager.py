@@ -30,6 +30,7 @@ from nova import exception
 from nova import manager
 from nova import objects
 from nova import quota
+from nova.scheduler import stats
 
 
 LOG = logging.getLogger(__name__)
@@ -48,6 +49,7 @@ scheduler_driver_opts = [
 ]
 CONF = cfg.CONF
 CONF.register_opts(scheduler_driver_opts)
+CONF.import_opt('quota_usage_reconcile_interval', 'nova.quota')
 
 QUOTAS = quota.QUOTAS
 
@@ -55,7 +57,7 @@ QUOTAS = quota.QUOTAS
 class SchedulerManager(manager.Manager):
     """Chooses a host to run instances on."""
 
-    target = messaging.Target(version='4.2')
+    target = messaging.Target(version='4.3')
 
     def __init__(self, scheduler_driver=None, *args, **kwargs):
         if not scheduler_driver:
@@ -69,6 +71,11 @@ class SchedulerManager(manager.Manager):
     def _expire_reservations(self, context):
         QUOTAS.expire(context)
 
+    @periodic_task.periodic_task(
+        spacing=CONF.quota_usage_reconcile_interval)
+    def _reconcile_quota_usages(self, context):
+        QUOTAS.usage_reconcile(context)
+
     @periodic_task.periodic_task(spacing=CONF.scheduler_driver_task_period,
                                  run_immediately=True)
     def _run_periodic_tasks(self, context):
@@ -126,6 +133,15 @@ class SchedulerManager(manager.Manager):
         self.driver.host_manager.sync_instance_info(context, host_name,
                                                     instance_uuids)
 
+    def get_stats(self, context, reset=False):
+        """Returns the timing statistics recorded by this scheduler, see
+        nova.scheduler.stats.
+        """
+        result = stats.STATS.to_dict()
+        if reset:
+            stats.STATS.reset()
+        return result
+
 
 class _SchedulerManagerV3Proxy(object):
 
@@ -0,0 +1,187 @@
+# Copyright (c) 2015 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Host claims shared between the scheduler workers running on the same host.
+
+The claims are stored in an mmap-backed file as a fixed size hash table with
+one slot per compute node. Each slot holds the running totals of the
+resources claimed on that compute node by all the workers. A worker compares
+those totals with the ones it already applied to its own HostStates to find
+out about the claims made by its siblings.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+
+import iso8601
+from oslo_concurrency import lockutils
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import timeutils
+from six.moves import range
+
+from nova.i18n import _LW
+
+shared_cache_opts = [
+    cfg.StrOpt('scheduler_shared_cache_file',
+               help='Path of a file used by the CachingScheduler workers '
+                    'running on the same host to share the resources they '
+                    'claim, so that a host chosen by one worker is seen as '
+                    'consumed by the others right away. If unset, each '
+                    'worker keeps its own private cache.'),
+    cfg.IntOpt('scheduler_shared_cache_slots',
+               default=65536,
+               help='Maximum number of compute nodes which can be tracked '
+                    'in the shared scheduler cache file.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(shared_cache_opts)
+
+LOG = logging.getLogger(__name__)
+
+SHARED_CACHE_LOCK = 'scheduler-shared-cache'
+
+# Resources tracked for each compute node, in the order they are stored
+CLAIM_FIELDS = ('memory_mb', 'disk_mb', 'vcpus', 'num_instances',
+                'num_io_ops')
+NO_CLAIM = (0,) * len(CLAIM_FIELDS)
+
+# The header holds a generation number bumped for every claim
+_HEADER = struct.Struct('=q')
+# A slot holds the digest of the compute node name and the claimed resources
+_SLOT = struct.Struct('=16s%dq' % len(CLAIM_FIELDS))
+_EMPTY_KEY = b'\0' * 16
+
+
+def get_claim_values(host_state):
+    """Return the values of a HostState changed by consume_from_instance(),
+    in CLAIM_FIELDS order.
+    """
+    return (-host_state.free_ram_mb, -host_state.free_disk_mb,
+            host_state.vcpus_used, host_state.num_instances,
+            host_state.num_io_ops)
+
+
+def apply_claim(host_state, claim):
+    """Consume the resources of a claim made by another worker."""
+    memory_mb, disk_mb, vcpus, num_instances, num_io_ops = claim
+    host_state.free_ram_mb -= memory_mb
+    host_state.free_disk_mb -= disk_mb
+    host_state.vcpus_used += vcpus
+    host_state.num_instances += num_instances
+    host_state.num_io_ops += num_io_ops
+
+    now = timeutils.utcnow()
+    # NOTE(sbauza): Objects are UTC tz-aware by default
+    host_state.updated = now.replace(tzinfo=iso8601.iso8601.Utc())
+    if host_state.host_columns is not None:
+        host_state.host_columns.update_row(host_state.host_columns_index)
+
+
+def subtract_claims(claim1, claim2):
+    return tuple(x - y for x, y in zip(claim1, claim2))
+
+
+class SharedHostClaims(object):
+    """Running totals of the resources claimed on each compute node by all
+    the scheduler workers sharing a file.
+    """
+
+    def __init__(self, path, slots):
+        self.slots = slots
+        size = _HEADER.size + slots * _SLOT.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with self._lock():
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        # Dict of slot offsets keyed by compute node digest
+        self._offsets = {}
+
+    @staticmethod
+    def _lock():
+        return lockutils.lock(SHARED_CACHE_LOCK, lock_file_prefix='nova-',
+                              external=True)
+
+    @staticmethod
+    def _digest(host, node):
+        key = u'%s\0%s' % (host, node)
+        return hashlib.md5(key.encode('utf-8')).digest()
+
+    def _find_slot(self, digest, create=False):
+        """Return the offset of the slot of a compute node, or None."""
+        offset = self._offsets.get(digest)
+        if offset is not None:
+            return offset
+        start = struct.unpack_from('=Q', digest)[0] % self.slots
+        for probe in range(self.slots):
+            offset = (_HEADER.size +
+                      ((start + probe) % self.slots) * _SLOT.size)
+            slot_key = self._map[offset:offset + len(_EMPTY_KEY)]
+            if slot_key == digest:
+                self._offsets[digest] = offset
+                return offset
+            if slot_key == _EMPTY_KEY:
+                if not create:
+                    return None
+                _SLOT.pack_into(self._map, offset, digest, *NO_CLAIM)
+                self._offsets[digest] = offset
+                return offset
+        LOG.warning(_LW("The shared scheduler cache is full, raise "
+                        "scheduler_shared_cache_slots."))
+        return None
+
+    @property
+    def generation(self):
+        return _HEADER.unpack_from(self._map, 0)[0]
+
+    def claim(self, host, node, claim):
+        """Add a claim to the totals of a compute node.
+
+        Returns the new totals of the compute node.
+        """
+        digest = self._digest(host, node)
+        with self._lock():
+            offset = self._find_slot(digest, create=True)
+            if offset is None:
+                return None
+            totals = _SLOT.unpack_from(self._map, offset)[1:]
+            totals = tuple(x + y for x, y in zip(totals, claim))
+            _SLOT.pack_into(self._map, offset, digest, *totals)
+            _HEADER.pack_into(self._map, 0, self.generation + 1)
+        return totals
+
+    def get_totals(self, keys):
+        """Return the generation and the claim totals of a list of
+        (host, node) tuples.
+        """
+        digests = [self._digest(host, node) for host, node in keys]
+        totals = []
+        with self._lock():
+            generation = self.generation
+            for digest in digests:
+                offset = self._find_slot(digest)
+                if offset is None:
+                    totals.append(NO_CLAIM)
+                else:
+                    totals.append(_SLOT.unpack_from(self._map, offset)[1:])
+        return generation, totals
@@ -0,0 +1,158 @@
+# Copyright (c) 2015 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Timing statistics of the scheduler hot path.
+
+The scheduler records how long each filter, each weigher and the main
+HostManager steps take, with the number of hosts going in and out of each
+filter. For each select_destinations() call, the time spent waiting for the
+database is recorded separately from the CPU time. The statistics can be
+fetched with "nova-manage scheduler stats".
+"""
+
+import bisect
+import collections
+import contextlib
+import functools
+import threading
+import time
+
+from oslo_config import cfg
+import six
+
+stats_opts = [
+    cfg.BoolOpt('scheduler_collect_stats',
+                default=True,
+                help='Record the time spent in each scheduler filter, '
+                     'weigher and host manager step. The statistics are '
+                     'shown by "nova-manage scheduler stats".'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(stats_opts)
+
+if hasattr(time, 'process_time'):
+    _cpu_time = time.process_time
+else:
+    _cpu_time = time.clock
+
+
+class Histogram(object):
+    """Distribution of the durations, in seconds, of an operation."""
+
+    # Upper bounds of the buckets, the last bucket has no upper bound
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.hosts_in = 0
+        self.hosts_out = 0
+
+    def add(self, elapsed):
+        self.counts[bisect.bisect_left(self.BUCKETS, elapsed)] += 1
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def to_dict(self):
+        bounds = list(self.BUCKETS) + [None]
+        return {'count': self.count,
+                'total': self.total,
+                'max': self.max,
+                'hosts_in': self.hosts_in,
+                'hosts_out': self.hosts_out,
+                'buckets': [[bound, count] for bound, count
+                            in zip(bounds, self.counts)]}
+
+
+class SchedulerStats(object):
+    """Histograms of the scheduler operations keyed by name.
+
+    Filters are recorded as "filter:<class name>", weighers as
+    "weigher:<class name>". A request timed with request_timer() also gets
+    "<name>:db" and "<name>:cpu" histograms, holding the part of its duration
+    spent in db_timer() blocks and the CPU time of the process.
+    """
+
+    def __init__(self):
+        self._histograms = collections.defaultdict(Histogram)
+        # Database time of the request being run by the current thread
+        self._local = threading.local()
+
+    def reset(self):
+        self._histograms.clear()
+
+    def add(self, name, elapsed, hosts_in=0, hosts_out=0):
+        if not CONF.scheduler_collect_stats:
+            return
+        histogram = self._histograms[name]
+        histogram.add(elapsed)
+        histogram.hosts_in += hosts_in
+        histogram.hosts_out += hosts_out
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - start)
+
+    @contextlib.contextmanager
+    def db_timer(self):
+        """Time a database access, accounting it in the current request."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            self.add('db', elapsed)
+            self._local.db_time = (getattr(self._local, 'db_time', 0.0) +
+                                   elapsed)
+
+    @contextlib.contextmanager
+    def request_timer(self, name):
+        self._local.db_time = 0.0
+        start = time.time()
+        cpu_start = _cpu_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - start)
+            self.add(name + ':cpu', _cpu_time() - cpu_start)
+            self.add(name + ':db', self._local.db_time)
+
+    def to_dict(self):
+        return {name: histogram.to_dict()
+                for name, histogram in six.iteritems(self._histograms)}
+
+
+STATS = SchedulerStats()
+
+
+def timed(name):
+    """Decorator recording the duration of each call of a function."""
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with STATS.timer(name):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -17,8 +17,15 @@
 Scheduler host weights
 """
 
+import time
+
+from oslo_utils import importutils
+
+from nova.scheduler import stats
 from nova import weights
 
+numpy = importutils.try_import('numpy')
+
 
 class WeighedHost(weights.WeighedObject):
     def to_dict(self):
@@ -33,7 +40,17 @@ class WeighedHost(weights.WeighedObject):
 
 class BaseHostWeigher(weights.BaseWeigher):
     """Base class for host weights."""
-    pass
+
+    # Set to True in a subclass which implements host_columns_weights() so
+    # that it can weigh all hosts at once
+    supports_host_columns = False
+
+    def host_columns_weights(self, host_columns, weight_properties):
+        """Return an array with the raw weight of every host of a
+        HostColumnsView.  Override this in a subclass which sets
+        supports_host_columns.
+        """
+        raise NotImplementedError()
 
 
 class HostWeightHandler(weights.BaseWeightHandler):
@@ -42,6 +59,78 @@ class HostWeightHandler(weights.BaseWeightHandler):
     def __init__(self):
         super(HostWeightHandler, self).__init__(BaseHostWeigher)
 
+    def _record_weigher(self, weigher, elapsed, num_objs):
+        stats.STATS.add('weigher:%s' % weigher.__class__.__name__, elapsed,
+                        hosts_in=num_objs, hosts_out=num_objs)
+
+    def get_weighed_objects(self, weighers, obj_list, weighing_properties,
+                            limit=None, host_columns=None):
+        """Return a sorted (descending), normalized list of WeighedHosts.
+
+        If host_columns is a HostStateColumns, the weights of all hosts are
+        computed, normalized and summed as array operations and only the
+        returned hosts are wrapped into WeighedHosts.
+        """
+        obj_list = list(obj_list)
+        view = None
+        if host_columns is not None and len(obj_list) > 1:
+            view = host_columns.view(obj_list)
+        if view is None:
+            return super(HostWeightHandler, self).get_weighed_objects(
+                weighers, obj_list, weighing_properties, limit=limit)
+
+        total = numpy.zeros(len(view))
+        weighed_objs = None
+        for weigher in weighers:
+            start = time.time()
+            if weigher.supports_host_columns:
+                raw = numpy.asarray(
+                    weigher.host_columns_weights(view, weighing_properties),
+                    dtype=numpy.float64)
+            else:
+                if weighed_objs is None:
+                    weighed_objs = [self.object_class(obj, 0.0)
+                                    for obj in view.host_states]
+                raw = numpy.array(
+                    weigher.weigh_objects(weighed_objs, weighing_properties),
+                    dtype=numpy.float64)
+
+            # Record the min and max values the same way weigh_objects()
+            # does, keeping the ones set by the weigher if lower/higher
+            minval = raw.min()
+            maxval = raw.max()
+            if weigher.minval is None or minval < weigher.minval:
+                weigher.minval = minval
+            if weigher.maxval is None or maxval > weigher.maxval:
+                weigher.maxval = maxval
+
+            # Normalize the weights
+            minval = float(weigher.minval)
+            maxval = float(weigher.maxval)
+            if minval != maxval:
+                total += (weigher.weight_multiplier() *
+                          ((raw - minval) / (maxval - minval)))
+            self._record_weigher(weigher, time.time() - start, len(view))
+
+        # Keep the order of obj_list for equal weights like sorted() does.
+        scores = -total
+        if limit is not None and 0 < limit < len(scores):
+            # Only sort the winners: argpartition() finds the limit-th
+            # score, the winners are the hosts scoring better and the first
+            # ones tied with it.
+            kth = scores[numpy.argpartition(scores, limit - 1)[limit - 1]]
+            better = numpy.flatnonzero(scores < kth)
+            tied = numpy.flatnonzero(scores == kth)[:limit - len(better)]
+            order = numpy.sort(numpy.concatenate((better, tied)))
+            order = order[numpy.argsort(scores[order], kind='mergesort')]
+        else:
+            order = numpy.argsort(scores, kind='mergesort')[:limit]
+
+        host_states = view.host_states
+        return [self.object_class(host_states[index], weight)
+                for index, weight in zip(order.tolist(),
+                                         total[order].tolist())]
+
 
 def all_weighers():
     """Return a list of weight plugin classes found in this directory."""
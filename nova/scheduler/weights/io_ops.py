@@ -39,6 +39,7 @@ CONF.register_opts(io_ops_weight_opts)
 
 class IoOpsWeigher(weights.BaseHostWeigher):
     minval = 0
+    supports_host_columns = True
 
     def weight_multiplier(self):
         """Override the weight multiplier."""
@@ -49,3 +50,9 @@ class IoOpsWeigher(weights.BaseHostWeigher):
         to be the default.
         """
         return host_state.num_io_ops
+
+    def host_columns_weights(self, host_columns, weight_properties):
+        """Higher weights win. We want to choose light workload host
+        to be the default.
+        """
+        return host_columns.num_io_ops
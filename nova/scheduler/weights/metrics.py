@@ -68,6 +68,8 @@ CONF.register_opts(metrics_weight_opts, group='metrics')
 
 
 class MetricsWeigher(weights.BaseHostWeigher):
+    supports_host_columns = True
+
     def __init__(self):
         self._parse_setting()
 
@@ -102,3 +104,9 @@ class MetricsWeigher(weights.BaseHostWeigher):
                         return CONF.metrics.weight_of_unavailable
 
         return value
+
+    def host_columns_weights(self, host_columns, weight_properties):
+        # NOTE: metrics are not part of the host columns, but weighing them
+        # here still avoids building a WeighedHost for every host.
+        return [self._weigh_object(host_state, weight_properties)
+                for host_state in host_columns.host_states]
@@ -93,6 +93,24 @@ class API(object):
 
         return self._driver.is_up(member)
 
+    def get_up_map(self, members):
+        """Check in bulk which of the given members are up.
+
+        Returns a dict of the liveness of the members, keyed by their
+        (host, binary) pair. The driver answers with as few round trips to
+        its backend as it can, instead of one per member.
+        """
+        up_map = {}
+        members_to_check = []
+        for member in members:
+            if member.get('forced_down'):
+                up_map[(member['host'], member['binary'])] = False
+            else:
+                members_to_check.append(member)
+        if members_to_check:
+            up_map.update(self._driver.get_up_map(members_to_check))
+        return up_map
+
     def get_all(self, group_id):
         """Returns ALL members of the given group."""
         LOG.debug('Returns ALL members of the [%s] '
@@ -27,3 +27,13 @@ class Driver(object):
     def is_up(self, member):
         """Check whether the given member is up."""
         raise NotImplementedError()
+
+    def get_up_map(self, members):
+        """Check whether each of the given members is up.
+
+        Returns a dict of booleans keyed by the (host, binary) pair of the
+        members. Drivers able to check several members at once override
+        this.
+        """
+        return {(member['host'], member['binary']): self.is_up(member)
+                for member in members}
@@ -18,13 +18,17 @@ from oslo_log import log as logging
 from oslo_utils import timeutils
 import six
 
+from nova import context
 from nova.i18n import _, _LE
+from nova import objects
 from nova.servicegroup import api
 from nova.servicegroup.drivers import base
 
 
 CONF = cfg.CONF
 CONF.import_opt('service_down_time', 'nova.service')
+CONF.import_opt('servicegroup_heartbeat_batching',
+                'nova.servicegroup.heartbeat')
 
 LOG = logging.getLogger(__name__)
 
@@ -57,6 +61,19 @@ class DbDriver(base.Driver):
         """Moved from nova.utils
         Check whether a service is up based on last heartbeat.
         """
+        return self._is_up(service_ref, timeutils.utcnow())
+
+    def get_up_map(self, service_refs):
+        """Check whether each of the given services is up.
+
+        All the heartbeats are compared with the same current time.
+        """
+        now = timeutils.utcnow()
+        return {(service_ref['host'], service_ref['binary']):
+                self._is_up(service_ref, now)
+                for service_ref in service_refs}
+
+    def _is_up(self, service_ref, now):
         # Keep checking 'updated_at' if 'last_seen_up' isn't set.
         # Should be able to use only 'last_seen_up' in the M release
         last_heartbeat = (service_ref.get('last_seen_up') or
@@ -71,7 +88,7 @@ class DbDriver(base.Driver):
             # below does not (and will fail)
             last_heartbeat = last_heartbeat.replace(tzinfo=None)
         # Timestamps in DB are UTC.
-        elapsed = timeutils.delta_seconds(last_heartbeat, timeutils.utcnow())
+        elapsed = timeutils.delta_seconds(last_heartbeat, now)
         is_up = abs(elapsed) <= self.service_down_time
         if not is_up:
             LOG.debug('Seems service is down. Last heartbeat was %(lhb)s. '
@@ -82,8 +99,14 @@ class DbDriver(base.Driver):
     def _report_state(self, service):
         """Update the state of this service in the datastore."""
         try:
-            service.service_ref.report_count += 1
-            service.service_ref.save()
+            if CONF.servicegroup_heartbeat_batching:
+                # The heartbeat is written with the ones of the other
+                # services, by this process or by the conductor.
+                objects.ServiceList.report_heartbeats(
+                    context.get_admin_context(), [service.service_ref.id])
+            else:
+                service.service_ref.report_count += 1
+                service.service_ref.save()
 
             # TODO(termie): make this pattern be more elegant.
             if getattr(service, 'model_disconnected', False):
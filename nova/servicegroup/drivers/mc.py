@@ -69,6 +69,20 @@ class MemcachedDriver(base.Driver):
 
         return is_up
 
+    def get_up_map(self, service_refs):
+        """Check whether each of the given services is up.
+
+        The heartbeats of all the services are fetched with one get_multi
+        request.
+        """
+        keys = {}
+        for service_ref in service_refs:
+            key = str("%(topic)s:%(host)s" % service_ref)
+            keys[key] = (service_ref['host'], service_ref['binary'])
+        found = self.mc.get_multi(list(keys))
+        return {member: found.get(key) is not None
+                for key, member in keys.items()}
+
     def _report_state(self, service):
         """Update the state of this service in the datastore."""
         try:
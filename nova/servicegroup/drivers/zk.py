@@ -140,6 +140,22 @@ class ZooKeeperDriver(base.Driver):
         all_members = self._get_all(group_id)
         return member_id in all_members
 
+    def get_up_map(self, service_refs):
+        """Check whether each of the given services is up.
+
+        The members of each group are listed once, whatever the number of
+        services of that group.
+        """
+        group_members = {}
+        up_map = {}
+        for service_ref in service_refs:
+            group_id = service_ref['topic']
+            if group_id not in group_members:
+                group_members[group_id] = set(self._get_all(group_id))
+            up_map[(service_ref['host'], service_ref['binary'])] = (
+                service_ref['host'] in group_members[group_id])
+        return up_map
+
     def _get_all(self, group_id):
         """Return all members in a list, or a ServiceGroupUnavailable
         exception.
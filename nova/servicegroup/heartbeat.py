@@ -0,0 +1,107 @@
+# Copyright (c) 2015 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Aggregation of the service heartbeats of the DB servicegroup driver.
+
+Instead of saving its Service record at each report_interval, a service
+hands its heartbeat to a HeartbeatBuffer, either directly or through the
+conductor for the services without database access. The buffer records the
+pending heartbeats of all the services of the process and writes them with
+a single UPDATE of the services table every heartbeat_flush_interval.
+"""
+
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from nova import context as nova_context
+from nova import db
+from nova.i18n import _LE
+from nova import utils
+
+heartbeat_opts = [
+    cfg.BoolOpt('servicegroup_heartbeat_batching',
+                default=False,
+                help='Aggregate the heartbeats of the services using the db '
+                     'servicegroup driver and write them with one update '
+                     'per heartbeat_flush_interval. The heartbeats of the '
+                     'services without database access are aggregated by '
+                     'the conductor, which must be upgraded first.'),
+    cfg.FloatOpt('heartbeat_flush_interval',
+                 default=2.0,
+                 help='Seconds between two writes of the aggregated '
+                      'heartbeats. Must be well below service_down_time.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(heartbeat_opts)
+
+LOG = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer(object):
+    """Pending heartbeats of services, flushed in one database update."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._running = False
+
+    def add(self, service_ids):
+        """Record a heartbeat for each of the given service ids.
+
+        The heartbeats are written by a greenthread started on the first
+        call, at most heartbeat_flush_interval seconds later.
+        """
+        with self._lock:
+            self._pending.update(service_ids)
+            if self._running:
+                return
+            self._running = True
+        utils.spawn_n(self._run)
+
+    def flush(self):
+        """Write the pending heartbeats, returning the number of services."""
+        with self._lock:
+            service_ids, self._pending = self._pending, set()
+        if not service_ids:
+            return 0
+        try:
+            db.service_heartbeat(nova_context.get_admin_context(),
+                                 sorted(service_ids))
+        except Exception:
+            LOG.exception(_LE('Failed to write the heartbeats of %d '
+                              'services'), len(service_ids))
+            # Keep them for the next flush, the services are reported down
+            # only if the database stays unreachable for service_down_time.
+            with self._lock:
+                self._pending.update(service_ids)
+            return 0
+        return len(service_ids)
+
+    def _run(self):
+        while True:
+            time.sleep(CONF.heartbeat_flush_interval)
+            self.flush()
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+
+
+HEARTBEATS = HeartbeatBuffer()
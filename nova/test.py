@@ -44,6 +44,7 @@ from oslotest import moxstubout
 import six
 import testtools
 
+from nova import availability_zones
 from nova import context
 from nova import db
 from nova.network import manager as network_manager
@@ -251,6 +252,10 @@ class TestCase(testtools.TestCase):
         # caching of that value.
         utils._IS_NEUTRON = None
 
+        # NOTE: The availability zone index is global, reset it to not see
+        # the zones of the aggregates of other tests.
+        availability_zones.reset_cache()
+
         mox_fixture = self.useFixture(moxstubout.MoxStubout())
         self.mox = mox_fixture.mox
         self.stubs = mox_fixture.stubs
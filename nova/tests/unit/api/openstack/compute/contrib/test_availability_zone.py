@@ -80,8 +80,10 @@ def fake_service_get_all(context, disabled=None):
                                "fake_host-2", False)]
 
 
-def fake_service_is_up(self, service):
-    return service['binary'] != u"nova-network"
+def fake_get_up_map(self, services):
+    return {(service['host'], service['binary']):
+            service['binary'] != u"nova-network"
+            for service in services}
 
 
 def fake_set_availability_zones(context, services):
@@ -104,7 +106,7 @@ class AvailabilityZoneApiTestV21(test.NoDBTestCase):
         self.stubs.Set(db, 'service_get_all', fake_service_get_all)
         self.stubs.Set(availability_zones, 'set_availability_zones',
                        fake_set_availability_zones)
-        self.stubs.Set(servicegroup.API, 'service_is_up', fake_service_is_up)
+        self.stubs.Set(servicegroup.API, 'get_up_map', fake_get_up_map)
         self.controller = self.availability_zone.AvailabilityZoneController()
         self.req = fakes.HTTPRequest.blank('')
 
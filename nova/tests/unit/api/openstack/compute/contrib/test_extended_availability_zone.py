@@ -64,12 +64,13 @@ def fake_compute_get_all(*args, **kwargs):
                                             db_list, fields)
 
 
-def fake_get_host_availability_zone(context, host):
-    return host
+def fake_get_instances_availability_zones(context, instances):
+    return {instance['host']: instance['host'] for instance in instances
+            if instance['host']}
 
 
-def fake_get_no_host_availability_zone(context, host):
-    return None
+def fake_get_no_instances_availability_zones(context, instances):
+    return {}
 
 
 class ExtendedAvailabilityZoneTestV21(test.TestCase):
@@ -83,8 +84,9 @@ class ExtendedAvailabilityZoneTestV21(test.TestCase):
         fakes.stub_out_nw_api(self.stubs)
         self.stubs.Set(compute.api.API, 'get', fake_compute_get)
         self.stubs.Set(compute.api.API, 'get_all', fake_compute_get_all)
-        self.stubs.Set(availability_zones, 'get_host_availability_zone',
-                       fake_get_host_availability_zone)
+        self.stubs.Set(availability_zones,
+                       'get_instances_availability_zones',
+                       fake_get_instances_availability_zones)
         return_server = fakes.fake_instance_get()
         self.stubs.Set(db, 'instance_get_by_uuid', return_server)
 
@@ -107,8 +109,9 @@ class ExtendedAvailabilityZoneTestV21(test.TestCase):
 
     def test_show_no_host_az(self):
         self.stubs.Set(compute.api.API, 'get', fake_compute_get_az)
-        self.stubs.Set(availability_zones, 'get_host_availability_zone',
-                       fake_get_no_host_availability_zone)
+        self.stubs.Set(availability_zones,
+                       'get_instances_availability_zones',
+                       fake_get_no_instances_availability_zones)
 
         url = self.base_url + UUID3
         res = self._make_request(url)
@@ -118,8 +121,9 @@ class ExtendedAvailabilityZoneTestV21(test.TestCase):
 
     def test_show_empty_host_az(self):
         self.stubs.Set(compute.api.API, 'get', fake_compute_get_empty)
-        self.stubs.Set(availability_zones, 'get_host_availability_zone',
-                       fake_get_no_host_availability_zone)
+        self.stubs.Set(availability_zones,
+                       'get_instances_availability_zones',
+                       fake_get_no_instances_availability_zones)
 
         url = self.base_url + UUID3
         res = self._make_request(url)
@@ -543,10 +543,10 @@ class ServicesTestV21(test.TestCase):
     # This test is just to verify that the servicegroup API gets used when
     # calling the API
     def test_services_with_exception(self):
-        def dummy_is_up(self, dummy):
+        def dummy_get_up_map(self, dummy):
             raise KeyError()
 
-        self.stubs.Set(db_driver.DbDriver, 'is_up', dummy_is_up)
+        self.stubs.Set(db_driver.DbDriver, 'get_up_map', dummy_get_up_map)
         req = FakeRequestWithHostService()
         self.assertRaises(self.service_is_up_exc, self.controller.index, req)
 
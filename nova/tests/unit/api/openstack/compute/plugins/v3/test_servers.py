@@ -618,6 +618,23 @@ class ServersControllerTest(ControllerTest):
                            'marker': [fakes.get_fake_uuid(2)]}
         self.assertThat(params, matchers.DictMatches(expected_params))
 
+    @mock.patch('nova.db.instance_page_token', return_value='page.token')
+    def test_get_servers_with_limit_page_token(self, mock_token):
+        self.flags(osapi_server_page_tokens=True)
+        req = self.req('/servers?limit=3&sort_key=display_name')
+        res_dict = self.controller.index(req)
+
+        servers_links = res_dict['servers_links']
+        href_parts = urlparse.urlparse(servers_links[0]['href'])
+        params = urlparse.parse_qs(href_parts.query)
+        expected_params = {'limit': ['3'],
+                           'sort_key': ['display_name'],
+                           'marker': ['page.token']}
+        self.assertThat(params, matchers.DictMatches(expected_params))
+        instance = mock_token.call_args[0][0]
+        self.assertEqual(fakes.get_fake_uuid(2), instance['uuid'])
+        mock_token.assert_called_once_with(instance, ['display_name'])
+
     def test_get_servers_with_limit_bad_value(self):
         req = self.req('/servers?limit=aaa')
         self.assertRaises(webob.exc.HTTPBadRequest,
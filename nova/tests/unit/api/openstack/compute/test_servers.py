@@ -555,6 +555,23 @@ class ServersControllerTest(ControllerTest):
                            'marker': [fakes.get_fake_uuid(2)]}
         self.assertThat(params, matchers.DictMatches(expected_params))
 
+    @mock.patch('nova.db.instance_page_token', return_value='page.token')
+    def test_get_servers_with_limit_page_token_no_sort_ext(self, mock_token):
+        # The sort parameters are ignored without os-server-sort-keys, the
+        # page token must be built for the default sort keys.
+        self.flags(osapi_server_page_tokens=True)
+        req = fakes.HTTPRequest.blank(
+            '/fake/servers?limit=3&sort_key=display_name')
+        res_dict = self.controller.index(req)
+
+        servers_links = res_dict['servers_links']
+        href_parts = urlparse.urlparse(servers_links[0]['href'])
+        params = urlparse.parse_qs(href_parts.query)
+        self.assertEqual(['page.token'], params['marker'])
+        instance = mock_token.call_args[0][0]
+        self.assertEqual(fakes.get_fake_uuid(2), instance['uuid'])
+        mock_token.assert_called_once_with(instance, None)
+
     def test_get_servers_with_limit_bad_value(self):
         req = fakes.HTTPRequest.blank('/fake/servers?limit=aaa')
         self.assertRaises(webob.exc.HTTPBadRequest,
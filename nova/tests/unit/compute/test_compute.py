@@ -6337,6 +6337,49 @@ class ComputeTestCase(BaseTestCase):
     def test_heal_instance_info_cache_with_exception(self):
         self._heal_instance_info_cache(_get_instance_nw_info_raise=True)
 
+    def test_heal_instance_info_cache_batch(self):
+        self.flags(heal_instance_info_cache_interval=-1,
+                   heal_instance_info_cache_batch_size=3)
+        ctxt = context.get_admin_context()
+
+        instance_map = {}
+        instances = []
+        for x in range(6):
+            inst_uuid = 'fake-uuid-%s' % x
+            instance_map[inst_uuid] = fake_instance.fake_db_instance(
+                uuid=inst_uuid, host=CONF.host, created_at=None)
+            instances.append(instance_map[inst_uuid])
+        # Make an instance appear to be still Building
+        instances[0]['vm_state'] = vm_states.BUILDING
+
+        def fake_instance_get_all_by_host(context, host,
+                                          columns_to_join, use_slave=False):
+            return instances[:]
+
+        def fake_instance_get_by_uuid(context, instance_uuid,
+                                      columns_to_join, use_slave=False):
+            return instance_map[instance_uuid]
+
+        healed = []
+
+        def fake_get_instances_nw_info(context, instances):
+            healed.append([instance.uuid for instance in instances])
+            return {}
+
+        self.stubs.Set(db, 'instance_get_all_by_host',
+                fake_instance_get_all_by_host)
+        self.stubs.Set(db, 'instance_get_by_uuid',
+                fake_instance_get_by_uuid)
+        self.stubs.Set(self.compute.network_api, 'get_instances_nw_info',
+                fake_get_instances_nw_info)
+
+        self.compute._heal_instance_info_cache(ctxt)
+        self.assertEqual([['fake-uuid-1', 'fake-uuid-2', 'fake-uuid-3']],
+                         healed)
+        self.compute._heal_instance_info_cache(ctxt)
+        self.assertEqual(['fake-uuid-4', 'fake-uuid-5'], healed[1])
+        self.assertEqual(0, len(self.compute._instance_uuids_to_heal))
+
     @mock.patch('nova.objects.InstanceList.get_by_filters')
     @mock.patch('nova.compute.api.API.unrescue')
     def test_poll_rescued_instances(self, unrescue, get):
@@ -10178,7 +10221,8 @@ class ComputeAPIAggrTestCase(BaseTestCase):
         fake_notifier.NOTIFICATIONS = []
         self.api.update_aggregate(self.context, aggr['id'],
                                          {'name': 'new_fake_aggregate'})
-        self.assertIsNone(availability_zones._get_cache().get('cache'))
+        self.assertIsNone(availability_zones._get_cache().get(
+            availability_zones.AZ_CACHE_KEY))
         self.assertEqual(len(fake_notifier.NOTIFICATIONS), 2)
         msg = fake_notifier.NOTIFICATIONS[0]
         self.assertEqual(msg.event_type,
@@ -10283,10 +10327,14 @@ class ComputeAPIAggrTestCase(BaseTestCase):
                     'foo_key2': 'foo_value2',
                     'availability_zone': 'fake_zone'}
         fake_notifier.NOTIFICATIONS = []
-        availability_zones._get_cache().add('fake_key', 'fake_value')
+        availability_zones.INDEX.get_hosts_availability_zones(self.context,
+                                                              ['fake_host'])
+        self.assertIsNotNone(availability_zones._get_cache().get(
+            availability_zones.AZ_CACHE_KEY))
         aggr = self.api.update_aggregate_metadata(self.context, aggr['id'],
                                                   metadata)
-        self.assertIsNone(availability_zones._get_cache().get('fake_key'))
+        self.assertIsNone(availability_zones._get_cache().get(
+            availability_zones.AZ_CACHE_KEY))
         self.assertEqual(len(fake_notifier.NOTIFICATIONS), 2)
         msg = fake_notifier.NOTIFICATIONS[0]
         self.assertEqual(msg.event_type,
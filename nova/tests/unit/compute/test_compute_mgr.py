@@ -1251,14 +1251,71 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
     def test_sync_power_states(self, mock_get):
         instance = mock.Mock()
         mock_get.return_value = [instance]
-        with mock.patch.object(self.compute._sync_power_pool,
-                               'spawn_n') as mock_spawn:
+        with contextlib.nested(
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+            mock.patch.object(self.compute.driver, 'get_power_states',
+                              side_effect=NotImplementedError)
+        ) as (mock_spawn, mock_get_power_states):
             self.compute._sync_power_states(mock.sentinel.context)
             mock_get.assert_called_with(mock.sentinel.context,
                                         self.compute.host, expected_attrs=[],
                                         use_slave=True)
             mock_spawn.assert_called_once_with(mock.ANY, instance)
 
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_bulk(self, mock_get):
+        in_sync = fake_instance.fake_instance_obj(
+            self.context, uuid='in-sync', vm_state=vm_states.ACTIVE,
+            power_state=power_state.RUNNING, task_state=None)
+        stopped = fake_instance.fake_instance_obj(
+            self.context, uuid='stopped', vm_state=vm_states.ACTIVE,
+            power_state=power_state.RUNNING, task_state=None)
+        missing = fake_instance.fake_instance_obj(
+            self.context, uuid='missing', vm_state=vm_states.ACTIVE,
+            power_state=power_state.RUNNING, task_state=None)
+        pending = fake_instance.fake_instance_obj(
+            self.context, uuid='pending', vm_state=vm_states.ACTIVE,
+            power_state=power_state.RUNNING,
+            task_state=task_states.REBOOTING)
+        mock_get.return_value = [in_sync, stopped, missing, pending]
+        power_states = {'in-sync': power_state.RUNNING,
+                        'stopped': power_state.SHUTDOWN,
+                        'pending': power_state.SHUTDOWN}
+        with contextlib.nested(
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+            mock.patch.object(self.compute.driver, 'get_power_states',
+                              return_value=power_states),
+            mock.patch.object(self.compute.driver, 'get_num_instances',
+                              return_value=4)
+        ) as (mock_spawn, mock_get_power_states, mock_get_num_instances):
+            self.compute._sync_power_states(mock.sentinel.context)
+            self.assertEqual([mock.call(mock.ANY, stopped),
+                              mock.call(mock.ANY, missing)],
+                             mock_spawn.call_args_list)
+            mock_get_num_instances.assert_called_once_with()
+
+    def test_power_state_in_sync(self):
+        def _in_sync(vm_state, db_power_state, vm_power_state):
+            instance = fake_instance.fake_instance_obj(
+                self.context, vm_state=vm_state, power_state=db_power_state,
+                task_state=None)
+            return self.compute._power_state_in_sync(instance,
+                                                     vm_power_state)
+
+        self.assertTrue(_in_sync(vm_states.ACTIVE, power_state.RUNNING,
+                                 power_state.RUNNING))
+        self.assertFalse(_in_sync(vm_states.ACTIVE, power_state.RUNNING,
+                                  power_state.SHUTDOWN))
+        # The stop API is called until the instance is stopped
+        self.assertFalse(_in_sync(vm_states.ACTIVE, power_state.SHUTDOWN,
+                                  power_state.SHUTDOWN))
+        self.assertTrue(_in_sync(vm_states.STOPPED, power_state.SHUTDOWN,
+                                 power_state.SHUTDOWN))
+        self.assertFalse(_in_sync(vm_states.STOPPED, power_state.RUNNING,
+                                  power_state.RUNNING))
+        self.assertTrue(_in_sync(vm_states.ERROR, power_state.NOSTATE,
+                                 power_state.NOSTATE))
+
     def _get_sync_instance(self, power_state, vm_state, task_state=None,
                            shutdown_terminate=False):
         instance = objects.Instance()
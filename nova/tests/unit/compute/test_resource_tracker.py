@@ -16,6 +16,7 @@
 """Tests for compute resource tracking."""
 
 import copy
+import datetime
 import six
 import uuid
 
@@ -1381,6 +1382,39 @@ class TrackerPeriodicTestCase(BaseTrackerTestCase):
 
         _test()
 
+    def test_audit_interval(self):
+        self.flags(resource_audit_interval=60)
+        driver = self.tracker.driver
+        with mock.patch.object(driver, 'get_available_resource',
+                               wraps=driver.get_available_resource) as gar:
+            with mock.patch.object(self.tracker, '_get_host_metrics',
+                                   return_value=[]) as ghm:
+                self.tracker.update_available_resource(self.context)
+                self.assertFalse(gar.called)
+                ghm.assert_called_once_with(self.context,
+                                            self.tracker.nodename)
+
+            self.tracker.last_audit = (timeutils.utcnow() -
+                                       datetime.timedelta(seconds=61))
+            self.tracker.update_available_resource(self.context)
+            gar.assert_called_once_with(self.tracker.nodename)
+
+    @mock.patch.object(resource_tracker.LOG, 'warning')
+    def test_audit_reports_drift(self, mock_warning):
+        self.flags(resource_audit_interval=60)
+        self.tracker.last_audit = None
+
+        self.tracker.update_available_resource(self.context)
+        self.assertFalse(mock_warning.called)
+
+        self.tracker.last_audit = None
+        self.tracker.compute_node.memory_mb_used += 1
+        self.tracker.update_available_resource(self.context)
+        drift = mock_warning.call_args[0][1]['drift']
+        self.assertEqual(['memory_mb_used'], list(drift))
+        self.assertEqual(drift['memory_mb_used']['tracked'] - 1,
+                         drift['memory_mb_used']['audited'])
+
 
 class StatsDictTestCase(BaseTrackerTestCase):
     """Test stats handling for a virt driver that provides
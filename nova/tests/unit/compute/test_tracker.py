@@ -1014,6 +1014,34 @@ class TestUpdateComputeNode(BaseTestCase):
         urs_mock = self.sched_client_mock.update_resource_stats
         urs_mock.assert_called_once_with(self.rt.compute_node)
 
+    def test_update_saves_changed_fields_only(self):
+        self._setup_rt()
+        self.rt.compute_node = copy.deepcopy(_COMPUTE_NODE_FIXTURES[0])
+        self.rt._update(mock.sentinel.ctx)
+
+        changes = []
+
+        def fake_update_resource_stats(compute_node):
+            changes.append(compute_node.obj_what_changed())
+            compute_node.obj_reset_changes()
+
+        urs_mock = self.sched_client_mock.update_resource_stats
+        urs_mock.side_effect = fake_update_resource_stats
+
+        # Setting fields to the values last reported is not a change
+        compute_node = self.rt.compute_node
+        compute_node.memory_mb = compute_node.memory_mb
+        compute_node.stats = dict(compute_node.stats)
+        self.rt._update(mock.sentinel.ctx)
+        self.assertEqual([], changes)
+        self.assertEqual(set(), compute_node.obj_what_changed())
+
+        compute_node.memory_mb = compute_node.memory_mb
+        compute_node.memory_mb_used += 128
+        compute_node.free_ram_mb -= 128
+        self.rt._update(mock.sentinel.ctx)
+        self.assertEqual([set(['memory_mb_used', 'free_ram_mb'])], changes)
+
 
 class TestInstanceClaim(BaseTestCase):
 
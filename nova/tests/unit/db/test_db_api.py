@@ -18,6 +18,7 @@
 
 """Unit tests for the DB API."""
 
+import collections
 import copy
 import datetime
 import uuid as stdlib_uuid
@@ -402,6 +403,53 @@ class UnsupportedDbRegexpTestCase(DbTestCase):
                     marker = insts[-1]['uuid']
                     self.assertEqual(correct[-1]['uuid'], marker)
 
+    def test_instance_get_all_by_filters_sort_keys_page_token(self,
+            mock_get_regexp):
+        '''Verifies sort order with pagination using page tokens.'''
+        test1_active = self.create_instance_with_args(
+                            display_name='test1',
+                            vm_state=vm_states.ACTIVE)
+        test1_error = self.create_instance_with_args(
+                           display_name='test1',
+                           vm_state=vm_states.ERROR)
+        test2_active = self.create_instance_with_args(
+                            display_name='test2',
+                            vm_state=vm_states.ACTIVE)
+        test2_error = self.create_instance_with_args(
+                           display_name='test2',
+                           vm_state=vm_states.ERROR)
+        sort_keys = ['display_name', 'vm_state', 'created_at']
+        sort_dirs = ['asc', 'desc', 'asc']
+        correct_order = [test1_error, test1_active,
+                         test2_error, test2_active]
+
+        marker = None
+        with mock.patch.object(sqlalchemy_api,
+                               '_instance_get_by_uuid') as mock_get:
+            for i in range(0, 5, 2):
+                correct = correct_order[i:i + 2]
+                insts = self._assert_equals_inst_order(
+                    correct, {},
+                    sort_keys=sort_keys, sort_dirs=sort_dirs,
+                    limit=2, marker=marker)
+                if correct:
+                    marker = db.instance_page_token(insts[-1], sort_keys)
+                    self.assertTrue(db.is_instance_page_token(marker))
+            self.assertFalse(mock_get.called)
+
+    def test_instance_get_all_by_filters_page_token_invalid(self,
+            mock_get_regexp):
+        inst = self.create_instance_with_args()
+        token = db.instance_page_token(inst, ['display_name'])
+        # The token is only valid for the sort keys it was built for
+        self.assertRaises(exception.MarkerNotFound,
+                          db.instance_get_all_by_filters_sort,
+                          self.context, {}, marker=token,
+                          sort_keys=['vm_state'])
+        self.assertRaises(exception.MarkerNotFound,
+                          db.instance_get_all_by_filters_sort,
+                          self.context, {}, marker='page.garbage')
+
     def test_instance_get_deleted_by_filters_sort_keys_paginate(self,
             mock_get_regexp):
         '''Verifies sort order with pagination for deleted instances.'''
@@ -1523,6 +1571,27 @@ class ReservationTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self.assertEqual(expected, db.quota_usage_get_all_by_project_and_user(
                                             self.ctxt, 'project1', 'user1'))
 
+    def test_reservation_finalize(self):
+        commits = []
+        rollbacks = []
+        for reservation in self.reservations:
+            if _reservation_get(self.ctxt, reservation).resource == \
+                    'resource1':
+                rollbacks.append(reservation)
+            else:
+                commits.append(reservation)
+        db.reservation_finalize(self.ctxt, commits, rollbacks, 'project1',
+                                'user1')
+        for reservation in self.reservations:
+            self.assertRaises(exception.ReservationNotFound,
+                _reservation_get, self.ctxt, reservation)
+        expected = {'project_id': 'project1', 'user_id': 'user1',
+                'resource0': {'reserved': 0, 'in_use': 0},
+                'resource1': {'reserved': 0, 'in_use': 1},
+                'fixed_ips': {'reserved': 0, 'in_use': 4}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project_and_user(
+                                            self.ctxt, 'project1', 'user1'))
+
     def test_reservation_expire(self):
         db.reservation_expire(self.ctxt)
 
@@ -2423,6 +2492,39 @@ class InstanceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self.assertEqual('bar', result[0]['system_metadata'][0]['value'])
         self.assertEqual(instance['uuid'], result[0]['extra']['instance_uuid'])
 
+    def test_instance_get_all_by_host_and_node_columns(self):
+        instance = self.create_instance_with_args(
+            system_metadata={'foo': 'bar'})
+        result = db.instance_get_all_by_host_and_node(
+            self.ctxt, 'h1', 'n1', columns_to_join=['system_metadata'],
+            columns=['vm_state'])
+        self.assertEqual(1, len(result))
+        self.assertEqual(set(['id', 'uuid', 'vm_state', 'metadata',
+                              'system_metadata']),
+                         set(result[0].keys()))
+        self.assertEqual(instance['uuid'], result[0]['uuid'])
+        self.assertEqual('bar', result[0]['system_metadata'][0]['value'])
+
+    def test_instance_get_all_by_host_columns(self):
+        instance = self.create_instance_with_args()
+        result = db.instance_get_all_by_host(self.ctxt, 'h1',
+                                             columns_to_join=[],
+                                             columns=['host', 'vm_state'])
+        self.assertEqual(1, len(result))
+        self.assertEqual(instance['uuid'], result[0]['uuid'])
+        self.assertEqual('h1', result[0]['host'])
+        self.assertNotIn('display_name', result[0])
+
+    def test_instance_get_all_by_filters_columns(self):
+        instance = self.create_instance_with_args()
+        result = db.instance_get_all_by_filters_sort(
+            self.ctxt, {'host': 'h1'}, columns_to_join=[],
+            columns=['vm_state'])
+        self.assertEqual(1, len(result))
+        self.assertEqual(instance['uuid'], result[0]['uuid'])
+        self.assertEqual(instance['vm_state'], result[0]['vm_state'])
+        self.assertNotIn('display_name', result[0])
+
     @mock.patch('nova.db.sqlalchemy.api._instances_fill_metadata')
     @mock.patch('nova.db.sqlalchemy.api._instance_get_all_query')
     def test_instance_get_all_by_host_and_node_fills_manually(self,
@@ -2871,6 +2973,29 @@ class ServiceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         for key, value in new_values.items():
             self.assertEqual(value, updated_service[key])
 
+    @mock.patch.object(timeutils, 'utcnow')
+    def test_service_heartbeat(self, mock_utcnow):
+        now = datetime.datetime(2015, 7, 1, 12, 0, 0)
+        mock_utcnow.return_value = now
+        service1 = self._create_service({'host': 'host1'})
+        service2 = self._create_service({'host': 'host2', 'report_count': 0})
+        service3 = self._create_service({'host': 'host3'})
+        updated = db.service_heartbeat(self.ctxt,
+                                       [service1['id'], service2['id']])
+        self.assertEqual(2, updated)
+        service1 = db.service_get(self.ctxt, service1['id'])
+        service2 = db.service_get(self.ctxt, service2['id'])
+        service3 = db.service_get(self.ctxt, service3['id'])
+        self.assertEqual(4, service1['report_count'])
+        self.assertEqual(now, service1['last_seen_up'])
+        self.assertEqual(1, service2['report_count'])
+        self.assertEqual(now, service2['last_seen_up'])
+        self.assertEqual(3, service3['report_count'])
+        self.assertIsNone(service3['last_seen_up'])
+
+    def test_service_heartbeat_empty(self):
+        self.assertEqual(0, db.service_heartbeat(self.ctxt, []))
+
     def test_service_update_not_found_exception(self):
         self.assertRaises(exception.ServiceNotFound,
                           db.service_update, self.ctxt, 100500, {})
@@ -2963,6 +3088,21 @@ class ServiceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         real = db.service_get_all_by_binary(self.ctxt, 'b1')
         self._assertEqualListsOfObjects(expected, real)
 
+    def test_service_get_all_by_binary_changed_since(self):
+        before = timeutils.utcnow() - datetime.timedelta(minutes=1)
+        values = [
+            {'host': 'host1', 'binary': 'b1'},
+            {'host': 'host2', 'binary': 'b1', 'disabled': True},
+            {'host': 'host3', 'binary': 'b2'}
+        ]
+        services = [self._create_service(vals) for vals in values]
+        real = db.service_get_all_by_binary_changed_since(self.ctxt, 'b1',
+                                                          before)
+        self._assertEqualListsOfObjects(services[:2], real)
+        after = timeutils.utcnow() + datetime.timedelta(minutes=1)
+        self.assertEqual([], db.service_get_all_by_binary_changed_since(
+            self.ctxt, 'b1', after))
+
     def test_service_get_all_by_host(self):
         values = [
             {'host': 'host1', 'topic': 't11', 'binary': 'b11'},
@@ -6471,6 +6611,153 @@ class QuotaTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self.assertRaises(exception.QuotaExists, db.quota_create, self.ctxt,
                           'project1', 'resource1', 42)
 
+    def _setup_counter_resources(self, *names):
+        # Dict of counts returned by the sync functions keyed by
+        # (user_id, resource)
+        self.counts = collections.defaultdict(int)
+        resources = {}
+        syncs = {}
+        for name in names:
+            sync_name = '_sync_%s' % name
+
+            def sync(elevated, project_id, user_id, session, name=name):
+                return {name: self.counts[(user_id, name)]}
+
+            syncs[sync_name] = sync
+            resources[name] = quota.ReservableResource(name, sync_name)
+        patcher = mock.patch.dict(sqlalchemy_api.QUOTA_SYNC_FUNCTIONS, syncs)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return resources
+
+    def _reserve_counters(self, resources, quotas, deltas, user_id='u1',
+                          user_quotas=None):
+        return db.quota_reserve_counters(self.ctxt, resources, quotas,
+                                         user_quotas or quotas, deltas,
+                                         timeutils.utcnow(), 'p1', user_id)
+
+    def test_quota_reserve_counters(self):
+        resources = self._setup_counter_resources('resource0')
+        quotas = {'resource0': 5}
+        reservations = self._reserve_counters(resources, quotas,
+                                              {'resource0': 2})
+        self.assertEqual(1, len(reservations))
+        self._reserve_counters(resources, quotas, {'resource0': 3})
+        exc = self.assertRaises(exception.OverQuota, self._reserve_counters,
+                                resources, quotas, {'resource0': 1})
+        self.assertEqual(['resource0'], exc.kwargs['overs'])
+        self.assertEqual({'resource0': {'in_use': 0, 'reserved': 5}},
+                         exc.kwargs['usages'])
+        usage = db.quota_usage_get(self.ctxt, 'p1', 'resource0', 'u1')
+        self.assertEqual(5, usage.reserved)
+
+    def test_quota_reserve_counters_over_quota_rolls_back(self):
+        resources = self._setup_counter_resources('resource0', 'resource1')
+        quotas = {'resource0': 10, 'resource1': 1}
+        self._reserve_counters(resources, quotas,
+                               {'resource0': 1, 'resource1': 1})
+        exc = self.assertRaises(exception.OverQuota, self._reserve_counters,
+                                resources, quotas,
+                                {'resource0': 2, 'resource1': 1})
+        self.assertEqual(['resource1'], exc.kwargs['overs'])
+        usage = db.quota_usage_get(self.ctxt, 'p1', 'resource0', 'u1')
+        self.assertEqual(1, usage.reserved)
+
+    def test_quota_reserve_counters_project_limit(self):
+        resources = self._setup_counter_resources('resource0')
+        quotas = {'resource0': 4}
+        user_quotas = {'resource0': 3}
+        self._reserve_counters(resources, quotas, {'resource0': 3},
+                               user_quotas=user_quotas)
+        self.assertRaises(exception.OverQuota, self._reserve_counters,
+                          resources, quotas, {'resource0': 2}, user_id='u2',
+                          user_quotas=user_quotas)
+        self._reserve_counters(resources, quotas, {'resource0': 1},
+                               user_id='u2', user_quotas=user_quotas)
+        self.assertRaises(exception.OverQuota, self._reserve_counters,
+                          resources, quotas, {'resource0': 1}, user_id='u2',
+                          user_quotas=user_quotas)
+
+    def test_quota_reserve_counters_unlimited(self):
+        resources = self._setup_counter_resources('resource0')
+        self._reserve_counters(resources, {'resource0': -1},
+                               {'resource0': 1000})
+        usage = db.quota_usage_get(self.ctxt, 'p1', 'resource0', 'u1')
+        self.assertEqual(1000, usage.reserved)
+
+    def test_quota_reserve_counters_refreshes_reset_usage(self):
+        resources = self._setup_counter_resources('resource0')
+        quotas = {'resource0': 5}
+        self._reserve_counters(resources, quotas, {'resource0': 1})
+        db.quota_usage_update(self.ctxt, 'p1', 'u1', 'resource0', in_use=-1)
+        self.counts[('u1', 'resource0')] = 3
+        self.assertRaises(exception.OverQuota, self._reserve_counters,
+                          resources, quotas, {'resource0': 2})
+        self._reserve_counters(resources, quotas, {'resource0': 1})
+        usage = db.quota_usage_get(self.ctxt, 'p1', 'resource0', 'u1')
+        self.assertEqual(3, usage.in_use)
+        self.assertEqual(2, usage.reserved)
+
+    def test_quota_reserve_counters_refreshes_new_usage(self):
+        resources = self._setup_counter_resources('resource0')
+        quotas = {'resource0': 5}
+        self.counts[('u1', 'resource0')] = 4
+        self.assertRaises(exception.OverQuota, self._reserve_counters,
+                          resources, quotas, {'resource0': 2})
+        self._reserve_counters(resources, quotas, {'resource0': 1})
+        usage = db.quota_usage_get(self.ctxt, 'p1', 'resource0', 'u1')
+        self.assertEqual(4, usage.in_use)
+        self.assertEqual(1, usage.reserved)
+
+    def _get_project_total(self, resource):
+        total = sqlalchemy_api.model_query(
+            self.ctxt, models.ProjectQuotaUsage, read_deleted="no").\
+            filter_by(project_id='p1', resource=resource).first()
+        return total.in_use, total.reserved
+
+    def test_quota_reserve_counters_project_total(self):
+        resources = self._setup_counter_resources('resource0', 'fixed_ips')
+        quotas = {'resource0': 10, 'fixed_ips': 10}
+        deltas = {'resource0': 2, 'fixed_ips': 1}
+        commit = self._reserve_counters(resources, quotas, deltas)
+        rollback = self._reserve_counters(resources, quotas, deltas,
+                                          user_id='u2')
+        self.assertEqual((0, 4), self._get_project_total('resource0'))
+        # The usage of a per-project resource is the project total already
+        self.assertIsNone(sqlalchemy_api.model_query(
+            self.ctxt, models.ProjectQuotaUsage).filter_by(
+            resource='fixed_ips').first())
+
+        db.reservation_commit(self.ctxt, commit, 'p1', 'u1')
+        self.assertEqual((2, 2), self._get_project_total('resource0'))
+        db.reservation_rollback(self.ctxt, rollback, 'p1', 'u2')
+        self.assertEqual((2, 0), self._get_project_total('resource0'))
+
+        self._reserve_counters(resources, quotas, {'resource0': 3})
+        with mock.patch.object(timeutils, 'utcnow',
+                               return_value=timeutils.utcnow() +
+                               datetime.timedelta(days=1)):
+            db.reservation_expire(self.ctxt)
+        self.assertEqual((2, 0), self._get_project_total('resource0'))
+
+    def test_quota_usage_reconcile(self):
+        resources = self._setup_counter_resources('resource0', 'fixed_ips')
+        quotas = {'resource0': 10, 'fixed_ips': 10}
+        deltas = {'resource0': 1, 'fixed_ips': 1}
+        self._reserve_counters(resources, quotas, deltas)
+        self._reserve_counters(resources, quotas, deltas, user_id='u2')
+        self.counts[('u1', 'resource0')] = 2
+        self.counts[('u2', 'resource0')] = 3
+        self.counts[('u1', 'fixed_ips')] = 4
+        self.counts[('u2', 'fixed_ips')] = 4
+        db.quota_usage_reconcile(self.ctxt, resources)
+        expected = {'project_id': 'p1',
+                    'resource0': {'in_use': 5, 'reserved': 2},
+                    'fixed_ips': {'in_use': 4, 'reserved': 2}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+                         self.ctxt, 'p1'))
+        self.assertEqual((5, 2), self._get_project_total('resource0'))
+
 
 class QuotaReserveNoDbTestCase(test.NoDBTestCase):
     """Tests quota reserve/refresh operations using mock."""
@@ -6748,6 +7035,21 @@ class ComputeNodeTestCase(test.TestCase, ModelsObjectComparatorMixin):
         new_stats = jsonutils.loads(node['stats'])
         self.assertEqual(self.stats, new_stats)
 
+    def test_compute_node_get_all_changed_since(self):
+        before = timeutils.utcnow() - datetime.timedelta(minutes=1)
+        after = timeutils.utcnow() + datetime.timedelta(minutes=1)
+        nodes = db.compute_node_get_all_changed_since(self.ctxt, before)
+        self.assertEqual([self.item['id']], [node['id'] for node in nodes])
+        nodes = db.compute_node_get_all_changed_since(self.ctxt, after)
+        self.assertEqual([], nodes)
+
+    def test_compute_node_get_all_changed_since_deleted(self):
+        before = timeutils.utcnow() - datetime.timedelta(minutes=1)
+        db.compute_node_delete(self.ctxt, self.item['id'])
+        nodes = db.compute_node_get_all_changed_since(self.ctxt, before)
+        self.assertEqual(1, len(nodes))
+        self.assertTrue(nodes[0]['deleted'])
+
     def test_compute_node_get_all_deleted_compute_node(self):
         # Create a service and compute node and ensure we can find its stats;
         # delete the service and compute node when done and loop again
@@ -7858,8 +8160,7 @@ class ArchiveTestCase(test.TestCase):
             'shadow_dns_domains',
         )
 
-    def test_archive_deleted_rows_fk_constraint(self):
-        # consoles.pool_id depends on console_pools.id
+    def _enable_foreign_keys(self):
         # SQLite doesn't enforce foreign key constraints without a pragma.
         dialect = self.engine.url.get_dialect()
         if dialect == sqlite.dialect:
@@ -7873,13 +8174,19 @@ class ArchiveTestCase(test.TestCase):
                 self.skipTest(
                     'sqlite version too old for reliable SQLA foreign_keys')
             self.conn.execute("PRAGMA foreign_keys = ON")
+
+    def _create_deleted_console(self):
         ins_stmt = self.console_pools.insert().values(deleted=1)
         result = self.conn.execute(ins_stmt)
         id1 = result.inserted_primary_key[0]
         ins_stmt = self.consoles.insert().values(deleted=1,
                                                          pool_id=id1)
-        result = self.conn.execute(ins_stmt)
-        result.inserted_primary_key[0]
+        self.conn.execute(ins_stmt)
+
+    def test_archive_deleted_rows_fk_constraint(self):
+        # consoles.pool_id depends on console_pools.id
+        self._enable_foreign_keys()
+        self._create_deleted_console()
         # The first try to archive console_pools should fail, due to FK.
         num = db.archive_deleted_rows_for_table(self.context, "console_pools")
         self.assertEqual(num, 0)
@@ -7930,7 +8237,8 @@ class ArchiveTestCase(test.TestCase):
         rows = self.conn.execute(qsi).fetchall()
         self.assertEqual(len(rows), 0)
         # Archive 7 rows, which should be 4 in one table and 3 in the other.
-        db.archive_deleted_rows(self.context, max_rows=7)
+        archived = db.archive_deleted_rows(self.context, max_rows=7)
+        self.assertEqual(7, sum(archived.values()))
         # Verify we have 5 left in the two main tables combined
         iim_rows = self.conn.execute(qiim).fetchall()
         i_rows = self.conn.execute(qi).fetchall()
@@ -7964,6 +8272,80 @@ class ArchiveTestCase(test.TestCase):
             'shadow_instance_id_mappings'
         )
 
+    def test_archive_deleted_rows_fk_order(self):
+        # consoles are archived before the console_pools they depend on.
+        self._enable_foreign_keys()
+        self._create_deleted_console()
+        archived = db.archive_deleted_rows(self.context)
+        self.assertEqual({'consoles': 1, 'console_pools': 1}, archived)
+        self._assert_shadow_tables_empty_except(
+            'shadow_console_pools',
+            'shadow_consoles'
+        )
+
+    def test_archive_deleted_rows_skips_referenced_row(self):
+        self._enable_foreign_keys()
+        ins_stmt = self.console_pools.insert().values(deleted=1)
+        self.conn.execute(ins_stmt)
+        self._create_deleted_console()
+        # Undelete the second console so that its pool can't be archived.
+        update_statement = self.consoles.update().values(deleted=0)
+        self.conn.execute(update_statement)
+        self.flags(archive_deleted_rows_batch_size=2)
+        num = db.archive_deleted_rows_for_table(self.context, "console_pools")
+        self.assertEqual(1, num)
+
+    def _create_deleted_id_mappings(self):
+        for uuidstr in self.uuidstrs:
+            ins_stmt = self.instance_id_mappings.insert().values(uuid=uuidstr)
+            self.conn.execute(ins_stmt)
+        update_statement = self.instance_id_mappings.update().\
+                where(self.instance_id_mappings.c.uuid.in_(self.uuidstrs[:4]))\
+                .values(deleted=1)
+        self.conn.execute(update_statement)
+        qiim = sql.select([self.instance_id_mappings.c.id]).where(
+            self.instance_id_mappings.c.uuid.in_(self.uuidstrs[:4])).\
+            order_by(self.instance_id_mappings.c.id)
+        return [row[0] for row in self.conn.execute(qiim)]
+
+    def test_archive_deleted_rows_cursor(self):
+        ids = self._create_deleted_id_mappings()
+        self.flags(archive_deleted_rows_batch_size=1)
+        cursor = {}
+        archived = db.archive_deleted_rows(self.context, max_rows=2,
+                                           cursor=cursor)
+        self.assertEqual({'instance_id_mappings': 2}, archived)
+        self.assertEqual({'instance_id_mappings': ids[1]}, cursor)
+        archived = db.archive_deleted_rows(self.context, max_rows=2,
+                                           cursor=cursor)
+        self.assertEqual({'instance_id_mappings': 2}, archived)
+        self.assertEqual({'instance_id_mappings': ids[3]}, cursor)
+        archived = db.archive_deleted_rows(self.context, max_rows=2,
+                                           cursor=cursor)
+        self.assertEqual({}, archived)
+        self.assertEqual({}, cursor)
+        qsiim = sql.select([self.shadow_instance_id_mappings.c.id]).\
+                order_by(self.shadow_instance_id_mappings.c.id)
+        self.assertEqual(ids, [row[0] for row in self.conn.execute(qsiim)])
+
+    def test_archive_deleted_rows_cursor_resume(self):
+        ids = self._create_deleted_id_mappings()
+        # Rows below the cursor are left for the next pass.
+        cursor = {'instance_id_mappings': ids[1]}
+        archived = db.archive_deleted_rows(self.context, cursor=cursor)
+        self.assertEqual({'instance_id_mappings': 2}, archived)
+        self.assertEqual({}, cursor)
+        archived = db.archive_deleted_rows(self.context, cursor=cursor)
+        self.assertEqual({'instance_id_mappings': 2}, archived)
+
+    @mock.patch('time.sleep')
+    def test_archive_deleted_rows_throttle(self, mock_sleep):
+        self._create_deleted_id_mappings()
+        self.flags(archive_deleted_rows_batch_size=2)
+        archived = db.archive_deleted_rows(self.context, rows_per_second=1)
+        self.assertEqual({'instance_id_mappings': 4}, archived)
+        self.assertEqual(2, mock_sleep.call_count)
+
 
 class InstanceGroupDBApiTestCase(test.TestCase, ModelsObjectComparatorMixin):
     def setUp(self):
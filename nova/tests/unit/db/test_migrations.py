@@ -766,6 +766,22 @@ class NovaMigrationsCheckers(test_migrations.ModelsMigrationsSync,
         # the point-of-view of unit tests, since they use SQLite
         pass
 
+    def _check_299(self, engine, data):
+        self.assertIndexMembers(engine, 'instances',
+                                'instances_deleted_created_at_id_idx',
+                                ['deleted', 'created_at', 'id'])
+        self.assertIndexMembers(
+            engine, 'instances',
+            'instances_deleted_project_id_created_at_id_idx',
+            ['deleted', 'project_id', 'created_at', 'id'])
+
+    def _check_300(self, engine, data):
+        for prefix in ('', 'shadow_'):
+            table = oslodbutils.get_table(engine,
+                                          prefix + 'project_quota_usages')
+            for column in ('project_id', 'resource', 'in_use', 'reserved'):
+                self.assertIn(column, table.c)
+
     def filter_metadata_diff(self, diff):
         # Overriding the parent method to decide on certain attributes
         # that maybe present in the DB but not in the models.py
@@ -2369,7 +2369,7 @@ class TestNeutronv2(TestNeutronv2Base):
         fake_ips = [model.IP(x['ip_address']) for x in fake_port['fixed_ips']]
         api = neutronapi.API()
         self.mox.StubOutWithMock(api, '_get_subnets_from_port')
-        api._get_subnets_from_port(self.context, fake_port).AndReturn(
+        api._get_subnets_from_port(self.context, fake_port, None).AndReturn(
             [fake_subnet])
         self.mox.ReplayAll()
         neutronapi.get_client('fake')
@@ -2589,7 +2589,7 @@ class TestNeutronv2(TestNeutronv2Base):
                 self.moxed_client, '1.1.1.1', requested_port['id']).AndReturn(
                     [{'floating_ip_address': '10.0.0.1'}])
         for requested_port in requested_ports:
-            api._get_subnets_from_port(self.context, requested_port
+            api._get_subnets_from_port(self.context, requested_port, None
                 ).AndReturn(fake_subnets)
 
         self.mox.StubOutWithMock(api, '_get_preexisting_port_ids')
@@ -2858,6 +2858,66 @@ class TestNeutronv2WithMock(test.TestCase):
                                             update_cells=False)
         self.assertEqual(fake_result, result)
 
+    @mock.patch('nova.compute.utils.refresh_info_cache_for_instance')
+    @mock.patch('nova.network.base_api.update_instance_cache_with_nw_info')
+    @mock.patch.object(neutronapi, 'get_client')
+    def test_get_instances_nw_info(self, mock_get_client, mock_update,
+                                   mock_refresh):
+        instances = [fake_instance.fake_instance_obj(
+                         self.context, uuid=instance_uuid,
+                         project_id='fake-project')
+                     for instance_uuid in ('uuid1', 'uuid2')]
+        for instance in instances:
+            instance.info_cache = objects.InstanceInfoCache(
+                instance_uuid=instance.uuid, network_info=model.NetworkInfo())
+        port = {'id': 'port1', 'device_id': 'uuid1', 'network_id': 'net1',
+                'tenant_id': 'fake-project', 'mac_address': 'fa:16:3e:0:0:1',
+                'admin_state_up': True, 'status': 'ACTIVE',
+                'binding:vif_type': model.VIF_TYPE_OVS,
+                'fixed_ips': [{'ip_address': '10.0.0.2',
+                               'subnet_id': 'subnet1'}]}
+        dhcp_port = {'id': 'dhcp1', 'network_id': 'net1',
+                     'fixed_ips': [{'ip_address': '10.0.0.3',
+                                    'subnet_id': 'subnet1'}]}
+
+        def fake_list_ports(**search_opts):
+            if 'device_owner' in search_opts:
+                return {'ports': [dhcp_port]}
+            return {'ports': [port]}
+
+        client = mock_get_client.return_value
+        client.list_ports.side_effect = fake_list_ports
+        client.list_networks.return_value = {'networks': [
+            {'id': 'net1', 'name': 'private', 'tenant_id': 'fake-project'}]}
+        client.list_subnets.return_value = {'subnets': [
+            {'id': 'subnet1', 'network_id': 'net1', 'cidr': '10.0.0.0/24',
+             'gateway_ip': '10.0.0.1'}]}
+        client.list_floatingips.return_value = {'floatingips': [
+            {'port_id': 'port1', 'fixed_ip_address': '10.0.0.2',
+             'floating_ip_address': '172.24.4.2'}]}
+
+        nw_infos = self.api.get_instances_nw_info(self.context, instances)
+
+        self.assertEqual(set(['uuid1', 'uuid2']), set(nw_infos))
+        self.assertEqual(0, len(nw_infos['uuid2']))
+        vif = nw_infos['uuid1'][0]
+        self.assertEqual('port1', vif['id'])
+        self.assertEqual('private', vif['network']['label'])
+        subnet = vif['network']['subnets'][0]
+        self.assertEqual('10.0.0.3', subnet['meta']['dhcp_server'])
+        self.assertEqual(['172.24.4.2'],
+                         [ip['address'] for ip in vif.floating_ips()])
+        client.list_ports.assert_has_calls([
+            mock.call(device_id=['uuid1', 'uuid2']),
+            mock.call(network_id=['net1'], device_owner='network:dhcp')])
+        client.list_networks.assert_called_once_with(id=['net1'])
+        client.list_subnets.assert_called_once_with(id=['subnet1'])
+        client.list_floatingips.assert_called_once_with(port_id=['port1'])
+        # Only the info cache whose network info changed is saved
+        mock_update.assert_called_once_with(
+            self.api, self.context, instances[0], nw_info=nw_infos['uuid1'],
+            update_cells=False)
+
     def _test_validate_networks_fixed_ip_no_dup(self, nets, requested_networks,
                                                 ids, list_port_values):
 
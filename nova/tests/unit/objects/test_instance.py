@@ -207,6 +207,33 @@ class _TestInstanceObject(object):
         self.assertRaises(exception.ObjectActionError,
                           inst.obj_load_attr, 'foo')
 
+    @mock.patch.object(instance.Instance, 'get_by_uuid')
+    def test_load_column_field(self, mock_get):
+        mock_get.return_value = fake_instance.fake_instance_obj(
+            self.context, uuid='fake-uuid', host='fake-host',
+            vm_state='active', power_state=1)
+        inst = instance.Instance._from_db_object(
+            self.context, instance.Instance(),
+            {'id': 1, 'uuid': 'fake-uuid', 'host': 'other-host'},
+            fields=['id', 'uuid', 'host'])
+        self.assertEqual('active', inst.vm_state)
+        mock_get.assert_called_once_with(self.context, uuid='fake-uuid',
+                                         expected_attrs=[])
+        # All the column fields are loaded at once, the set ones are kept
+        self.assertEqual(1, inst.power_state)
+        self.assertEqual('other-host', inst.host)
+        self.assertEqual(1, mock_get.call_count)
+        self.assertFalse(inst.obj_attr_is_set('metadata'))
+        self.assertNotIn('vm_state', inst.obj_what_changed())
+
+    @mock.patch.object(instance.Instance, 'get_by_uuid')
+    def test_load_column_field_not_projected(self, mock_get):
+        inst = instance.Instance(context=self.context, uuid='fake-uuid',
+                                 host='fake-host')
+        self.assertRaises(exception.ObjectActionError,
+                          inst.obj_load_attr, 'vm_state')
+        self.assertFalse(mock_get.called)
+
     def test_get_remote(self):
         # isotime doesn't have microseconds and is always UTC
         self.mox.StubOutWithMock(db, 'instance_get_by_uuid')
@@ -1412,6 +1439,38 @@ class _TestInstanceListObject(object):
             self.assertEqual(inst_list.objects[i]._context, self.context)
         self.assertEqual(inst_list.obj_what_changed(), set())
 
+    @mock.patch.object(db, 'instance_get_all_by_host')
+    def test_get_by_host_fields(self, mock_get):
+        mock_get.return_value = [{'id': 1, 'uuid': 'fake-uuid',
+                                  'vm_state': 'active'}]
+        inst_list = instance.InstanceList.get_by_host(self.context, 'foo',
+                                                      expected_attrs=[],
+                                                      fields=['vm_state'])
+        mock_get.assert_called_once_with(self.context, 'foo',
+                                         columns_to_join=[],
+                                         use_slave=False,
+                                         columns=['id', 'uuid', 'vm_state'])
+        self.assertEqual(['id', 'uuid', 'vm_state'],
+                         inst_list.projected_fields)
+        inst = inst_list[0]
+        self.assertEqual('fake-uuid', inst.uuid)
+        self.assertEqual('active', inst.vm_state)
+        self.assertFalse(inst.obj_attr_is_set('host'))
+        self.assertFalse(inst.obj_attr_is_set('scheduled_at'))
+        # The other fields can be lazy-loaded, also from a remote list
+        self.assertTrue(inst._projected)
+
+    def test_obj_make_compatible_projected_fields(self):
+        inst_list = instance.InstanceList(objects=[],
+                                          projected_fields=['id', 'uuid'])
+        primitive = inst_list.obj_to_primitive(target_version='1.20')
+        self.assertNotIn('projected_fields', primitive['nova_object.data'])
+
+    def test_get_by_host_fields_not_column(self):
+        self.assertRaises(exception.ObjectActionError,
+                          instance.InstanceList.get_by_host, self.context,
+                          'foo', fields=['metadata'])
+
     def test_get_by_host_and_node(self):
         fakes = [self.fake_instance(1),
                  self.fake_instance(2)]
@@ -921,6 +921,12 @@ class TestRemoteObject(_RemoteTest, _TestObject):
         self.assertEqual('bar', obj.bar)
 
 
+class TestLazyRemoteObject(_RemoteTest, _TestObject):
+    def setUp(self):
+        super(TestLazyRemoteObject, self).setUp()
+        self.flags(lazy_object_deserialization=True)
+
+
 class TestObjectSerializer(_BaseTestCase):
     def test_serialize_entity_primitive(self):
         ser = base.NovaObjectSerializer()
@@ -1028,6 +1034,98 @@ class TestObjectSerializer(_BaseTestCase):
         self.assertIsInstance(obj2, MyObj)
         self.assertEqual(self.context, obj2._context)
 
+    def _lazy_deserialize(self, obj):
+        self.flags(lazy_object_deserialization=True)
+        ser = base.NovaObjectSerializer()
+        return ser.deserialize_entity(
+            self.context, ser.serialize_entity(self.context, obj))
+
+    def test_lazy_deserialization(self):
+        obj = MyObj(foo=1, bar='bar',
+                    rel_object=MyOwnedObject(baz=2))
+        obj.obj_reset_changes(recursive=True)
+        obj2 = self._lazy_deserialize(obj)
+        self.assertIsInstance(obj2, MyObj)
+        for name in ('foo', 'bar', 'rel_object'):
+            self.assertTrue(obj2.obj_attr_is_set(name))
+            self.assertTrue(obj2.obj_attr_is_lazy(name))
+        self.assertFalse(obj2.obj_attr_is_set('missing'))
+        self.assertFalse(obj2.obj_attr_is_lazy('missing'))
+        self.assertEqual(set(), obj2.obj_what_changed())
+        self.assertTrue(obj2.obj_attr_is_lazy('rel_object'))
+
+        self.assertEqual('bar', obj2.bar)
+        self.assertFalse(obj2.obj_attr_is_lazy('bar'))
+        self.assertTrue(obj2.obj_attr_is_lazy('foo'))
+        self.assertIsInstance(obj2.rel_object, MyOwnedObject)
+        self.assertEqual(2, obj2.rel_object.baz)
+        self.assertEqual(set(), obj2.obj_what_changed())
+
+    def test_lazy_deserialization_changes(self):
+        obj = MyObj(foo=1, bar='bar')
+        obj.obj_reset_changes(['foo'])
+        obj2 = self._lazy_deserialize(obj)
+        self.assertEqual(set(['bar']), obj2.obj_what_changed())
+        obj2.foo = 2
+        self.assertEqual(set(['foo', 'bar']), obj2.obj_what_changed())
+        self.assertEqual(2, obj2.foo)
+
+    def test_lazy_deserialization_delattr(self):
+        obj2 = self._lazy_deserialize(MyObj(foo=1, bar='bar'))
+        clone = obj2.obj_clone()
+        del obj2.bar
+        self.assertFalse(obj2.obj_attr_is_set('bar'))
+        self.assertEqual('loaded!', obj2.bar)
+        self.assertTrue(clone.obj_attr_is_lazy('bar'))
+        self.assertEqual('bar', clone.bar)
+
+    def test_lazy_deserialization_round_trip(self):
+        obj = MyObj(foo=1, bar='bar', rel_objects=[MyOwnedObject(baz=3)])
+        obj2 = self._lazy_deserialize(obj)
+        primitive = obj.obj_to_primitive()
+        primitive2 = obj2.obj_to_primitive()
+        self.assertEqual(primitive['nova_object.data'],
+                         primitive2['nova_object.data'])
+        self.assertEqual(set(primitive['nova_object.changes']),
+                         set(primitive2['nova_object.changes']))
+
+    def test_lazy_deserialization_list(self):
+        inst_list = objects.InstanceList(objects=[
+            objects.Instance(uuid='fake-uuid', host='foo',
+                             metadata={'key': 'value'})])
+        inst_list.obj_reset_changes(recursive=True)
+        inst_list2 = self._lazy_deserialize(inst_list)
+        self.assertTrue(inst_list2.obj_attr_is_lazy('objects'))
+        clone = inst_list2.obj_clone()
+        self.assertEqual(1, len(inst_list2))
+        self.assertEqual('fake-uuid', inst_list2[0].uuid)
+        self.assertTrue(inst_list2[0].obj_attr_is_lazy('host'))
+        self.assertEqual(1, len(clone))
+        self.assertEqual(inst_list.obj_to_primitive(),
+                         inst_list2.obj_to_primitive())
+
+    def test_lazy_deserialization_metadata_tracking(self):
+        inst = objects.Instance(uuid='fake-uuid', metadata={'key': 'value'},
+                                system_metadata={'foo': None})
+        inst.obj_reset_changes()
+        inst2 = self._lazy_deserialize(inst)
+        self.assertEqual(set(), inst2.obj_what_changed())
+        self.assertTrue(inst2.obj_attr_is_lazy('metadata'))
+        self.assertTrue(inst2.obj_attr_is_lazy('system_metadata'))
+        inst2.metadata['key'] = 'other'
+        self.assertEqual(set(['metadata']), inst2.obj_what_changed())
+
+        flavor = objects.Flavor(flavorid='1', extra_specs={'key': 'value'},
+                                projects=['fake-project'])
+        flavor.obj_reset_changes()
+        flavor2 = self._lazy_deserialize(flavor)
+        self.assertEqual(set(), flavor2.obj_what_changed())
+        self.assertTrue(flavor2.obj_attr_is_lazy('extra_specs'))
+        self.assertTrue(flavor2.obj_attr_is_lazy('projects'))
+        flavor2.projects.append('other-project')
+        self.assertEqual(set(['projects']), flavor2.obj_what_changed())
+        self.assertEqual({'key': 'value'}, flavor2.extra_specs)
+
     def test_object_serialization_iterables(self):
         ser = base.NovaObjectSerializer()
         obj = MyObj()
@@ -1096,7 +1194,7 @@ object_data = {
     'BlockDeviceMappingList': '1.14-6fa262c059dad1d519b9fe05b9e4f404',
     'CellMapping': '1.0-7f1a7e85a22bbb7559fc730ab658b9bd',
     'ComputeNode': '1.12-71784d2e6f2814ab467d4e0f69286843',
-    'ComputeNodeList': '1.12-3b6f4f5ade621c40e70cb116db237844',
+    'ComputeNodeList': '1.13-19ac1c605694c90126beee2dc731e04d',
     'DNSDomain': '1.0-7b0b2dab778454b6a7b6c66afe163a1a',
     'DNSDomainList': '1.0-4ee0d9efdfd681fed822da88376e04d2',
     'EC2Ids': '1.0-474ee1094c7ec16f8ce657595d8c49d9',
@@ -1124,7 +1222,7 @@ object_data = {
     'InstanceGroup': '1.9-a413a4ec0ff391e3ef0faa4e3e2a96d0',
     'InstanceGroupList': '1.6-be18078220513316abd0ae1b2d916873',
     'InstanceInfoCache': '1.5-cd8b96fefe0fc8d4d337243ba0bf0e1e',
-    'InstanceList': '1.19-5f6eba7d94c4e4ad6fc9a3347f85f4a7',
+    'InstanceList': '1.21-aeddfa18ae347abc353877e61049e09a',
     'InstanceMapping': '1.0-47ef26034dfcbea78427565d9177fe50',
     'InstanceMappingList': '1.0-9e982e3de1613b9ada85e35f69b23d47',
     'InstanceNUMACell': '1.2-535ef30e0de2d6a0d26a71bd58ecafc4',
@@ -1157,7 +1255,7 @@ object_data = {
     'SecurityGroupRule': '1.1-ae1da17b79970012e8536f88cb3c6b29',
     'SecurityGroupRuleList': '1.1-674b323c9ccea02e93b1b40e7fd2091a',
     'Service': '1.15-1d5c9a16f47da93e82082c4fce31588a',
-    'ServiceList': '1.13-b767102cba7cbed290e396114c3f86b3',
+    'ServiceList': '1.15-88861c3d35fcd7407777ff12fe317f04',
     'TaskLog': '1.0-78b0534366f29aa3eebb01860fbe18fe',
     'TaskLogList': '1.0-cc8cce1af8a283b9d28b55fcd682e777',
     'Tag': '1.1-8b8d7d5b48887651a0e01241672e2963',
@@ -177,6 +177,11 @@ class _TestServiceObject(object):
         self.assertEqual(1, len(services))
         mock_get.assert_called_once_with(self.context, 'fake-binary')
 
+    @mock.patch('nova.servicegroup.heartbeat.HEARTBEATS.add')
+    def test_report_heartbeats(self, mock_add):
+        service.ServiceList.report_heartbeats(self.context, [1, 2])
+        mock_add.assert_called_once_with([1, 2])
+
     def test_get_by_host(self):
         self.mox.StubOutWithMock(db, 'service_get_all_by_host')
         db.service_get_all_by_host(self.context, 'fake-host').AndReturn(
@@ -207,7 +212,7 @@ class _TestServiceObject(object):
         agg.create()
         agg.hosts = [fake_service['host']]
         aggregate.AggregateList.get_by_metadata_key(self.context,
-            'availability_zone', hosts=set(agg.hosts)).AndReturn([agg])
+            'availability_zone').AndReturn([agg])
         self.mox.ReplayAll()
         services = service.ServiceList.get_all(self.context, set_zones=True)
         self.assertEqual(1, len(services))
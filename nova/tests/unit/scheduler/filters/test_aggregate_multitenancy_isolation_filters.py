@@ -12,6 +12,8 @@
 
 import mock
 
+from nova import objects
+from nova.scheduler import aggregate_index
 from nova.scheduler.filters import aggregate_multitenancy_isolation as ami
 from nova import test
 from nova.tests.unit.scheduler import fakes
@@ -72,3 +74,25 @@ class TestAggregateMultitenancyIsolationFilter(test.NoDBTestCase):
                                      'project_id': 'my_tenantid'}}}
         host = fakes.FakeHostState('host1', 'compute', {})
         self.assertTrue(self.filt_cls.host_passes(host, filter_properties))
+
+    def test_aggregate_multi_tenancy_isolation_index(self, agg_mock):
+        agg_mock.return_value = {'filter_tenant_id': set(['my_tenantid'])}
+        index = aggregate_index.AggregateMetadataIndex()
+        index.update_host('host1', [objects.Aggregate(
+            id=1, metadata={'filter_tenant_id': 'my_tenantid'})])
+        index.update_host('host2', [])
+        host1 = fakes.FakeHostState('host1', 'compute',
+                                    {'aggregate_index': index})
+        host2 = fakes.FakeHostState('host2', 'compute',
+                                    {'aggregate_index': index})
+
+        def _props(tenant_id):
+            return {'context': mock.sentinel.ctx,
+                    'request_spec': {
+                        'instance_properties': {'project_id': tenant_id}}}
+
+        self.assertTrue(self.filt_cls.host_passes(host1,
+                                                  _props('my_tenantid')))
+        self.assertTrue(self.filt_cls.host_passes(host2, _props('other')))
+        self.assertFalse(agg_mock.called)
+        self.assertFalse(self.filt_cls.host_passes(host1, _props('other')))
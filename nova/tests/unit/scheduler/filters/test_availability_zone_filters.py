@@ -12,6 +12,8 @@
 
 import mock
 
+from nova import objects
+from nova.scheduler import aggregate_index
 from nova.scheduler.filters import availability_zone_filter
 from nova import test
 from nova.tests.unit.scheduler import fakes
@@ -52,3 +54,19 @@ class TestAvailabilityZoneFilter(test.NoDBTestCase):
         request = self._make_zone_request('bad')
         host = fakes.FakeHostState('host1', 'node1', {})
         self.assertFalse(self.filt_cls.host_passes(host, request))
+
+    def test_availability_zone_filter_index(self, agg_mock):
+        self.flags(default_availability_zone='nova')
+        index = aggregate_index.AggregateMetadataIndex()
+        index.update_host('host1', [objects.Aggregate(
+            id=1, metadata={'availability_zone': 'az1'})])
+        index.update_host('host2', [])
+        host1 = fakes.FakeHostState('host1', 'node1',
+                                    {'aggregate_index': index})
+        host2 = fakes.FakeHostState('host2', 'node2',
+                                    {'aggregate_index': index})
+        self.assertTrue(self.filt_cls.host_passes(
+            host1, self._make_zone_request('az1')))
+        self.assertTrue(self.filt_cls.host_passes(
+            host2, self._make_zone_request('nova')))
+        self.assertFalse(agg_mock.called)
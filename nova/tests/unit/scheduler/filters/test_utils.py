@@ -88,6 +88,34 @@ class TestUtils(test.NoDBTestCase):
 
         self.assertEqual({}, metadata)
 
+    def test_aggregate_metadata_fingerprint(self):
+        host_state = fakes.FakeHostState('fake', 'node', {})
+        host_state.aggregates = _AGGREGATE_FIXTURES
+        other_state = fakes.FakeHostState('other', 'node', {})
+        other_state.aggregates = list(reversed(_AGGREGATE_FIXTURES))
+        self.assertEqual(utils.aggregate_metadata_fingerprint(host_state),
+                         utils.aggregate_metadata_fingerprint(other_state))
+        other_state.aggregates = _AGGREGATE_FIXTURES[:2]
+        self.assertNotEqual(utils.aggregate_metadata_fingerprint(host_state),
+                            utils.aggregate_metadata_fingerprint(other_state))
+
+    def test_freeze(self):
+        value = utils.freeze({'a': [1, {'b': set([2])}], 'c': 'd'})
+        self.assertEqual(hash(value), hash(utils.freeze(
+            {'c': 'd', 'a': [1, {'b': set([2])}]})))
+        self.assertNotEqual(value, utils.freeze({'a': [1], 'c': 'd'}))
+
+    def test_lru_cache(self):
+        cache = utils.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+
     def test_validate_num_values(self):
         f = utils.validate_num_values
 
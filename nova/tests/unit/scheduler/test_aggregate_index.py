@@ -0,0 +1,86 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests For the aggregate metadata index.
+"""
+
+from nova import objects
+from nova.scheduler import aggregate_index
+from nova.scheduler.filters import utils
+from nova import test
+from nova.tests.unit.scheduler import fakes
+
+
+class AggregateMetadataIndexTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(AggregateMetadataIndexTestCase, self).setUp()
+        self.agg1 = objects.Aggregate(id=1, hosts=['host1'],
+                                      metadata={'availability_zone': 'az1',
+                                                'k1': 'a, b'})
+        self.agg2 = objects.Aggregate(id=2, hosts=['host1', 'host2'],
+                                      metadata={'k1': 'c'})
+        self.index = aggregate_index.AggregateMetadataIndex()
+        self.index.update_host('host1', [self.agg1, self.agg2])
+        self.index.update_host('host2', [self.agg2])
+        self.index.update_host('host3', [])
+
+    def _host_state(self, host):
+        host_state = fakes.FakeHostState(host, 'node', {})
+        host_state.aggregates = self.index.get_aggregates(host)
+        return host_state
+
+    def test_contains(self):
+        self.assertIn('host3', self.index)
+        self.assertNotIn('host4', self.index)
+        self.assertEqual([], self.index.get_aggregates('host4'))
+
+    def test_metadata_get_by_host_matches_utils(self):
+        for host in ('host1', 'host2', 'host3'):
+            host_state = self._host_state(host)
+            for key in (None, 'k1', 'availability_zone'):
+                self.assertEqual(
+                    utils.aggregate_metadata_get_by_host(host_state, key),
+                    self.index.metadata_get_by_host(host, key))
+            self.assertEqual(
+                utils.aggregate_values_from_key(host_state, 'k1'),
+                self.index.values_from_key(host, 'k1'))
+            self.assertEqual(
+                utils.aggregate_metadata_fingerprint(host_state),
+                self.index.metadata_fingerprint(host))
+
+    def test_utils_use_index(self):
+        host_state = fakes.FakeHostState('host2', 'node', {})
+        host_state.aggregate_index = self.index
+        self.assertEqual({'k1': set(['c'])},
+                         utils.aggregate_metadata_get_by_host(host_state))
+        self.assertEqual(set(['c']),
+                         utils.aggregate_values_from_key(host_state, 'k1'))
+
+    def test_get_hosts(self):
+        self.assertEqual(set(['host1', 'host2']),
+                         self.index.get_hosts_with_key('k1'))
+        self.assertEqual(set(['host1']), self.index.get_hosts('k1', 'b'))
+        self.assertEqual(set(['host1', 'host2']),
+                         self.index.get_hosts('k1', 'c'))
+        self.assertEqual(set(), self.index.get_hosts('k1', 'd'))
+        self.assertEqual(set(), self.index.get_hosts_with_key('k2'))
+
+    def test_update_host(self):
+        self.assertEqual(set(['c']), self.index.values_from_key('host2', 'k1'))
+        self.assertEqual(set(['host1']),
+                         self.index.get_hosts('availability_zone', 'az1'))
+        self.index.update_host('host2', [self.agg1])
+        self.assertEqual(set(['a, b']),
+                         self.index.values_from_key('host2', 'k1'))
+        self.assertEqual(set(['host1', 'host2']),
+                         self.index.get_hosts('availability_zone', 'az1'))
@@ -13,6 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+
+import fixtures
 import mock
 from oslo_utils import timeutils
 from six.moves import range
@@ -94,6 +97,44 @@ class CachingSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertEqual(1, len(result))
         self.assertEqual(result[0]["host"], fake_host.host)
 
+    @mock.patch.object(host_manager.HostManager, '_init_instance_info')
+    @mock.patch.object(host_manager.HostManager, '_init_aggregates')
+    def test_shared_cache_claims_seen_by_other_worker(self, mock_init_agg,
+                                                      mock_init_inst):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'claims')
+        self.flags(scheduler_shared_cache_file=path,
+                   scheduler_shared_cache_slots=16)
+        worker1 = caching_scheduler.CachingScheduler()
+        worker2 = caching_scheduler.CachingScheduler()
+        host_state1 = self._get_fake_host_state()
+        host_state2 = self._get_fake_host_state()
+        worker1.all_host_states = [host_state1]
+        worker2.all_host_states = [host_state2]
+
+        instance_properties = dict(
+            self._get_fake_request_spec()['instance_properties'],
+            numa_topology=None)
+        worker1._consume_host(host_state1, instance_properties)
+        self.assertEqual(50000 - 512, host_state1.free_ram_mb)
+        self.assertEqual(50000, host_state2.free_ram_mb)
+
+        worker2._get_all_host_states(self.context)
+        self.assertEqual(50000 - 512, host_state2.free_ram_mb)
+        self.assertEqual(1, host_state2.num_instances)
+        self.assertEqual(1, host_state2.vcpus_used)
+
+        # Claims are only applied once
+        worker2._get_all_host_states(self.context)
+        self.assertEqual(50000 - 512, host_state2.free_ram_mb)
+
+        # A claim by worker2 also picks up the claims it has not seen yet
+        worker1._consume_host(host_state1, instance_properties)
+        worker2._consume_host(host_state2, instance_properties)
+        self.assertEqual(50000 - 3 * 512, host_state2.free_ram_mb)
+        worker1._get_all_host_states(self.context)
+        self.assertEqual(50000 - 3 * 512, host_state1.free_ram_mb)
+
     def _test_select_destinations(self, request_spec):
         return self.driver.select_destinations(
                 self.context, request_spec, {})
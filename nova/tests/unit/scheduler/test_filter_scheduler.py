@@ -53,7 +53,7 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
 
         self.next_weight = 1.0
 
-        def _fake_weigh_objects(_self, functions, hosts, options):
+        def _fake_weigh_objects(_self, functions, hosts, options, limit=None):
             self.next_weight += 2.0
             host_state = hosts[0]
             return [weights.WeighedHost(host_state, self.next_weight)]
@@ -206,7 +206,7 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
 
         self.next_weight = 50
 
-        def _fake_weigh_objects(_self, functions, hosts, options):
+        def _fake_weigh_objects(_self, functions, hosts, options, limit=None):
             this_weight = self.next_weight
             self.next_weight = 0
             host_state = hosts[0]
@@ -257,7 +257,7 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         selected_hosts = []
         selected_nodes = []
 
-        def _fake_weigh_objects(_self, functions, hosts, options):
+        def _fake_weigh_objects(_self, functions, hosts, options, limit=None):
             self.next_weight += 2.0
             host_state = hosts[0]
             selected_hosts.append(host_state.host)
@@ -286,6 +286,43 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertEqual(host, selected_hosts[0])
         self.assertEqual(node, selected_nodes[0])
 
+    def test_schedule_batch_placement(self):
+        self.flags(scheduler_batch_placement=True)
+        host_states = [fakes.FakeHostState('host%s' % x, 'node%s' % x,
+                                           {'free_ram_mb': 4096,
+                                            'total_usable_ram_mb': 4096,
+                                            'free_disk_mb': 102400,
+                                            'vcpus_total': 8})
+                       for x in range(4)]
+        request_spec = {'num_instances': 4,
+                        'instance_type': {'memory_mb': 512, 'root_gb': 1,
+                                          'ephemeral_gb': 0, 'vcpus': 1},
+                        'instance_properties': {'project_id': 1,
+                                                'root_gb': 1,
+                                                'memory_mb': 512,
+                                                'ephemeral_gb': 0,
+                                                'vcpus': 1,
+                                                'os_type': 'Linux'}}
+        host_manager = self.driver.host_manager
+        with test.nested(
+            mock.patch.object(host_manager, 'get_all_host_states',
+                              return_value=host_states),
+            mock.patch.object(host_manager, 'get_filtered_hosts',
+                              side_effect=fake_get_filtered_hosts)
+        ) as (mock_get_all, mock_filter):
+            selected_hosts = self.driver._schedule(self.context,
+                                                   request_spec, {})
+
+        self.assertEqual(4, len(selected_hosts))
+        # The RAM weigher spreads the instances over all the hosts
+        self.assertEqual(set(host_states),
+                         set(host.obj for host in selected_hosts))
+        # All hosts are filtered once, then only the chosen ones
+        self.assertEqual(4, mock_filter.call_count)
+        self.assertEqual(4, len(mock_filter.call_args_list[0][0][0]))
+        for call in mock_filter.call_args_list[1:]:
+            self.assertEqual(1, len(call[0][0]))
+
     @mock.patch.object(filter_scheduler.FilterScheduler, '_schedule')
     def test_select_destinations_notifications(self, mock_schedule):
         mock_schedule.return_value = [mock.Mock()]
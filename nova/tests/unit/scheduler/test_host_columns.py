@@ -0,0 +1,196 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests For the columnar HostState view and the vectorized filters.
+"""
+
+import mock
+import testtools
+
+from nova import objects
+from nova.scheduler import filters
+from nova.scheduler.filters import availability_zone_filter
+from nova.scheduler.filters import compute_filter
+from nova.scheduler.filters import core_filter
+from nova.scheduler.filters import disk_filter
+from nova.scheduler.filters import io_ops_filter
+from nova.scheduler.filters import num_instances_filter
+from nova.scheduler.filters import ram_filter
+from nova.scheduler import host_columns
+from nova.scheduler import weights
+from nova.scheduler.weights import io_ops
+from nova.scheduler.weights import ram
+from nova import test
+from nova.tests.unit.scheduler import fakes
+
+
+class FakeFilter(filters.BaseHostFilter):
+    def host_passes(self, host_state, filter_properties):
+        return host_state.host != 'host2'
+
+
+@testtools.skipIf(host_columns.numpy is None, 'NumPy is not installed')
+class HostStateColumnsTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(HostStateColumnsTestCase, self).setUp()
+        self.flags(ram_allocation_ratio=1.0, cpu_allocation_ratio=1.0,
+                   disk_allocation_ratio=1.0)
+        agg = objects.Aggregate(id=1, name='az1', hosts=['host1'],
+                                metadata={'availability_zone': 'az1'})
+        self.hosts = [
+            fakes.FakeHostState('host1', 'node1',
+                {'free_ram_mb': 1024, 'total_usable_ram_mb': 1024,
+                 'free_disk_mb': 10 * 1024, 'total_usable_disk_gb': 10,
+                 'vcpus_total': 4, 'vcpus_used': 0, 'num_io_ops': 0,
+                 'num_instances': 0, 'aggregates': [agg],
+                 'service': {'disabled': False}}),
+            fakes.FakeHostState('host2', 'node2',
+                {'free_ram_mb': 512, 'total_usable_ram_mb': 1024,
+                 'free_disk_mb': 1024, 'total_usable_disk_gb': 10,
+                 'vcpus_total': 4, 'vcpus_used': 4, 'num_io_ops': 8,
+                 'num_instances': 50, 'service': {'disabled': False}}),
+            fakes.FakeHostState('host3', 'node3',
+                {'free_ram_mb': 2048, 'total_usable_ram_mb': 2048,
+                 'free_disk_mb': 20 * 1024, 'total_usable_disk_gb': 20,
+                 'vcpus_total': 0, 'vcpus_used': 0, 'num_io_ops': 0,
+                 'num_instances': 0, 'service': {'disabled': True}}),
+        ]
+        self.columns = host_columns.HostStateColumns(self.hosts)
+        self.view = self.columns.view(self.hosts)
+
+    def _passes(self, filter_obj, filter_properties):
+        mask = filter_obj.host_columns_passes(self.view, filter_properties)
+        return [host.host for host in self.view.compress(mask).host_states]
+
+    def test_view_untracked_host(self):
+        other = fakes.FakeHostState('host4', 'node4', {})
+        self.assertIsNone(self.columns.view(self.hosts + [other]))
+
+    def test_ram_filter(self):
+        filter_properties = {'instance_type': {'memory_mb': 1024}}
+        self.assertEqual(['host1', 'host3'],
+                         self._passes(ram_filter.RamFilter(),
+                                      filter_properties))
+        self.assertEqual(1024.0, self.hosts[0].limits['memory_mb'])
+        self.assertNotIn('memory_mb', self.hosts[1].limits)
+
+    def test_core_filter(self):
+        filter_properties = {'instance_type': {'vcpus': 1}}
+        self.assertEqual(['host1', 'host3'],
+                         self._passes(core_filter.CoreFilter(),
+                                      filter_properties))
+        self.assertEqual(4.0, self.hosts[0].limits['vcpu'])
+        self.assertNotIn('vcpu', self.hosts[2].limits)
+
+    def test_disk_filter(self):
+        filter_properties = {'instance_type': {'root_gb': 2,
+                                               'ephemeral_gb': 0,
+                                               'swap': 0}}
+        self.assertEqual(['host1', 'host3'],
+                         self._passes(disk_filter.DiskFilter(),
+                                      filter_properties))
+        self.assertEqual(10.0, self.hosts[0].limits['disk_gb'])
+
+    def test_io_ops_and_num_instances_filters(self):
+        self.assertEqual(['host1', 'host3'],
+                         self._passes(io_ops_filter.IoOpsFilter(), {}))
+        self.assertEqual(['host1', 'host3'],
+                         self._passes(
+                             num_instances_filter.NumInstancesFilter(), {}))
+
+    def test_aggregate_subclasses_not_vectorized(self):
+        self.assertFalse(disk_filter.AggregateDiskFilter.supports_host_columns)
+        self.assertFalse(
+            io_ops_filter.AggregateIoOpsFilter.supports_host_columns)
+        self.assertFalse(num_instances_filter.AggregateNumInstancesFilter
+                         .supports_host_columns)
+
+    @mock.patch('nova.servicegroup.API.service_is_up', return_value=True)
+    def test_compute_filter(self, mock_is_up):
+        self.assertEqual(['host1', 'host2'],
+                         self._passes(compute_filter.ComputeFilter(), {}))
+        self.assertEqual(2, mock_is_up.call_count)
+
+    def test_availability_zone_filter(self):
+        self.flags(default_availability_zone='nova')
+        filt = availability_zone_filter.AvailabilityZoneFilter()
+
+        def _props(az):
+            return {'request_spec': {'instance_properties':
+                                     {'availability_zone': az}}}
+
+        self.assertEqual(['host1'], self._passes(filt, _props('az1')))
+        self.assertEqual(['host2', 'host3'],
+                         self._passes(filt, _props('nova')))
+        self.assertEqual(['host1', 'host2', 'host3'],
+                         self._passes(filt, _props(None)))
+
+    def test_consume_from_instance_updates_row(self):
+        self.hosts[0].consume_from_instance(
+            {'root_gb': 1, 'ephemeral_gb': 0, 'memory_mb': 512, 'vcpus': 1,
+             'numa_topology': None})
+        self.assertEqual(512, self.columns.free_ram_mb[0])
+        self.assertEqual(1, self.columns.vcpus_used[0])
+        self.assertEqual(1, self.columns.num_instances[0])
+
+    def test_get_filtered_objects_mixed_filters(self):
+        handler = filters.HostFilterHandler()
+        filter_properties = {'instance_type': {'memory_mb': 512}}
+        result = handler.get_filtered_objects(
+            [ram_filter.RamFilter(), FakeFilter(), ram_filter.RamFilter()],
+            self.hosts, filter_properties, host_columns=self.columns)
+        self.assertEqual(['host1', 'host3'], [host.host for host in result])
+
+    def test_get_weighed_objects_matches_per_host_path(self):
+        handler = weights.HostWeightHandler()
+        self.flags(io_ops_weight_multiplier=-2.0)
+        expected = handler.get_weighed_objects(
+            [ram.RAMWeigher(), io_ops.IoOpsWeigher()], self.hosts, {})
+        result = handler.get_weighed_objects(
+            [ram.RAMWeigher(), io_ops.IoOpsWeigher()], self.hosts, {},
+            host_columns=self.columns)
+        self.assertEqual([(w.obj.host, w.weight) for w in expected],
+                         [(w.obj.host, w.weight) for w in result])
+
+    def test_get_weighed_objects_limit(self):
+        handler = weights.HostWeightHandler()
+        result = handler.get_weighed_objects(
+            [ram.RAMWeigher()], self.hosts, {}, limit=1,
+            host_columns=self.columns)
+        self.assertEqual(['host3'], [w.obj.host for w in result])
+        self.assertEqual(1.0, result[0].weight)
+
+    def test_get_weighed_objects_limit_keeps_order_of_ties(self):
+        hosts = [fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                     {'free_ram_mb': 1024,
+                                      'total_usable_ram_mb': 1024})
+                 for i in range(20)]
+        columns = host_columns.HostStateColumns(hosts)
+        handler = weights.HostWeightHandler()
+        result = handler.get_weighed_objects(
+            [ram.RAMWeigher()], hosts, {}, limit=5, host_columns=columns)
+        self.assertEqual(['host%d' % i for i in range(5)],
+                         [w.obj.host for w in result])
+
+    def test_get_weighed_objects_limit_partial_selection(self):
+        free_ram = [512, 1024, 1024, 256, 1024, 2048]
+        hosts = [fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                     {'free_ram_mb': ram_mb,
+                                      'total_usable_ram_mb': 2048})
+                 for i, ram_mb in enumerate(free_ram)]
+        columns = host_columns.HostStateColumns(hosts)
+        handler = weights.HostWeightHandler()
+        result = handler.get_weighed_objects(
+            [ram.RAMWeigher()], hosts, {}, limit=3, host_columns=columns)
+        self.assertEqual(['host5', 'host1', 'host2'],
+                         [w.obj.host for w in result])
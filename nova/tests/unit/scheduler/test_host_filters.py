@@ -15,9 +15,12 @@
 Tests For Scheduler Host Filters.
 """
 
+import mock
+
 from nova.scheduler import filters
 from nova.scheduler.filters import all_hosts_filter
 from nova.scheduler.filters import compute_filter
+from nova.scheduler.filters import image_props_filter
 from nova import test
 from nova.tests.unit.scheduler import fakes
 
@@ -36,3 +39,38 @@ class HostFiltersTestCase(test.NoDBTestCase):
         filt_cls = all_hosts_filter.AllHostsFilter()
         host = fakes.FakeHostState('host1', 'node1', {})
         self.assertTrue(filt_cls.host_passes(host, {}))
+
+    @mock.patch('nova.scheduler.filters.image_props_filter.'
+                'ImagePropertiesFilter.host_passes', return_value=False)
+    def test_memoized_host_passes(self, mock_passes):
+        filt_cls = image_props_filter.ImagePropertiesFilter()
+        hosts = [fakes.FakeHostState('host%d' % i, 'node',
+                                     {'supported_instances': [
+                                         ['x86_64', 'kvm', 'hvm']],
+                                      'hypervisor_version': 6000000})
+                 for i in range(3)]
+        filter_properties = {'request_spec': {'image': {'properties': {
+            'architecture': 'x86_64', 'hypervisor_type': 'kvm'}}}}
+        self.assertEqual([], list(filt_cls.filter_all(hosts,
+                                                      filter_properties)))
+        self.assertEqual([], list(filt_cls.filter_all(hosts,
+                                                      filter_properties)))
+        mock_passes.assert_called_once_with(hosts[0], filter_properties)
+
+        filter_properties['request_spec']['image']['properties'][
+            'architecture'] = 'i686'
+        self.assertEqual([], list(filt_cls.filter_all(hosts,
+                                                      filter_properties)))
+        self.assertEqual(2, mock_passes.call_count)
+
+    @mock.patch('nova.scheduler.filters.image_props_filter.'
+                'ImagePropertiesFilter.host_passes', return_value=True)
+    def test_memoized_host_passes_disabled(self, mock_passes):
+        self.flags(scheduler_filter_memo_size=0)
+        filt_cls = image_props_filter.ImagePropertiesFilter()
+        hosts = [fakes.FakeHostState('host%d' % i, 'node',
+                                     {'supported_instances': [],
+                                      'hypervisor_version': 1})
+                 for i in range(3)]
+        self.assertEqual(hosts, list(filt_cls.filter_all(hosts, {})))
+        self.assertEqual(3, mock_passes.call_count)
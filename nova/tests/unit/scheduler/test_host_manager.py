@@ -17,6 +17,7 @@ Tests For HostManager
 """
 
 import collections
+import datetime
 
 import mock
 from oslo_config import cfg
@@ -97,20 +98,29 @@ class HostManagerTestCase(test.NoDBTestCase):
         mock_spawn.side_effect = lambda f, *a, **k: f(*a, **k)
         cn1 = objects.ComputeNode(host='host1')
         cn2 = objects.ComputeNode(host='host2')
-        inst1 = objects.Instance(host='host1', uuid='uuid1')
-        inst2 = objects.Instance(host='host1', uuid='uuid2')
-        inst3 = objects.Instance(host='host2', uuid='uuid3')
+        inst1 = objects.Instance(host='host1', uuid='uuid1',
+                                 instance_type_id=1)
+        inst2 = objects.Instance(host='host1', uuid='uuid2',
+                                 instance_type_id=2)
+        inst3 = objects.Instance(host='host2', uuid='uuid3',
+                                 instance_type_id=1)
         mock_get_all.return_value = objects.ComputeNodeList(objects=[cn1, cn2])
         mock_get_by_filters.return_value = objects.InstanceList(
                 objects=[inst1, inst2, inst3])
         hm = self.host_manager
         hm._instance_info = {}
         hm._init_instance_info()
+        mock_get_by_filters.assert_called_once_with(
+            mock.ANY, {'host': ['host1', 'host2']}, expected_attrs=[],
+            fields=host_manager.InstanceView.FIELDS)
         self.assertEqual(len(hm._instance_info), 2)
         fake_info = hm._instance_info['host1']
         self.assertIn('uuid1', fake_info['instances'])
         self.assertIn('uuid2', fake_info['instances'])
         self.assertNotIn('uuid3', fake_info['instances'])
+        view = fake_info['instances']['uuid2']
+        self.assertIsInstance(view, host_manager.InstanceView)
+        self.assertEqual(2, view.instance_type_id)
 
     def test_default_filters(self):
         default_filters = self.host_manager.default_filters
@@ -166,6 +176,38 @@ class HostManagerTestCase(test.NoDBTestCase):
         self.assertEqual({'fake-host': set([])},
                          self.host_manager.host_aggregates_map)
 
+    def test_update_aggregates_updates_index(self):
+        fake_agg = objects.Aggregate(id=1, hosts=['fake-host'],
+                                     metadata={'k1': 'v1'})
+        self.host_manager.update_aggregates([fake_agg])
+        self.assertEqual([fake_agg],
+                         self.host_manager.aggregate_index.get_aggregates(
+                             'fake-host'))
+        self.assertEqual(set(['fake-host']),
+                         self.host_manager.aggregate_index.get_hosts('k1',
+                                                                     'v1'))
+        fake_agg.hosts = []
+        fake_agg.metadata = {'k1': 'v2'}
+        self.host_manager.update_aggregates([fake_agg])
+        self.assertEqual([],
+                         self.host_manager.aggregate_index.get_aggregates(
+                             'fake-host'))
+        self.assertEqual(set(),
+                         self.host_manager.aggregate_index.get_hosts('k1',
+                                                                     'v1'))
+
+    def test_delete_aggregate_updates_index(self):
+        fake_agg = objects.Aggregate(id=1, hosts=['fake-host'],
+                                     metadata={'k1': 'v1'})
+        self.host_manager.update_aggregates([fake_agg])
+        self.host_manager.delete_aggregate(fake_agg)
+        self.assertEqual([],
+                         self.host_manager.aggregate_index.get_aggregates(
+                             'fake-host'))
+        self.assertEqual(set(),
+                         self.host_manager.aggregate_index.get_hosts_with_key(
+                             'k1'))
+
     def test_delete_aggregate(self):
         fake_agg = objects.Aggregate(id=1, hosts=['fake-host'])
         self.host_manager.host_aggregates_map = collections.defaultdict(
@@ -500,7 +542,7 @@ class HostManagerTestCase(test.NoDBTestCase):
         host_state = host_manager.HostState('host1', cn1)
         self.assertFalse(host_state.instances)
         mock_get_by_host.return_value = None
-        hm._add_instance_info(context, cn1, host_state)
+        hm._add_instance_info(context, host_state)
         self.assertFalse(mock_get_by_host.called)
         self.assertTrue(host_state.instances)
         self.assertEqual(host_state.instances['uuid1'], inst1)
@@ -522,8 +564,10 @@ class HostManagerTestCase(test.NoDBTestCase):
         host_state = host_manager.HostState('host1', cn1)
         self.assertFalse(host_state.instances)
         mock_get_by_host.return_value = objects.InstanceList(objects=[inst1])
-        hm._add_instance_info(context, cn1, host_state)
-        mock_get_by_host.assert_called_once_with(context, cn1.host)
+        hm._add_instance_info(context, host_state)
+        mock_get_by_host.assert_called_once_with(
+            context, cn1.host, expected_attrs=[],
+            fields=host_manager.InstanceView.FIELDS)
         self.assertTrue(host_state.instances)
         self.assertEqual(host_state.instances['uuid1'], inst1)
 
@@ -543,8 +587,13 @@ class HostManagerTestCase(test.NoDBTestCase):
                     'updated': True,
                 }}
         self.host_manager._recreate_instance_info('fake_context', host_name)
+        mock_get_by_host.assert_called_once_with(
+            'fake_context', host_name, expected_attrs=[],
+            fields=host_manager.InstanceView.FIELDS)
         new_info = self.host_manager._instance_info[host_name]
         self.assertEqual(len(new_info['instances']), len(new_inst_list))
+        self.assertIsInstance(new_info['instances']['aaa'],
+                              host_manager.InstanceView)
         self.assertFalse(new_info['updated'])
 
     def test_update_instance_info(self):
@@ -569,6 +618,9 @@ class HostManagerTestCase(test.NoDBTestCase):
         new_info = self.host_manager._instance_info[host_name]
         self.assertEqual(len(new_info['instances']), 4)
         self.assertTrue(new_info['updated'])
+        view = new_info['instances']['ccc']
+        self.assertIsInstance(view, host_manager.InstanceView)
+        self.assertEqual(inst3.instance_type_id, view.instance_type_id)
 
     def test_update_instance_info_unknown_host(self):
         self.host_manager._recreate_instance_info = mock.MagicMock()
@@ -751,6 +803,92 @@ class HostManagerChangedNodesTestCase(test.NoDBTestCase):
         host_states_map = self.host_manager.host_state_map
         self.assertEqual(len(host_states_map), 0)
 
+    @mock.patch('nova.objects.InstanceList.get_by_host',
+                return_value=objects.InstanceList())
+    @mock.patch('nova.objects.ComputeNodeList.get_all_changed_since')
+    @mock.patch('nova.objects.ServiceList.get_by_binary_changed_since')
+    @mock.patch('nova.objects.ComputeNodeList.get_all',
+                return_value=fakes.COMPUTE_NODES)
+    @mock.patch('nova.objects.ServiceList.get_by_binary',
+                return_value=fakes.SERVICES)
+    def test_get_all_host_states_incremental(self, svc_get_by_binary,
+                                             cn_get_all, svc_changed,
+                                             cn_changed, mock_get_by_host):
+        context = 'fake_context'
+        self.host_manager.incremental_host_refresh = True
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(4, len(self.host_manager.host_state_map))
+
+        # node2 is updated, node4 is deleted and host3 gets disabled
+        node2 = fakes.COMPUTE_NODES[1].obj_clone()
+        node2.free_ram_mb = 42
+        node2.deleted = False
+        node4 = fakes.COMPUTE_NODES[3].obj_clone()
+        node4.deleted = True
+        cn_changed.return_value = [node2, node4]
+        svc_changed.return_value = [
+            objects.Service(host='host3', disabled=True, deleted=False)]
+        self.host_manager.get_all_host_states(context)
+
+        self.assertEqual(1, cn_get_all.call_count)
+        self.assertEqual(1, svc_get_by_binary.call_count)
+        host_states_map = self.host_manager.host_state_map
+        self.assertEqual(set([('host1', 'node1'), ('host2', 'node2')]),
+                         set(host_states_map.keys()))
+        self.assertEqual(42, host_states_map[('host2', 'node2')].free_ram_mb)
+
+    @mock.patch('nova.objects.InstanceList.get_by_host',
+                return_value=objects.InstanceList())
+    @mock.patch('nova.objects.ComputeNodeList.get_all_changed_since')
+    @mock.patch('nova.objects.ServiceList.get_by_binary_changed_since',
+                return_value=[])
+    @mock.patch('nova.objects.ComputeNodeList.get_all',
+                return_value=fakes.COMPUTE_NODES)
+    @mock.patch('nova.objects.ServiceList.get_by_binary',
+                return_value=fakes.SERVICES)
+    def test_get_all_host_states_incremental_keeps_claims(
+            self, svc_get_by_binary, cn_get_all, svc_changed, cn_changed,
+            mock_get_by_host):
+        context = 'fake_context'
+        self.host_manager.incremental_host_refresh = True
+        self.host_manager.get_all_host_states(context)
+        host_state = self.host_manager.host_state_map[('host1', 'node1')]
+        instance = dict(root_gb=0, ephemeral_gb=0, memory_mb=128, vcpus=1,
+                        project_id='12345', vm_state=vm_states.BUILDING,
+                        task_state=task_states.SCHEDULING, os_type='Linux',
+                        uuid='fake-uuid', numa_topology=None,
+                        pci_requests={'requests': []})
+        host_state.consume_from_instance(instance)
+        self.assertEqual(384, host_state.free_ram_mb)
+
+        # node1 did not change: the claim stays until node1 reports again
+        cn_changed.return_value = []
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(384, host_state.free_ram_mb)
+
+        # node1 reports after the claim, which reverts it
+        node1 = fakes.COMPUTE_NODES[0].obj_clone()
+        node1.deleted = False
+        node1.updated_at = host_state.updated + datetime.timedelta(seconds=1)
+        cn_changed.return_value = [node1]
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(512, host_state.free_ram_mb)
+
+    @mock.patch('nova.objects.InstanceList.get_by_host',
+                return_value=objects.InstanceList())
+    @mock.patch('oslo_utils.timeutils.is_older_than', return_value=True)
+    @mock.patch('nova.objects.ComputeNodeList.get_all',
+                return_value=fakes.COMPUTE_NODES)
+    @mock.patch('nova.objects.ServiceList.get_by_binary',
+                return_value=fakes.SERVICES)
+    def test_get_all_host_states_incremental_full_refresh(
+            self, svc_get_by_binary, cn_get_all, mock_older,
+            mock_get_by_host):
+        self.host_manager.incremental_host_refresh = True
+        self.host_manager.get_all_host_states('fake_context')
+        self.host_manager.get_all_host_states('fake_context')
+        self.assertEqual(2, cn_get_all.call_count)
+
 
 class HostStateTestCase(test.NoDBTestCase):
     """Test case for HostState class."""
@@ -989,3 +1127,23 @@ class HostStateTestCase(test.NoDBTestCase):
         self.assertEqual('string2', host.metrics['res2'].value)
         self.assertEqual('source2', host.metrics['res2'].source)
         self.assertIsInstance(host.numa_topology, six.string_types)
+
+
+class InstanceViewTestCase(test.NoDBTestCase):
+    """Test case for the InstanceView class."""
+
+    def test_from_instance(self):
+        inst = objects.Instance(uuid='fake-uuid', host='fake_host',
+                                instance_type_id=3, vm_state='active')
+        view = host_manager.InstanceView.from_instance(inst)
+        self.assertEqual('fake-uuid', view.uuid)
+        self.assertEqual('fake_host', view.host)
+        self.assertEqual(3, view.instance_type_id)
+        self.assertFalse(hasattr(view, '__dict__'))
+
+    def test_from_instance_unset_fields(self):
+        inst = objects.Instance(uuid='fake-uuid')
+        view = host_manager.InstanceView.from_instance(inst)
+        self.assertEqual('fake-uuid', view.uuid)
+        self.assertIsNone(view.host)
+        self.assertIsNone(view.instance_type_id)
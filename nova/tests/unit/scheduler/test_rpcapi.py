@@ -16,6 +16,7 @@
 Unit Tests for nova.scheduler.rpcapi
 """
 
+import mock
 from mox3 import mox
 from oslo_config import cfg
 
@@ -101,3 +102,15 @@ class SchedulerRpcAPITestCase(test.NoDBTestCase):
                 instance_uuids=['fake1', 'fake2'],
                 fanout=True,
                 version='4.2')
+
+    def test_get_stats(self):
+        ctxt = context.RequestContext('fake_user', 'fake_project')
+        rpcapi = scheduler_rpcapi.SchedulerAPI()
+        with mock.patch.object(rpcapi, 'client') as mock_client:
+            cctxt = mock_client.prepare.return_value
+            cctxt.call.return_value = 'foo'
+            self.assertEqual('foo', rpcapi.get_stats(ctxt, 'fake_host',
+                                                     reset=True))
+            mock_client.prepare.assert_called_once_with(server='fake_host',
+                                                        version='4.3')
+            cctxt.call.assert_called_once_with(ctxt, 'get_stats', reset=True)
@@ -24,6 +24,7 @@ from nova import db
 from nova.scheduler import driver
 from nova.scheduler import host_manager
 from nova.scheduler import manager
+from nova.scheduler import stats
 from nova import servicegroup
 from nova import test
 from nova.tests.unit import fake_server_actions
@@ -104,6 +105,18 @@ class SchedulerManagerTestCase(test.NoDBTestCase):
                                               mock.sentinel.host_name,
                                               mock.sentinel.instance_uuids)
 
+    @mock.patch.object(manager.QUOTAS, 'usage_reconcile')
+    def test_reconcile_quota_usages(self, mock_reconcile):
+        self.manager._reconcile_quota_usages(self.context)
+        mock_reconcile.assert_called_once_with(self.context)
+
+    def test_get_stats(self):
+        stats.STATS.reset()
+        stats.STATS.add('filter:Foo', 0.5)
+        result = self.manager.get_stats(self.context, reset=True)
+        self.assertEqual(1, result['filter:Foo']['count'])
+        self.assertEqual({}, self.manager.get_stats(self.context))
+
 
 class SchedulerV3PassthroughTestCase(test.NoDBTestCase):
 
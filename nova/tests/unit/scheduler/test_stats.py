@@ -0,0 +1,94 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests For the scheduler timing statistics.
+"""
+
+import mock
+
+from nova.scheduler import filters
+from nova.scheduler.filters import all_hosts_filter
+from nova.scheduler import stats
+from nova.scheduler import weights
+from nova.scheduler.weights import ram
+from nova import test
+from nova.tests.unit.scheduler import fakes
+
+
+class SchedulerStatsTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(SchedulerStatsTestCase, self).setUp()
+        self.stats = stats.SchedulerStats()
+
+    def test_histogram(self):
+        histogram = stats.Histogram()
+        histogram.add(0.0002)
+        histogram.add(0.0002)
+        histogram.add(10)
+        result = histogram.to_dict()
+        self.assertEqual(3, result['count'])
+        self.assertEqual(10, result['max'])
+        self.assertEqual([0.0005, 2], result['buckets'][1])
+        self.assertEqual([None, 1], result['buckets'][-1])
+
+    def test_add(self):
+        self.stats.add('filter:Foo', 0.5, hosts_in=10, hosts_out=4)
+        self.stats.add('filter:Foo', 1.5, hosts_in=4, hosts_out=0)
+        result = self.stats.to_dict()['filter:Foo']
+        self.assertEqual(2, result['count'])
+        self.assertEqual(2.0, result['total'])
+        self.assertEqual(14, result['hosts_in'])
+        self.assertEqual(4, result['hosts_out'])
+
+        self.stats.reset()
+        self.assertEqual({}, self.stats.to_dict())
+
+    def test_add_disabled(self):
+        self.flags(scheduler_collect_stats=False)
+        self.stats.add('filter:Foo', 0.5)
+        self.assertEqual({}, self.stats.to_dict())
+
+    @mock.patch.object(stats, '_cpu_time', side_effect=[1.0, 1.25])
+    @mock.patch('time.time', side_effect=[0.0, 1.0, 3.0, 10.0])
+    def test_request_timer(self, mock_time, mock_cpu_time):
+        with self.stats.request_timer('select_destinations'):
+            with self.stats.db_timer():
+                pass
+        result = self.stats.to_dict()
+        self.assertEqual(10.0, result['select_destinations']['total'])
+        self.assertEqual(2.0, result['select_destinations:db']['total'])
+        self.assertEqual(0.25, result['select_destinations:cpu']['total'])
+        self.assertEqual(2.0, result['db']['total'])
+
+    def test_timed(self):
+        @stats.timed('foo')
+        def foo(arg):
+            return arg
+
+        with mock.patch.object(stats, 'STATS', self.stats):
+            self.assertEqual(1, foo(1))
+        self.assertEqual(1, self.stats.to_dict()['foo']['count'])
+
+    def test_handlers_record_stats(self):
+        hosts = [fakes.FakeHostState('host%d' % i, 'node',
+                                     {'free_ram_mb': i * 512})
+                 for i in range(3)]
+        with mock.patch.object(stats, 'STATS', self.stats):
+            filters.HostFilterHandler().get_filtered_objects(
+                [all_hosts_filter.AllHostsFilter()], hosts, {})
+            weights.HostWeightHandler().get_weighed_objects(
+                [ram.RAMWeigher()], hosts, {})
+        result = self.stats.to_dict()
+        self.assertEqual(3, result['filter:AllHostsFilter']['hosts_in'])
+        self.assertEqual(3, result['filter:AllHostsFilter']['hosts_out'])
+        self.assertEqual(1, result['weigher:RAMWeigher']['count'])
@@ -69,3 +69,15 @@ class ServiceGroupApiTestCase(test.NoDBTestCase):
             driver = self.servicegroup_api._driver
             result = self.servicegroup_api.service_is_up(member)
             self.assertIs(result, False)
+
+    def test_get_up_map(self):
+        members = [{'host': 'host1', 'binary': 'nova-compute',
+                    'forced_down': False},
+                   {'host': 'host2', 'binary': 'nova-compute',
+                    'forced_down': True}]
+        self.driver.get_up_map = mock.MagicMock(
+            return_value={('host1', 'nova-compute'): True})
+        result = self.servicegroup_api.get_up_map(members)
+        self.assertEqual({('host1', 'nova-compute'): True,
+                          ('host2', 'nova-compute'): False}, result)
+        self.driver.get_up_map.assert_called_once_with(members[:1])
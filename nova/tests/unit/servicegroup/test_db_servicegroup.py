@@ -17,6 +17,7 @@ import mock
 
 from nova import objects
 from nova import servicegroup
+from nova.servicegroup import heartbeat
 from nova import test
 
 
@@ -67,6 +68,22 @@ class DBServiceGroupTestCase(test.NoDBTestCase):
         result = self.servicegroup_api.service_is_up(service_ref)
         self.assertFalse(result)
 
+    @mock.patch('oslo_utils.timeutils.utcnow')
+    def test_get_up_map(self, now_mock):
+        fts_func = datetime.datetime.fromtimestamp
+        fake_now = 1000
+        now_mock.return_value = fts_func(fake_now)
+        up = {'host': 'host1', 'binary': 'nova-compute',
+              'last_seen_up': fts_func(fake_now - self.down_time),
+              'updated_at': None, 'created_at': None}
+        down = {'host': 'host2', 'binary': 'nova-compute',
+                'last_seen_up': fts_func(fake_now - self.down_time - 1),
+                'updated_at': None, 'created_at': None}
+        result = self.servicegroup_api._driver.get_up_map([up, down])
+        self.assertEqual({('host1', 'nova-compute'): True,
+                          ('host2', 'nova-compute'): False}, result)
+        now_mock.assert_called_once_with()
+
     def test_join(self):
         service = mock.MagicMock(report_interval=1)
 
@@ -84,3 +101,65 @@ class DBServiceGroupTestCase(test.NoDBTestCase):
         fn(service)
         upd_mock.assert_called_once_with()
         self.assertEqual(11, service_ref.report_count)
+
+    @mock.patch.object(objects.ServiceList, 'report_heartbeats')
+    @mock.patch.object(objects.Service, 'save')
+    def test_report_state_batched(self, upd_mock, report_mock):
+        self.flags(servicegroup_heartbeat_batching=True)
+        service_ref = objects.Service(id=42, host='fake-host',
+                                      topic='compute', report_count=10)
+        service = mock.MagicMock(model_disconnected=False,
+                                 service_ref=service_ref)
+        fn = self.servicegroup_api._driver._report_state
+        fn(service)
+        report_mock.assert_called_once_with(mock.ANY, [42])
+        self.assertFalse(upd_mock.called)
+        self.assertEqual(10, service_ref.report_count)
+
+
+class HeartbeatBufferTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(HeartbeatBufferTestCase, self).setUp()
+        self.buffer = heartbeat.HeartbeatBuffer()
+
+    @mock.patch('nova.utils.spawn_n')
+    def test_add_starts_flusher_once(self, mock_spawn):
+        self.buffer.add([1])
+        self.buffer.add([2, 1])
+        mock_spawn.assert_called_once_with(self.buffer._run)
+
+    @mock.patch('nova.db.service_heartbeat')
+    @mock.patch('nova.utils.spawn_n')
+    def test_flush(self, mock_spawn, mock_heartbeat):
+        self.buffer.add([3, 1])
+        self.buffer.add([1, 2])
+        self.assertEqual(3, self.buffer.flush())
+        mock_heartbeat.assert_called_once_with(mock.ANY, [1, 2, 3])
+        mock_heartbeat.reset_mock()
+        self.assertEqual(0, self.buffer.flush())
+        self.assertFalse(mock_heartbeat.called)
+
+    @mock.patch('nova.db.service_heartbeat')
+    @mock.patch('nova.utils.spawn_n')
+    def test_flush_failure_keeps_heartbeats(self, mock_spawn,
+                                            mock_heartbeat):
+        mock_heartbeat.side_effect = [Exception('db down'), 2]
+        self.buffer.add([1, 2])
+        self.assertEqual(0, self.buffer.flush())
+        self.assertEqual(2, self.buffer.flush())
+        self.assertEqual(2, mock_heartbeat.call_count)
+        mock_heartbeat.assert_called_with(mock.ANY, [1, 2])
+
+    @mock.patch('time.sleep')
+    @mock.patch('nova.db.service_heartbeat')
+    @mock.patch('nova.utils.spawn_n')
+    def test_run_stops_when_empty(self, mock_spawn, mock_heartbeat,
+                                  mock_sleep):
+        self.flags(heartbeat_flush_interval=0.5)
+        self.buffer.add([1])
+        self.buffer._run()
+        mock_sleep.assert_called_once_with(0.5)
+        mock_heartbeat.assert_called_once_with(mock.ANY, [1])
+        self.buffer.add([2])
+        self.assertEqual(2, mock_spawn.call_count)
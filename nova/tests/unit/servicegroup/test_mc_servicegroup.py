@@ -46,6 +46,20 @@ class MemcachedServiceGroupTestCase(test.NoDBTestCase):
         self.assertTrue(self.servicegroup_api.service_is_up(service_ref))
         self.mc_client.get.assert_called_once_with('compute:fake-host')
 
+    def test_get_up_map(self):
+        service_refs = [
+            {'host': 'host1', 'topic': 'compute', 'binary': 'nova-compute'},
+            {'host': 'host2', 'topic': 'compute', 'binary': 'nova-compute'},
+        ]
+        self.mc_client.get_multi.return_value = {'compute:host1': 'now'}
+        result = self.servicegroup_api._driver.get_up_map(service_refs)
+        self.assertEqual({('host1', 'nova-compute'): True,
+                          ('host2', 'nova-compute'): False}, result)
+        self.assertEqual(1, self.mc_client.get_multi.call_count)
+        self.assertEqual(['compute:host1', 'compute:host2'],
+                         sorted(self.mc_client.get_multi.call_args[0][0]))
+        self.assertFalse(self.mc_client.get.called)
+
     def test_join(self):
         service = mock.MagicMock(report_interval=1)
 
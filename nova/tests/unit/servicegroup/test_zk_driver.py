@@ -99,3 +99,17 @@ class ZKServiceGroupTestCase(test.NoDBTestCase):
         mem_mock.assert_called_once_with(self.zk_sess,
                                          '/fake-topic',
                                          'fake-host')
+
+    def test_get_up_map(self):
+        self._setup_sg_api()
+        driver = self.servicegroup_api._driver
+        service_refs = [
+            {'host': 'host1', 'topic': 'compute', 'binary': 'nova-compute'},
+            {'host': 'host2', 'topic': 'compute', 'binary': 'nova-compute'},
+        ]
+        with mock.patch.object(driver, '_get_all',
+                               return_value=['host1']) as get_all:
+            result = driver.get_up_map(service_refs)
+        self.assertEqual({('host1', 'nova-compute'): True,
+                          ('host2', 'nova-compute'): False}, result)
+        get_all.assert_called_once_with('compute')
@@ -17,6 +17,7 @@
 Tests for availability zones
 """
 
+import mock
 from oslo_config import cfg
 import six
 
@@ -82,24 +83,83 @@ class AvailabilityZoneTestCases(test.TestCase):
         return db.aggregate_host_delete(self.context,
                                         aggregate['id'], service['host'])
 
+    def _get_host_availability_zone(self, host):
+        return az.INDEX.get_hosts_availability_zones(self.context,
+                                                     [host])[host]
+
     def test_rest_availability_zone_reset_cache(self):
-        az._get_cache().add('cache', 'fake_value')
+        service = self._create_service_with_topic('compute', self.host)
+        self.assertEqual(self.default_az,
+                         self._get_host_availability_zone(self.host))
+        self._add_to_aggregate(service, self.agg)
+        self.assertEqual(self.default_az,
+                         self._get_host_availability_zone(self.host))
         az.reset_cache()
-        self.assertIsNone(az._get_cache().get('cache'))
+        self.assertEqual(self.availability_zone,
+                         self._get_host_availability_zone(self.host))
 
     def test_update_host_availability_zone_cache(self):
         """Test availability zone cache could be update."""
         service = self._create_service_with_topic('compute', self.host)
+        self.assertEqual(self.default_az,
+                         self._get_host_availability_zone(self.host))
 
         # Create a new aggregate with an AZ and add the host to the AZ
         az_name = 'az1'
-        cache_key = az._make_cache_key(self.host)
         agg_az1 = self._create_az('agg-az1', az_name)
         self._add_to_aggregate(service, agg_az1)
         az.update_host_availability_zone_cache(self.context, self.host)
-        self.assertEqual(az._get_cache().get(cache_key), 'az1')
+        self.assertEqual('az1', self._get_host_availability_zone(self.host))
         az.update_host_availability_zone_cache(self.context, self.host, 'az2')
-        self.assertEqual(az._get_cache().get(cache_key), 'az2')
+        self.assertEqual('az2', self._get_host_availability_zone(self.host))
+        az.update_host_availability_zone_cache(self.context, self.host,
+                                               self.default_az)
+        self.assertEqual(self.default_az,
+                         self._get_host_availability_zone(self.host))
+
+    @mock.patch('nova.objects.AggregateList.get_by_metadata_key')
+    def test_index_loaded_once(self, mock_get):
+        mock_get.return_value = []
+        self.assertEqual({'host1': self.default_az,
+                          'host2': self.default_az},
+                         az.INDEX.get_hosts_availability_zones(
+                             self.context, ['host1', 'host2']))
+        az.INDEX.get_hosts_availability_zones(self.context, ['host3'])
+        mock_get.assert_called_once_with(self.context, 'availability_zone')
+
+    def test_set_availability_zones_cached(self):
+        service = self._create_service_with_topic('compute', self.host)
+        self.assertEqual(self.default_az,
+                         self._get_host_availability_zone(self.host))
+        self._add_to_aggregate(service, self.agg)
+        services = db.service_get_all(self.context)
+        new_service = az.set_availability_zones(self.context, services)[0]
+        self.assertEqual(self.default_az, new_service['availability_zone'])
+        az.reset_cache()
+        new_service = az.set_availability_zones(self.context, services)[0]
+        self.assertEqual(self.availability_zone,
+                         new_service['availability_zone'])
+        self._destroy_service(service)
+
+    @mock.patch('nova.objects.AggregateList.get_by_metadata_key')
+    def test_index_kept_in_memorycache(self, mock_get):
+        mock_get.return_value = []
+        cache = mock.Mock()
+        cache.get.return_value = None
+        with mock.patch.object(az, '_get_cache', return_value=cache):
+            az.INDEX.get_hosts_availability_zones(self.context, ['host1'])
+        cache.get.assert_called_once_with(az.AZ_CACHE_KEY)
+        cache.set.assert_called_once_with(az.AZ_CACHE_KEY, {},
+                                          az.AZ_CACHE_SECONDS)
+
+    def test_index_shared_through_memorycache(self):
+        cache = mock.Mock()
+        cache.get.return_value = {self.host: 'az1'}
+        with mock.patch.object(az, '_get_cache', return_value=cache):
+            self.assertEqual('az1',
+                             self._get_host_availability_zone(self.host))
+            az.INDEX.reset()
+        cache.delete.assert_called_once_with(az.AZ_CACHE_KEY)
 
     def test_set_availability_zone_compute_service(self):
         """Test for compute service get right availability zone."""
@@ -115,6 +175,7 @@ class AvailabilityZoneTestCases(test.TestCase):
         # The service is added into aggregate, confirm return the aggregate
         # availability zone.
         self._add_to_aggregate(service, self.agg)
+        az.reset_cache()
         new_service = az.set_availability_zones(self.context, services)[0]
         self.assertEqual(new_service['availability_zone'],
                          self.availability_zone)
@@ -122,13 +183,15 @@ class AvailabilityZoneTestCases(test.TestCase):
         self._destroy_service(service)
 
     def test_set_availability_zone_unicode_key(self):
-        """Test set availability zone cache key is unicode."""
-        service = self._create_service_with_topic('network', self.host)
+        """Test set availability zone of a host with a unicode name."""
+        host = u'h\xf8st'
+        service = self._create_service_with_topic('compute', host)
+        self._add_to_aggregate(service, self.agg)
         services = db.service_get_all(self.context)
-        az.set_availability_zones(self.context, services)
-        self.assertIsInstance(services[0]['host'], six.text_type)
-        cached_key = az._make_cache_key(services[0]['host'])
-        self.assertIsInstance(cached_key, str)
+        new_service = az.set_availability_zones(self.context, services)[0]
+        self.assertIsInstance(new_service['host'], six.text_type)
+        self.assertEqual(self.availability_zone,
+                         new_service['availability_zone'])
         self._destroy_service(service)
 
     def test_set_availability_zone_not_compute_service(self):
@@ -245,6 +308,19 @@ class AvailabilityZoneTestCases(test.TestCase):
         self.assertEqual(self.default_az,
                 az.get_instance_availability_zone(self.context, fake_inst))
 
+    def test_get_instances_availability_zones(self):
+        host = 'host170'
+        service = self._create_service_with_topic('compute', host)
+        self._add_to_aggregate(service, self.agg)
+        instances = [fakes.stub_instance(1, host=host),
+                     fakes.stub_instance(2, host=self.host),
+                     fakes.stub_instance(3, host=None)]
+
+        self.assertEqual({host: self.availability_zone,
+                          self.host: self.default_az},
+                         az.get_instances_availability_zones(self.context,
+                                                             instances))
+
     def test_get_instance_availability_zone_from_aggregate(self):
         """Test get availability zone from aggregate by given an instance."""
         host = 'host170'
@@ -328,6 +328,21 @@ class ProjectCommandsTestCase(test.TestCase):
         print_format = "%-36s %-10s" % ('instances', 'unlimited')
         self.assertIn(print_format, result)
 
+    def test_quota_update_after_display(self):
+        output = StringIO()
+        sys.stdout = output
+        self.commands.quota(project_id='admin')
+        self.commands.quota(project_id='admin', key='instances', value='20')
+        sys.stdout = sys.__stdout__
+        result = output.getvalue()
+        print_format = "%-36s %-10s" % ('instances', '20')
+        self.assertIn(print_format, result)
+
+    @mock.patch('nova.quota.LIMIT_CACHE.invalidate')
+    def test_quota_update_invalidates_limit_cache(self, mock_invalidate):
+        self.commands.quota(project_id='admin', key='instances', value='20')
+        mock_invalidate.assert_called_once_with(project_id='admin')
+
     def test_quota_update_invalid_key(self):
         self.assertEqual(2, self.commands.quota('admin', 'volumes1', '10'))
 
@@ -383,6 +398,43 @@ class DBCommandsTestCase(test.TestCase):
     def test_archive_deleted_rows_negative(self):
         self.assertEqual(1, self.commands.archive_deleted_rows(-1))
 
+    def test_archive_deleted_rows_negative_rate(self):
+        self.assertEqual(1, self.commands.archive_deleted_rows(
+            10, rows_per_second='0'))
+
+    @mock.patch.object(db, 'archive_deleted_rows',
+                       side_effect=[{'consoles': 2, 'instances': 8},
+                                    {'instances': 3}, {}])
+    def test_archive_deleted_rows_until_complete(self, mock_archive):
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout',
+                                             StringIO()))
+        self.commands.archive_deleted_rows('10', rows_per_second='50',
+                                           until_complete=True, verbose=True)
+        self.assertEqual(3, mock_archive.call_count)
+        mock_archive.assert_called_with(mock.ANY, 10, cursor={},
+                                        rows_per_second=50.0)
+        output = sys.stdout.getvalue()
+        self.assertIn('8 rows archived from table instances, 8 so far',
+                      output)
+        self.assertIn('3 rows archived from table instances, 11 so far',
+                      output)
+
+    @mock.patch.object(db, 'archive_deleted_rows')
+    def test_archive_deleted_rows_cursor_file(self, mock_archive):
+        def fake_archive(context, max_rows, cursor, rows_per_second):
+            self.assertEqual({'instances': 5}, cursor)
+            cursor['instances'] = 15
+            return {'instances': 10}
+
+        mock_archive.side_effect = fake_archive
+        cursor_file = self.useFixture(fixtures.TempDir()).join('cursor')
+        with open(cursor_file, 'w') as f:
+            f.write('{"instances": 5}')
+        self.commands.archive_deleted_rows('10', cursor_file=cursor_file)
+        self.assertEqual(1, mock_archive.call_count)
+        with open(cursor_file) as f:
+            self.assertEqual('{"instances": 15}', f.read())
+
     @mock.patch.object(migration, 'db_null_instance_uuid_scan',
                        return_value={'foo': 0})
     def test_null_instance_uuid_scan_no_records_found(self, mock_scan):
@@ -452,6 +504,38 @@ class ServiceCommandsTestCase(test.TestCase):
         self.assertEqual(2, self.commands.disable('nohost', 'noservice'))
 
 
+class SchedulerCommandsTestCase(test.TestCase):
+    def setUp(self):
+        super(SchedulerCommandsTestCase, self).setUp()
+        self.commands = manage.SchedulerCommands()
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', StringIO()))
+
+    @mock.patch('nova.scheduler.rpcapi.SchedulerAPI.get_stats')
+    @mock.patch.object(objects.ServiceList, 'get_by_binary')
+    def test_stats(self, mock_get_by_binary, mock_get_stats):
+        mock_get_by_binary.return_value = [objects.Service(host='sched1')]
+        mock_get_stats.return_value = {
+            'filter:RamFilter': {'count': 2, 'total': 0.004, 'max': 0.003,
+                                 'hosts_in': 20, 'hosts_out': 10,
+                                 'buckets': []}}
+        self.commands.stats(reset=True)
+        mock_get_stats.assert_called_once_with(mock.ANY, 'sched1',
+                                               reset=True)
+        output = sys.stdout.getvalue()
+        self.assertIn('Scheduler sched1', output)
+        self.assertIn('filter:RamFilter', output)
+        self.assertIn('2.000', output)
+
+    @mock.patch('nova.scheduler.rpcapi.SchedulerAPI.get_stats',
+                return_value={})
+    @mock.patch.object(objects.ServiceList, 'get_by_binary')
+    def test_stats_host(self, mock_get_by_binary, mock_get_stats):
+        self.commands.stats(host='sched2')
+        self.assertFalse(mock_get_by_binary.called)
+        mock_get_stats.assert_called_once_with(mock.ANY, 'sched2',
+                                               reset=False)
+
+
 class CellCommandsTestCase(test.TestCase):
     def setUp(self):
         super(CellCommandsTestCase, self).setUp()
@@ -16,6 +16,7 @@
 
 import datetime
 
+import mock
 from oslo_config import cfg
 from oslo_utils import timeutils
 from six.moves import range
@@ -336,6 +337,9 @@ class FakeDriver(object):
     def expire(self, context):
         self.called.append(('expire', context))
 
+    def usage_reconcile(self, context, resources):
+        self.called.append(('usage_reconcile', context, resources))
+
 
 class BaseResourceTestCase(test.TestCase):
     def test_no_flag(self):
@@ -792,6 +796,16 @@ class QuotaEngineTestCase(test.TestCase):
                 ('expire', context),
                 ])
 
+    def test_usage_reconcile(self):
+        context = FakeContext(None, None)
+        driver = FakeDriver()
+        quota_obj = self._make_quota_obj(driver)
+        quota_obj.usage_reconcile(context)
+
+        self.assertEqual(driver.called, [
+                ('usage_reconcile', context, quota_obj._resources),
+                ])
+
     def test_resources(self):
         quota_obj = self._make_quota_obj(None)
 
@@ -2310,6 +2324,51 @@ class DbQuotaDriverTestCase(test.TestCase):
                 ])
         self.assertEqual(result, ['resv-1', 'resv-2', 'resv-3'])
 
+    def test_reserve_counters(self):
+        self.driver = quota.CounterQuotaDriver()
+        self._stub_get_project_quotas()
+        self.flags(until_refresh=500, max_age=86400)
+        expire = timeutils.utcnow() + datetime.timedelta(seconds=120)
+        with mock.patch.object(db, 'quota_reserve_counters',
+                               return_value=['resv-1']) as mock_reserve:
+            result = self.driver.reserve(
+                FakeContext('test_project', 'test_class'),
+                quota.QUOTAS._resources, dict(instances=2), expire=expire)
+        mock_reserve.assert_called_once_with(
+            mock.ANY, quota.QUOTAS._resources, mock.ANY, mock.ANY,
+            dict(instances=2), expire, project_id='test_project',
+            user_id='fake_user')
+        self.assertEqual(['resv-1'], result)
+
+    @mock.patch.object(db, 'quota_usage_reconcile')
+    def test_usage_reconcile(self, mock_reconcile):
+        ctxt = FakeContext('test_project', 'test_class')
+        self.driver.usage_reconcile(ctxt, quota.QUOTAS._resources)
+        mock_reconcile.assert_called_once_with(ctxt,
+                                               quota.QUOTAS._resources)
+
+    @mock.patch.object(db, 'reservation_commit')
+    @mock.patch.object(quota.ReservationFinalizer, 'finalize')
+    def test_commit_batched(self, mock_finalize, mock_commit):
+        self.flags(quota_finalize_batch_window=0.05)
+        ctxt = FakeContext('test_project', 'test_class')
+        self.driver.commit(ctxt, ['resv-1'])
+        mock_finalize.assert_called_once_with(ctxt, 'test_project',
+                                              'fake_user', commit=['resv-1'])
+        self.assertFalse(mock_commit.called)
+
+    @mock.patch.object(db, 'reservation_rollback')
+    @mock.patch.object(quota.ReservationFinalizer, 'finalize')
+    def test_rollback_batched(self, mock_finalize, mock_rollback):
+        self.flags(quota_finalize_batch_window=0.05)
+        ctxt = FakeContext('test_project', 'test_class')
+        self.driver.rollback(ctxt, ['resv-1'], user_id='other_user')
+        mock_finalize.assert_called_once_with(ctxt, 'test_project',
+                                              'other_user',
+                                              rollback=['resv-1'])
+        self.assertFalse(mock_rollback.called)
+
+
     def test_usage_reset(self):
         calls = []
 
@@ -2341,6 +2400,131 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual(calls, exemplar)
 
 
+class ReservationFinalizerTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(ReservationFinalizerTestCase, self).setUp()
+        self.flags(quota_finalize_batch_window=0.05)
+        self.finalizer = quota.ReservationFinalizer()
+        self.context = FakeContext('test_project', 'test_class')
+
+    @mock.patch.object(db, 'reservation_finalize')
+    @mock.patch('time.sleep')
+    def test_finalize_gathers_reservations(self, mock_sleep, mock_finalize):
+        def fake_sleep(window):
+            # Reservations of other requests arriving during the window
+            batch = self.finalizer._batches[('test_project', 'fake_user')]
+            batch.commit.append('resv-2')
+            batch.rollback.append('resv-3')
+
+        mock_sleep.side_effect = fake_sleep
+        self.finalizer.finalize(self.context, 'test_project', 'fake_user',
+                                commit=['resv-1'])
+        mock_sleep.assert_called_once_with(0.05)
+        mock_finalize.assert_called_once_with(
+            self.context, ['resv-1', 'resv-2'], ['resv-3'],
+            project_id='test_project', user_id='fake_user')
+        self.assertEqual({}, self.finalizer._batches)
+
+    @mock.patch.object(db, 'reservation_finalize',
+                       side_effect=exception.QuotaError)
+    @mock.patch('time.sleep')
+    def test_finalize_error(self, mock_sleep, mock_finalize):
+        self.assertRaises(exception.QuotaError, self.finalizer.finalize,
+                          self.context, 'test_project', 'fake_user',
+                          rollback=['resv-1'])
+        self.assertEqual({}, self.finalizer._batches)
+
+    @mock.patch.object(db, 'reservation_finalize')
+    def test_finalize_joins_pending_batch(self, mock_finalize):
+        batch = quota._ReservationBatch()
+        batch.done.set()
+        self.finalizer._batches[('test_project', 'fake_user')] = batch
+        self.finalizer.finalize(self.context, 'test_project', 'fake_user',
+                                commit=['resv-1'])
+        self.assertEqual(['resv-1'], batch.commit)
+        self.assertFalse(mock_finalize.called)
+
+    @mock.patch.object(db, 'reservation_finalize')
+    def test_finalize_joins_failed_batch(self, mock_finalize):
+        batch = quota._ReservationBatch()
+        batch.error = exception.QuotaError()
+        batch.done.set()
+        self.finalizer._batches[('test_project', 'fake_user')] = batch
+        self.assertRaises(exception.QuotaError, self.finalizer.finalize,
+                          self.context, 'test_project', 'fake_user',
+                          rollback=['resv-1'])
+        self.assertEqual(['resv-1'], batch.rollback)
+
+
+class QuotaLimitCacheTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(QuotaLimitCacheTestCase, self).setUp()
+        self.flags(quota_limit_cache_ttl=60)
+        self.cache = quota.QuotaLimitCache()
+        self.context = FakeContext('test_project', 'test_class')
+
+    @mock.patch.object(db, 'quota_get_all_by_project',
+                       return_value={'project_id': 'p1', 'cores': 10})
+    def test_disabled(self, mock_get):
+        self.flags(quota_limit_cache_ttl=0)
+        self.cache.get_project_limits(self.context, 'p1')
+        self.cache.get_project_limits(self.context, 'p1')
+        self.assertEqual(2, mock_get.call_count)
+
+    @mock.patch.object(db, 'quota_get_all_by_project',
+                       return_value={'project_id': 'p1', 'cores': 10})
+    def test_project_limits(self, mock_get):
+        limits = self.cache.get_project_limits(self.context, 'p1')
+        self.assertEqual({'project_id': 'p1', 'cores': 10}, limits)
+        limits['cores'] = 20
+        limits = self.cache.get_project_limits(self.context, 'p1')
+        self.assertEqual({'project_id': 'p1', 'cores': 10}, limits)
+        mock_get.assert_called_once_with(self.context, 'p1')
+
+        self.cache.invalidate(project_id='p1')
+        self.cache.get_project_limits(self.context, 'p1')
+        self.assertEqual(2, mock_get.call_count)
+
+    @mock.patch.object(db, 'quota_get_all_by_project_and_user',
+                       return_value={'project_id': 'p1', 'user_id': 'u1',
+                                     'cores': 5})
+    @mock.patch.object(db, 'quota_get_all_by_project',
+                       return_value={'project_id': 'p1', 'cores': 10})
+    def test_user_limits_invalidated_with_project(self, mock_get_project,
+                                                  mock_get_user):
+        for i in range(2):
+            limits = self.cache.get_user_limits(self.context, 'p1', 'u1')
+        self.assertEqual({'project_id': 'p1', 'user_id': 'u1', 'cores': 5},
+                         limits)
+        mock_get_user.assert_called_once_with(self.context, 'p1', 'u1')
+        self.cache.invalidate(project_id='p1')
+        self.cache.get_user_limits(self.context, 'p1', 'u1')
+        self.assertEqual(2, mock_get_user.call_count)
+
+    @mock.patch.object(db, 'quota_class_get_default',
+                       return_value={'class_name': 'default', 'cores': 20})
+    @mock.patch.object(db, 'quota_class_get_all_by_name',
+                       return_value={'class_name': 'c1', 'cores': 15})
+    def test_class_limits(self, mock_get_class, mock_get_default):
+        for i in range(2):
+            self.cache.get_class_limits(self.context, 'c1')
+            self.cache.get_default_limits(self.context)
+        self.assertEqual(1, mock_get_class.call_count)
+        self.assertEqual(1, mock_get_default.call_count)
+        self.cache.invalidate(quota_class='default')
+        self.cache.get_class_limits(self.context, 'c1')
+        self.cache.get_default_limits(self.context)
+        self.assertEqual(1, mock_get_class.call_count)
+        self.assertEqual(2, mock_get_default.call_count)
+
+    @mock.patch.object(db, 'quota_destroy_all_by_project')
+    def test_driver_destroy_all_by_project_invalidates(self, mock_destroy):
+        with mock.patch.object(quota.LIMIT_CACHE,
+                               'invalidate') as mock_invalidate:
+            quota.DbQuotaDriver().destroy_all_by_project(self.context, 'p1')
+        mock_invalidate.assert_called_once_with(project_id='p1')
+
+
 class FakeSession(object):
     def begin(self):
         return self
@@ -2348,6 +2532,9 @@ class FakeSession(object):
     def add(self, instance):
         pass
 
+    def flush(self):
+        pass
+
     def __enter__(self):
         return self
 
@@ -2472,6 +2659,11 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
                        fake_get_project_user_quota_usages)
         self.stubs.Set(sqa_api, '_quota_usage_create', fake_quota_usage_create)
         self.stubs.Set(sqa_api, '_reservation_create', fake_reservation_create)
+        # The project totals are covered by the DB API tests
+        self.stubs.Set(sqa_api, '_project_quota_usage_update',
+                       lambda *args, **kwargs: True)
+        self.stubs.Set(sqa_api, '_project_quota_usages_refresh',
+                       lambda *args, **kwargs: {})
 
         self.useFixture(test.TimeOverride())
 
@@ -19,6 +19,7 @@ Tests For weights.
 import mock
 
 from nova.scheduler import weights as scheduler_weights
+from nova.scheduler.weights import io_ops
 from nova import test
 from nova.tests.unit.scheduler import fakes
 from nova import weights
@@ -71,3 +72,62 @@ class TestWeigher(test.NoDBTestCase):
         self.assertEqual(1, len(weighed_host))
         self.assertEqual('host1', weighed_host[0].obj.host)
         self.assertFalse(mock_weigh.called)
+
+    def test_limit(self):
+        host_values = [
+            ('host1', 'node1', {'free_ram_mb': 512}),
+            ('host2', 'node2', {'free_ram_mb': 8192}),
+            ('host3', 'node3', {'free_ram_mb': 1024}),
+            ('host4', 'node4', {'free_ram_mb': 8192}),
+        ]
+        hostinfo = [fakes.FakeHostState(host, node, values)
+                    for host, node, values in host_values]
+
+        weight_handler = scheduler_weights.HostWeightHandler()
+        weighers = [scheduler_weights.ram.RAMWeigher()]
+        weighed_hosts = weight_handler.get_weighed_objects(weighers,
+                                                           hostinfo, {},
+                                                           limit=3)
+        self.assertEqual(['host2', 'host4', 'host3'],
+                         [weighed.obj.host for weighed in weighed_hosts])
+
+    def test_get_weighed_object(self):
+        host_values = [
+            ('host1', 'node1', {'free_ram_mb': 512}),
+            ('host2', 'node2', {'free_ram_mb': 1024}),
+        ]
+        hostinfo = [fakes.FakeHostState(host, node, values)
+                    for host, node, values in host_values]
+
+        weight_handler = scheduler_weights.HostWeightHandler()
+        weighers = [scheduler_weights.ram.RAMWeigher()]
+        weight_handler.get_weighed_objects(weighers, hostinfo, {})
+        bounds = weight_handler.get_weight_bounds(weighers)
+        self.assertEqual([(512, 1024)], bounds)
+        hostinfo[1].free_ram_mb = 768
+        weighed_host = weight_handler.get_weighed_object(weighers,
+                                                         hostinfo[1], {},
+                                                         bounds)
+        self.assertEqual('host2', weighed_host.obj.host)
+        self.assertEqual(0.75, weighed_host.weight)
+
+    def test_get_weighed_object_keeps_bounds(self):
+        host_values = [
+            ('host1', 'node1', {'num_io_ops': 2}),
+            ('host2', 'node2', {'num_io_ops': 4}),
+        ]
+        hostinfo = [fakes.FakeHostState(host, node, values)
+                    for host, node, values in host_values]
+
+        weight_handler = scheduler_weights.HostWeightHandler()
+        weighers = [io_ops.IoOpsWeigher()]
+        weight_handler.get_weighed_objects(weighers, hostinfo, {})
+        bounds = weight_handler.get_weight_bounds(weighers)
+        # The weight of host2 goes beyond the bounds of the full pass, it is
+        # still normalized against them and they are kept.
+        hostinfo[1].num_io_ops = 6
+        weighed_host = weight_handler.get_weighed_object(weighers,
+                                                         hostinfo[1], {},
+                                                         bounds)
+        self.assertEqual(-2.0, weighed_host.weight)
+        self.assertEqual(bounds, weight_handler.get_weight_bounds(weighers))
@@ -4331,6 +4331,19 @@ class LibvirtConnTestCase(test.NoDBTestCase):
         self.assertEqual(uuids[3], vm4.UUIDString())
         mock_list.assert_called_with(only_running=False)
 
+    @mock.patch.object(host.Host, "list_instance_domain_states")
+    def test_get_power_states(self, mock_states):
+        mock_states.return_value = {
+            'uuid1': libvirt_driver.VIR_DOMAIN_RUNNING,
+            'uuid2': libvirt_driver.VIR_DOMAIN_SHUTOFF,
+            'uuid3': libvirt_driver.VIR_DOMAIN_PAUSED}
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        self.assertEqual({'uuid1': power_state.RUNNING,
+                          'uuid2': power_state.SHUTDOWN,
+                          'uuid3': power_state.PAUSED},
+                         drvr.get_power_states())
+        mock_states.assert_called_once_with()
+
     @mock.patch.object(host.Host, "list_instance_domains")
     def test_get_all_block_devices(self, mock_list):
         xml = [
@@ -606,6 +606,50 @@ class HostTestCase(test.NoDBTestCase):
         self.assertEqual(doms[2].name(), vm2.name())
         mock_list.assert_called_with(True)
 
+    @mock.patch.object(fakelibvirt.Connection, "getAllDomainStats")
+    def test_list_instance_domain_states(self, mock_stats):
+        vm0 = FakeVirtDomain(id=0, name="Domain-0")  # Xen dom-0
+        vm1 = FakeVirtDomain(id=3, name="instance00000001")
+        vm2 = FakeVirtDomain(name="instance00000002")
+        mock_stats.return_value = [
+            (vm0, {'state.state': fakelibvirt.VIR_DOMAIN_RUNNING}),
+            (vm1, {'state.state': fakelibvirt.VIR_DOMAIN_RUNNING}),
+            (vm2, {'state.state': fakelibvirt.VIR_DOMAIN_SHUTOFF})]
+
+        states = self.host.list_instance_domain_states()
+
+        mock_stats.assert_called_once_with(
+            fakelibvirt.VIR_DOMAIN_STATS_STATE)
+        self.assertEqual({vm1.UUIDString(): fakelibvirt.VIR_DOMAIN_RUNNING,
+                          vm2.UUIDString(): fakelibvirt.VIR_DOMAIN_SHUTOFF},
+                         states)
+
+    @mock.patch.object(host.Host, "get_domain_info")
+    @mock.patch.object(host.Host, "list_instance_domains")
+    @mock.patch.object(fakelibvirt.Connection, "getAllDomainStats")
+    def test_list_instance_domain_states_fallback(self, mock_stats,
+                                                  mock_list, mock_info):
+        vm1 = FakeVirtDomain(id=3, name="instance00000001")
+        vm2 = FakeVirtDomain(name="instance00000002")
+        mock_stats.side_effect = fakelibvirt.make_libvirtError(
+            fakelibvirt.libvirtError, "API is not supported",
+            error_code=fakelibvirt.VIR_ERR_NO_SUPPORT)
+        mock_list.return_value = [vm1, vm2]
+        # vm2 is undefined after being listed
+        mock_info.side_effect = [
+            [fakelibvirt.VIR_DOMAIN_RUNNING, 0, 0, 1, 0],
+            fakelibvirt.make_libvirtError(
+                fakelibvirt.libvirtError, "Domain not found",
+                error_code=fakelibvirt.VIR_ERR_NO_DOMAIN)] * 2
+
+        for i in range(2):
+            self.assertEqual(
+                {vm1.UUIDString(): fakelibvirt.VIR_DOMAIN_RUNNING},
+                self.host.list_instance_domain_states())
+        mock_stats.assert_called_once_with(
+            fakelibvirt.VIR_DOMAIN_STATS_STATE)
+        mock_list.assert_called_with(only_running=False)
+
     def test_cpu_features_bug_1217630(self):
         self.host.get_connection()
 
@@ -13,9 +13,12 @@
 #    under the License.
 
 import os
+import struct
 
+import fixtures
 import mock
 from oslo_concurrency import processutils
+from oslo_utils import units
 
 from nova import exception
 from nova import test
@@ -43,3 +46,122 @@ class QemuTestCase(test.NoDBTestCase):
         image_info = images.qemu_img_info('/fake/path')
         self.assertTrue(image_info)
         self.assertTrue(str(image_info))
+
+
+class ImageInfoTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(ImageInfoTestCase, self).setUp()
+        self.flags(native_image_info=True)
+        self.tmpdir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.MonkeyPatch(
+            'nova.virt.images._IMAGE_INFO_CACHE', {}))
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _write_qcow2(self, name, version=3, backing_file=None,
+                     crypt_method=0, nb_snapshots=0, features=0):
+        header = struct.pack('>4sIQIIQIIQQIIQ', images.QCOW2_MAGIC, version,
+                             0, 0, 16, 10 * units.Gi, crypt_method, 0, 0, 0,
+                             0, nb_snapshots, 0)
+        if version == 3:
+            header += struct.pack('>QQQII', features, 0, 0, 4, 104)
+        if backing_file:
+            header = (header[:8] +
+                      struct.pack('>QI', len(header), len(backing_file)) +
+                      header[20:] + backing_file.encode('utf-8'))
+        return self._write(name, header)
+
+    @mock.patch.object(images, 'qemu_img_info')
+    def test_qcow2(self, mock_qemu_img_info):
+        for version in (2, 3):
+            path = self._write_qcow2('disk%d' % version, version=version,
+                                     backing_file='/base/image')
+            info = images.image_info(path)
+            self.assertEqual('qcow2', info.file_format)
+            self.assertEqual(10 * units.Gi, info.virtual_size)
+            self.assertEqual(64 * units.Ki, info.cluster_size)
+            self.assertEqual('/base/image', info.backing_file)
+            self.assertEqual(path, info.image)
+        self.assertFalse(mock_qemu_img_info.called)
+
+    @mock.patch.object(images, 'qemu_img_info')
+    def test_qcow2_relative_backing_file(self, mock_qemu_img_info):
+        path = self._write_qcow2('disk', backing_file='_base/image')
+        info = images.image_info(path)
+        self.assertEqual(os.path.join(self.tmpdir, '_base/image'),
+                         info.backing_file)
+
+    @mock.patch.object(images, 'qemu_img_info')
+    def test_qcow2_unsupported(self, mock_qemu_img_info):
+        paths = [self._write_qcow2('v1', version=1),
+                 self._write_qcow2('encrypted', crypt_method=1),
+                 self._write_qcow2('snapshots', nb_snapshots=1),
+                 self._write_qcow2('data_file', features=4)]
+        for path in paths:
+            self.assertEqual(mock_qemu_img_info.return_value,
+                             images.image_info(path))
+        self.assertEqual([mock.call(path) for path in paths],
+                         mock_qemu_img_info.call_args_list)
+
+    @mock.patch.object(images, 'qemu_img_info')
+    def test_raw(self, mock_qemu_img_info):
+        path = self._write('disk', b'\0' * 8192)
+        info = images.image_info(path)
+        self.assertEqual('raw', info.file_format)
+        self.assertEqual(8192, info.virtual_size)
+        self.assertIsNone(info.backing_file)
+        self.assertEqual(os.stat(path).st_blocks * 512, info.disk_size)
+        self.assertFalse(mock_qemu_img_info.called)
+
+    @mock.patch.object(images, 'qemu_img_info')
+    def test_other_formats(self, mock_qemu_img_info):
+        paths = [self._write('vmdk', b'KDMV' + b'\0' * 508),
+                 self._write('vhdx', b'vhdxfile' + b'\0' * 504),
+                 self._write('vdi', b'\0' * 0x40 + b'\x7f\x10\xda\xbe'),
+                 self._write('descriptor', b'createType="monolithicFlat"'),
+                 self._write('image.dmg', b'\0' * 512)]
+        for path in paths:
+            images.image_info(path)
+        self.assertEqual([mock.call(path) for path in paths],
+                         mock_qemu_img_info.call_args_list)
+
+    @mock.patch.object(images, 'qemu_img_info')
+    def test_missing_file(self, mock_qemu_img_info):
+        path = os.path.join(self.tmpdir, 'missing')
+        self.assertEqual(mock_qemu_img_info.return_value,
+                         images.image_info(path))
+        mock_qemu_img_info.assert_called_once_with(path)
+
+    @mock.patch.object(images, 'qemu_img_info')
+    def test_not_regular_file(self, mock_qemu_img_info):
+        self.assertEqual(mock_qemu_img_info.return_value,
+                         images.image_info(os.devnull))
+        self.assertEqual(mock_qemu_img_info.return_value,
+                         images.image_info(os.devnull))
+        self.assertEqual([mock.call(os.devnull)] * 2,
+                         mock_qemu_img_info.call_args_list)
+
+    @mock.patch.object(images, '_read_native_image_info',
+                       wraps=images._read_native_image_info)
+    def test_cached_until_changed(self, mock_read):
+        path = self._write('disk', b'\0' * 512)
+        info = images.image_info(path)
+        self.assertIs(info, images.image_info(path))
+        self.assertEqual(1, mock_read.call_count)
+
+        with open(path, 'ab') as f:
+            f.write(b'\0' * 512)
+        self.assertEqual(1024, images.image_info(path).virtual_size)
+        self.assertEqual(2, mock_read.call_count)
+
+    @mock.patch.object(images, 'qemu_img_info')
+    def test_disabled(self, mock_qemu_img_info):
+        self.flags(native_image_info=False)
+        path = self._write('disk', b'\0' * 512)
+        self.assertEqual(mock_qemu_img_info.return_value,
+                         images.image_info(path))
+        mock_qemu_img_info.assert_called_once_with(path)
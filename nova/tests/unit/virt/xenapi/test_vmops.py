@@ -273,6 +273,24 @@ class GetConsoleOutputTestCase(VMOpsTestBase):
                          self.vmops._get_dom_id(vm_ref=vm_ref))
 
 
+class GetPowerStatesTestCase(VMOpsTestBase):
+    def _create_nova_vm(self, name, state, nova_uuid):
+        vm_ref = xenapi_fake.create_vm(name, state,
+                                       other_config={'nova_uuid': nova_uuid})
+        self.vms.append(vm_ref)
+        return xenapi_fake.get_record("VM", vm_ref)
+
+    def test_get_power_states(self):
+        self._create_nova_vm("running", "Running", "uuid1")
+        self._create_nova_vm("halted", "Halted", "uuid2")
+        self._create_nova_vm("running-orig", "Running", "uuid1")
+        vm = self._create_nova_vm("elsewhere", "Running", "uuid3")
+        vm['resident_on'] = 'OpaqueRef:other-host'
+        self.assertEqual({'uuid1': power_state.RUNNING,
+                          'uuid2': power_state.SHUTDOWN},
+                         self.vmops.get_power_states())
+
+
 class SpawnTestCase(VMOpsTestBase):
     def _stub_out_common(self):
         self.mox.StubOutWithMock(self.vmops, '_ensure_instance_name_unique')
@@ -256,6 +256,17 @@ class ComputeDriver(object):
         """
         raise NotImplementedError()
 
+    def get_power_states(self):
+        """Return the power states of all the instances known to the
+        virtualization layer, as a dict of nova.compute.power_state values
+        keyed by instance uuid.
+
+        This should cost the hypervisor a few calls whatever the number of
+        instances. The instances missing from the dict are taken as not
+        found by the power state sync.
+        """
+        raise NotImplementedError()
+
     def rebuild(self, context, instance, image_meta, injected_files,
                 admin_password, bdms, detach_block_devices,
                 attach_block_devices, network_info=None,
@@ -88,6 +88,9 @@ class HyperVDriver(driver.ComputeDriver):
     def get_info(self, instance):
         return self._vmops.get_info(instance)
 
+    def get_power_states(self):
+        return self._vmops.get_power_states()
+
     def attach_volume(self, context, connection_info, instance, mountpoint,
                       disk_bus=None, device_type=None, encryption=None):
         return self._volumeops.attach_volume(connection_info,
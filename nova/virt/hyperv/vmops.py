@@ -159,6 +159,19 @@ class VMOps(object):
     def list_instances(self):
         return self._vmutils.list_instances()
 
+    def get_power_states(self):
+        """Get the power states of the VMs, keyed by instance uuid."""
+        vm_states = self._vmutils.get_vm_enabled_states()
+        power_states = {}
+        for (instance_name, notes) in self._vmutils.list_instance_notes():
+            if not notes or not uuidutils.is_uuid_like(notes[0]):
+                continue
+            state = constants.HYPERV_POWER_STATE.get(
+                vm_states.get(instance_name))
+            if state is not None:
+                power_states[str(notes[0])] = state
+        return power_states
+
     def get_info(self, instance):
         """Get information about the VM."""
         LOG.debug("get_info called for instance", instance=instance)
@@ -135,6 +135,12 @@ class VMUtils(object):
                     ['ElementName'],
                     SettingType=self._VIRTUAL_SYSTEM_CURRENT_SETTINGS)]
 
+    def get_vm_enabled_states(self):
+        """Return the EnabledState of all the VMs, keyed by name."""
+        return dict((vm.ElementName, vm.EnabledState) for vm in
+                    self._conn.Msvm_ComputerSystem(
+                        ['ElementName', 'EnabledState']))
+
     def get_vm_summary_info(self, vm_name):
         vm = self._lookup_vm_check(vm_name)
 
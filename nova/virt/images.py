@@ -20,9 +20,12 @@ Handling of VM disk images.
 """
 
 import os
+import stat
+import struct
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import encodeutils
 from oslo_utils import fileutils
 
 from nova import exception
@@ -37,6 +40,12 @@ image_opts = [
     cfg.BoolOpt('force_raw_images',
                 default=True,
                 help='Force backing images to raw format'),
+    cfg.BoolOpt('native_image_info',
+                default=False,
+                help='Read the virtual size and backing file of qcow2 and '
+                     'raw disk images from their headers instead of running '
+                     'qemu-img info, and cache the result until the file '
+                     'changes. Other formats still use qemu-img info.'),
 ]
 
 CONF = cfg.CONF
@@ -66,6 +75,146 @@ def qemu_img_info(path):
     return imageutils.QemuImgInfo(out)
 
 
+QCOW2_MAGIC = b'QFI\xfb'
+# NOTE: the qcow2 header fields up to nb_snapshots, common to versions 2
+# and 3: magic, version, backing_file_offset, backing_file_size,
+# cluster_bits, size, crypt_method, l1_size, l1_table_offset,
+# refcount_table_offset, refcount_table_clusters and nb_snapshots.
+_QCOW2_HEADER = struct.Struct('>4sIQIIQIIQQII')
+_QCOW2_INCOMPATIBLE_FEATURES = struct.Struct('>Q')
+_QCOW2_INCOMPATIBLE_DIRTY = 1
+
+# Header signatures of the other formats qemu-img probes for. Files starting
+# with one of them are never taken for raw images.
+_OTHER_FORMAT_MAGICS = (
+    b'QED\x00',                    # qed
+    b'KDMV',                        # vmdk
+    b'COWD',                        # vmdk
+    b'# Disk DescriptorFile',       # vmdk
+    b'vhdxfile',                    # vhdx
+    b'conectix',                    # vpc
+    b'LUKS\xba\xbe',                # luks
+    b'Bochs Virtual HD Image',      # bochs
+    b'WithoutFreeSpace',            # parallels
+    b'WithouFreSpacExt',            # parallels
+    b'#!/bin/sh\n#V2.0 Format',     # cloop
+)
+_VDI_SIGNATURE = b'\x7f\x10\xda\xbe'
+_VDI_SIGNATURE_OFFSET = 0x40
+_PROBE_SIZE = 512
+
+_IMAGE_INFO_CACHE = {}
+_IMAGE_INFO_CACHE_SIZE = 1024
+
+
+def _probe_other_format(path, header):
+    """Whether qemu-img could find a format other than raw in a file."""
+    vdi_signature = header[_VDI_SIGNATURE_OFFSET:
+                           _VDI_SIGNATURE_OFFSET + len(_VDI_SIGNATURE)]
+    # NOTE: qcow version 1 shares the qcow2 magic, qemu-img also takes text
+    # files with a createType line for vmdk descriptors and files named
+    # *.dmg for dmg images, whose header is at the end of the file.
+    return (header.startswith(b'QFI') or
+            header.startswith(_OTHER_FORMAT_MAGICS) or
+            vdi_signature == _VDI_SIGNATURE or
+            b'createType=' in header or
+            path.endswith('.dmg'))
+
+
+def _read_native_image_info(path, st):
+    """Read the details of a qcow2 or raw image from the file itself.
+
+    Returns an object with the attributes of the one of qemu_img_info, or
+    None when the image is in a format left to qemu-img, including qcow2
+    images using encryption, internal snapshots or an external data file.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_PROBE_SIZE)
+        if header.startswith(QCOW2_MAGIC):
+            if len(header) < _QCOW2_HEADER.size:
+                return None
+            (_magic, version, backing_file_offset, backing_file_size,
+             cluster_bits, size, crypt_method, _l1_size, _l1_table_offset,
+             _refcount_table_offset, _refcount_table_clusters,
+             nb_snapshots) = _QCOW2_HEADER.unpack_from(header)
+            if version not in (2, 3) or crypt_method or nb_snapshots:
+                return None
+            if version == 3:
+                offset = _QCOW2_HEADER.size + 8
+                if len(header) < offset + _QCOW2_INCOMPATIBLE_FEATURES.size:
+                    return None
+                features = _QCOW2_INCOMPATIBLE_FEATURES.unpack_from(
+                    header, offset)[0]
+                if features & ~_QCOW2_INCOMPATIBLE_DIRTY:
+                    return None
+            backing_file = None
+            if backing_file_offset:
+                f.seek(backing_file_offset)
+                backing_file = encodeutils.safe_decode(
+                    f.read(backing_file_size))
+                # NOTE: qemu-img reports the backing file path relative to
+                # the directory of the image, like the 'actual path' parsed
+                # from its output.
+                if not os.path.isabs(backing_file):
+                    backing_file = os.path.join(os.path.dirname(path),
+                                                backing_file)
+            file_format = 'qcow2'
+            cluster_size = 1 << cluster_bits
+        else:
+            if _probe_other_format(path, header):
+                return None
+            file_format = 'raw'
+            size = st.st_size
+            cluster_size = None
+            backing_file = None
+
+    info = imageutils.QemuImgInfo()
+    info.image = path
+    info.file_format = file_format
+    info.virtual_size = size
+    info.cluster_size = cluster_size
+    info.disk_size = st.st_blocks * 512
+    info.backing_file = backing_file
+    return info
+
+
+def image_info(path):
+    """Return the details of a disk image, as qemu_img_info does.
+
+    With native_image_info set, qcow2 and raw images are read directly and
+    the result of every lookup is cached until the inode, size or times of
+    the file change, qemu-img info being run only for the other formats.
+    Block devices and other files which are not regular files are always
+    inspected with qemu-img info, their size is not the one of the file.
+    """
+    if not CONF.native_image_info:
+        return qemu_img_info(path)
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return qemu_img_info(path)
+    if not stat.S_ISREG(st.st_mode):
+        return qemu_img_info(path)
+
+    key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime, st.st_ctime)
+    cached = _IMAGE_INFO_CACHE.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    try:
+        info = _read_native_image_info(path, st)
+    except (IOError, struct.error):
+        info = None
+    if info is None:
+        info = qemu_img_info(path)
+
+    if len(_IMAGE_INFO_CACHE) >= _IMAGE_INFO_CACHE_SIZE:
+        _IMAGE_INFO_CACHE.clear()
+    _IMAGE_INFO_CACHE[path] = (key, info)
+    return info
+
+
 def convert_image(source, dest, out_format, run_as_root=False):
     """Convert image to other format."""
     cmd = ('qemu-img', 'convert', '-O', out_format, source, dest)
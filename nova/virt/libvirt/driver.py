@@ -622,6 +622,11 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return uuids
 
+    def get_power_states(self):
+        states = self._host.list_instance_domain_states()
+        return {uuid: LIBVIRT_POWER_STATE[state]
+                for uuid, state in six.iteritems(states)}
+
     def plug_vifs(self, instance, network_info):
         """Plug VIFs into networks."""
         for vif in network_info:
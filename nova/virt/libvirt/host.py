@@ -207,6 +207,7 @@ class Host(object):
         self._conn_event_handler = conn_event_handler
         self._lifecycle_event_handler = lifecycle_event_handler
         self._skip_list_all_domains = False
+        self._skip_all_domain_stats = False
         self._caps = None
         self._hostname = None
 
@@ -731,6 +732,41 @@ class Host(object):
 
         return doms
 
+    def list_instance_domain_states(self):
+        """Get the states of all the libvirt domains of nova instances
+
+        Query libvirt for the states of the active and inactive domains,
+        with a single getAllDomainStats() call when libvirt supports it,
+        otherwise with one call per domain. Any "host" domain (aka Xen
+        Domain-0) is filtered out.
+
+        :returns: dict of domain UUIDs to libvirt VIR_DOMAIN_* states
+        """
+        if not self._skip_all_domain_stats:
+            try:
+                stats = self.get_connection().getAllDomainStats(
+                    libvirt.VIR_DOMAIN_STATS_STATE)
+            except (libvirt.libvirtError, AttributeError) as ex:
+                LOG.info(_LI("Unable to use bulk domain stats APIs, "
+                             "falling back to slow code path: %(ex)s"),
+                         {'ex': ex})
+                self._skip_all_domain_stats = True
+            else:
+                return {dom.UUIDString(): record['state.state']
+                        for dom, record in stats if dom.ID() != 0}
+
+        states = {}
+        for dom in self.list_instance_domains(only_running=False):
+            try:
+                dom_info = self.get_domain_info(dom)
+            except libvirt.libvirtError as ex:
+                # The domain may have been undefined since it was listed
+                if ex.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
+                    continue
+                raise
+            states[dom.UUIDString()] = dom_info[0]
+        return states
+
     def get_online_cpus(self):
         """Get the set of CPUs that are online on the host
 
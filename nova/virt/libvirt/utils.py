@@ -166,7 +166,7 @@ def get_disk_size(path):
     :returns: Size (in bytes) of the given disk image as it would be seen
               by a virtual machine.
     """
-    size = images.qemu_img_info(path).virtual_size
+    size = images.image_info(path).virtual_size
     return int(size)
 
 
@@ -176,7 +176,7 @@ def get_disk_backing_file(path, basename=True):
     :param path: Path to the disk image
     :returns: a path to the image's backing store
     """
-    backing_file = images.qemu_img_info(path).backing_file
+    backing_file = images.image_info(path).backing_file
     if backing_file and basename:
         backing_file = os.path.basename(backing_file)
 
@@ -296,6 +296,10 @@ class VMwareVCDriver(driver.ComputeDriver):
         """List VM instance UUIDs."""
         return self._vmops.list_instances()
 
+    def get_power_states(self):
+        """Return the power states of the VM instances, keyed by UUID."""
+        return self._vmops.get_power_states()
+
     def list_instances(self):
         """List VM instances from all nodes."""
         instances = []
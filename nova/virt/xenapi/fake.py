@@ -124,7 +124,7 @@ def create_vm(name_label, status, **kwargs):
         resident_on = _db_content['host'].keys()[0]
     else:
         domid = -1
-        resident_on = ''
+        resident_on = 'OpaqueRef:NULL'
 
     vm_rec = kwargs.copy()
     vm_rec.update({'name_label': name_label,
@@ -253,7 +253,7 @@ def after_VM_create(vm_ref, vm_rec):
     vm_rec.setdefault('VCPUs_max', str(4))
     vm_rec.setdefault('VBDs', [])
     vm_rec.setdefault('VIFs', [])
-    vm_rec.setdefault('resident_on', '')
+    vm_rec.setdefault('resident_on', 'OpaqueRef:NULL')
 
 
 def create_pbd(host_ref, sr_ref, attached):
@@ -1718,6 +1718,34 @@ class VMOps(object):
         vm_ref = vm_ref or self._get_vm_opaque_ref(instance)
         return vm_utils.compile_info(self._session, vm_ref)
 
+    def get_power_states(self):
+        """Return the power states of the VMs found on the hypervisor, keyed
+        by nova instance uuid.
+
+        Halted and suspended VMs are not resident on any host, so they are
+        listed as well as the VMs running on this host. In a pool, this
+        includes the stopped VMs of the other hosts, which the power state
+        sync does not look up.
+        """
+        vms = self._session.call_xenapi(
+            "VM.get_all_records_where",
+            'field "is_control_domain"="false" and '
+            'field "is_a_template"="false"')
+        power_states = {}
+        for vm_ref, vm_rec in six.iteritems(vms):
+            if vm_rec['resident_on'] not in (self._session.host_ref,
+                                             'OpaqueRef:NULL'):
+                continue
+            nova_uuid = vm_rec['other_config'].get('nova_uuid')
+            # Skip the original VM of a resize and the rescue VM, which
+            # share the nova_uuid of the instance VM.
+            if (not nova_uuid or
+                    vm_rec['name_label'].endswith(('-orig', '-rescue'))):
+                continue
+            power_states[nova_uuid] = vm_utils.XENAPI_POWER_STATE[
+                vm_rec['power_state']]
+        return power_states
+
     def get_diagnostics(self, instance):
         """Return data about VM diagnostics."""
         vm_ref = self._get_vm_opaque_ref(instance)
@@ -18,6 +18,8 @@ Pluggable Weighing support
 """
 
 import abc
+import heapq
+import time
 
 import six
 
@@ -121,14 +123,27 @@ class BaseWeigher(object):
 class BaseWeightHandler(loadables.BaseLoader):
     object_class = WeighedObject
 
-    def get_weighed_objects(self, weighers, obj_list, weighing_properties):
-        """Return a sorted (descending), normalized list of WeighedObjects."""
+    def _record_weigher(self, weigher, elapsed, num_objs):
+        """Called with the duration and the number of objects weighed by
+        each weigher run.  Override in a subclass to collect weigher
+        statistics.
+        """
+        pass
+
+    def get_weighed_objects(self, weighers, obj_list, weighing_properties,
+                            limit=None):
+        """Return a sorted (descending), normalized list of WeighedObjects.
+
+        If limit is set, only the limit best WeighedObjects are returned,
+        which avoids sorting the whole list.
+        """
         weighed_objs = [self.object_class(obj, 0.0) for obj in obj_list]
 
         if len(weighed_objs) <= 1:
             return weighed_objs
 
         for weigher in weighers:
+            start = time.time()
             weights = weigher.weigh_objects(weighed_objs, weighing_properties)
 
             # Normalize the weights
@@ -139,5 +154,35 @@ class BaseWeightHandler(loadables.BaseLoader):
             for i, weight in enumerate(weights):
                 obj = weighed_objs[i]
                 obj.weight += weigher.weight_multiplier() * weight
+            self._record_weigher(weigher, time.time() - start,
+                                 len(weighed_objs))
 
+        if limit is not None:
+            return heapq.nlargest(limit, weighed_objs, key=lambda x: x.weight)
         return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)
+
+    @staticmethod
+    def get_weight_bounds(weighers):
+        """Return the (minval, maxval) recorded by each of the weighers."""
+        return [(weigher.minval, weigher.maxval) for weigher in weighers]
+
+    def get_weighed_object(self, weighers, obj, weighing_properties,
+                           bounds):
+        """Return a WeighedObject for a single object.
+
+        The weights are normalized with bounds, the get_weight_bounds() of
+        the weighers taken right after a call to get_weighed_objects(), so
+        that the result can be compared with the WeighedObjects it returned.
+        """
+        weighed_obj = self.object_class(obj, 0.0)
+        for weigher, (minval, maxval) in zip(weighers, bounds):
+            weights = weigher.weigh_objects([weighed_obj],
+                                            weighing_properties)
+            # NOTE: weigh_objects() extended the bounds of the weigher with
+            # this single weight, restore the ones of the full pass.
+            weigher.minval = minval
+            weigher.maxval = maxval
+            weights = normalize(weights, minval=minval, maxval=maxval)
+            for weight in weights:
+                weighed_obj.weight += weigher.weight_multiplier() * weight
+        return weighed_obj
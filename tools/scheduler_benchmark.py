@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# Copyright (c) 2015 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Offline benchmark of the scheduler.
+
+This script builds synthetic clouds of compute nodes, with aggregates, NUMA
+topologies, PCI device pools and instances, stubs out every database access
+of the scheduler and replays a stream of requests through the
+select_destinations() method of the scheduler driver. For each cloud size it
+reports the number of requests per second, the p50/p99 latencies, the memory
+used and the time spent in each filter and weigher.
+
+Examples:
+
+    tools/with_venv.sh python tools/scheduler_benchmark.py --hosts 1000 10000
+
+    tools/with_venv.sh python tools/scheduler_benchmark.py --hosts 50000 \\
+        --requests-file requests.json --filters RamFilter,ComputeFilter
+
+A requests file holds one JSON object per line, with "request_spec" and
+"filter_properties" keys, as received by the scheduler manager.
+"""
+
+from __future__ import print_function
+
+import argparse
+import copy
+import json
+import random
+import resource
+import sys
+import time
+import uuid
+
+import mock
+from oslo_config import cfg
+from oslo_utils import importutils
+from six.moves import range
+
+from nova.compute import arch
+from nova.compute import hv_type
+from nova.compute import vm_mode
+from nova.compute import vm_states
+from nova import context
+from nova import exception
+from nova import objects
+from nova.scheduler import host_manager
+from nova.scheduler import stats
+from nova import servicegroup
+
+CONF = cfg.CONF
+
+FLAVORS = [
+    {'id': 1, 'name': 'm1.small', 'memory_mb': 2048, 'vcpus': 1,
+     'root_gb': 20, 'ephemeral_gb': 0, 'swap': 0, 'extra_specs': {}},
+    {'id': 2, 'name': 'm1.medium', 'memory_mb': 4096, 'vcpus': 2,
+     'root_gb': 40, 'ephemeral_gb': 0, 'swap': 0, 'extra_specs': {}},
+    {'id': 3, 'name': 'm1.large', 'memory_mb': 8192, 'vcpus': 4,
+     'root_gb': 80, 'ephemeral_gb': 0, 'swap': 0, 'extra_specs': {}},
+    {'id': 4, 'name': 'ssd.large', 'memory_mb': 8192, 'vcpus': 4,
+     'root_gb': 80, 'ephemeral_gb': 0, 'swap': 0,
+     'extra_specs': {'aggregate_instance_extra_specs:ssd': 'true'}},
+]
+
+IMAGES = [
+    {'properties': {}},
+    {'properties': {'architecture': arch.X86_64,
+                    'hypervisor_type': hv_type.KVM,
+                    'vm_mode': vm_mode.HVM}},
+]
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the scheduler against synthetic clouds.')
+    parser.add_argument('--hosts', type=int, nargs='+', default=[1000],
+                        help='Sizes of the clouds to benchmark.')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Number of synthetic requests to replay.')
+    parser.add_argument('--requests-file',
+                        help='File of requests to replay instead of the '
+                             'synthetic ones.')
+    parser.add_argument('--instances-per-host', type=int, default=5,
+                        help='Number of instances running on each host.')
+    parser.add_argument('--aggregates', type=int, default=20,
+                        help='Number of host aggregates.')
+    parser.add_argument('--zones', type=int, default=3,
+                        help='Number of availability zones.')
+    parser.add_argument('--numa-ratio', type=float, default=0.5,
+                        help='Ratio of hosts reporting a NUMA topology.')
+    parser.add_argument('--pci-ratio', type=float, default=0.1,
+                        help='Ratio of hosts having PCI devices.')
+    parser.add_argument('--max-instances', type=int, default=3,
+                        help='Maximum number of instances per request.')
+    parser.add_argument('--no-instance-tracking', action='store_true',
+                        help='Behave as if the computes did not send their '
+                             'instances to the scheduler, so that they are '
+                             'loaded for each host and request.')
+    parser.add_argument('--driver',
+                        default='nova.scheduler.filter_scheduler.'
+                                'FilterScheduler',
+                        help='Scheduler driver class.')
+    parser.add_argument('--filters',
+                        help='Comma separated list of filters, defaults to '
+                             'scheduler_default_filters.')
+    parser.add_argument('--config-file', action='append', default=[],
+                        help='Nova configuration file to load.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the random generator.')
+    return parser.parse_args(argv)
+
+
+class SyntheticCloud(object):
+    """Compute nodes, services, aggregates and instances of a fake cloud."""
+
+    def __init__(self, num_hosts, args, rand):
+        self.services = []
+        self.compute_nodes = []
+        self.instances = {}
+        self.aggregates = []
+
+        hosts = ['compute%05d' % i for i in range(num_hosts)]
+        for i, host in enumerate(hosts):
+            self.services.append(objects.Service(
+                id=i, host=host, binary='nova-compute', topic='compute',
+                disabled=rand.random() < 0.01))
+            self.compute_nodes.append(self._make_compute_node(i, host, args,
+                                                              rand))
+            self.instances[host] = objects.InstanceList(objects=[
+                objects.Instance(uuid=str(uuid.uuid4()), host=host,
+                                 instance_type_id=rand.choice(FLAVORS)['id'],
+                                 vm_state=vm_states.ACTIVE, task_state=None)
+                for _ in range(args.instances_per_host)])
+
+        for i in range(args.aggregates):
+            metadata = {}
+            if i < args.zones:
+                metadata['availability_zone'] = 'az%d' % i
+            elif i % 2:
+                metadata['ssd'] = 'true'
+            else:
+                metadata['filter_tenant_id'] = 'tenant%d' % i
+            self.aggregates.append(objects.Aggregate(
+                id=i, name='agg%d' % i, metadata=metadata,
+                hosts=rand.sample(hosts, max(1, num_hosts // 10))))
+
+    @staticmethod
+    def _make_compute_node(index, host, args, rand):
+        vcpus = rand.choice([16, 32, 64])
+        memory_mb = vcpus * 4096
+        local_gb = rand.choice([500, 1000, 2000])
+        vcpus_used = rand.randint(0, vcpus)
+        memory_mb_used = rand.randint(0, memory_mb)
+        local_gb_used = rand.randint(0, local_gb)
+
+        numa_topology = None
+        if rand.random() < args.numa_ratio:
+            half = vcpus // 2
+            numa_topology = objects.NUMATopology(cells=[
+                objects.NUMACell(id=cell, cpuset=set(range(cell * half,
+                                                           (cell + 1) * half)),
+                                 memory=memory_mb // 2, cpu_usage=0,
+                                 memory_usage=0, mempages=[], siblings=[],
+                                 pinned_cpus=set())
+                for cell in range(2)])._to_json()
+
+        pools = []
+        if rand.random() < args.pci_ratio:
+            pools.append(objects.PciDevicePool(
+                product_id='1520', vendor_id='8086', numa_node=0,
+                tags={'physical_network': 'physnet1'}, count=8))
+
+        return objects.ComputeNode(
+            id=index, service_id=index, host=host,
+            hypervisor_hostname=host, host_ip='10.0.%d.%d' % (
+                index // 250 % 250, index % 250 + 1),
+            vcpus=vcpus, vcpus_used=vcpus_used,
+            memory_mb=memory_mb, memory_mb_used=memory_mb_used,
+            free_ram_mb=memory_mb - memory_mb_used,
+            local_gb=local_gb, local_gb_used=local_gb_used,
+            free_disk_gb=local_gb - local_gb_used,
+            disk_available_least=local_gb - local_gb_used,
+            hypervisor_type='QEMU', hypervisor_version=2003000,
+            supported_hv_specs=[objects.HVSpec(arch=arch.X86_64,
+                                               hv_type=hv_type.KVM,
+                                               vm_mode=vm_mode.HVM)],
+            numa_topology=numa_topology,
+            pci_device_pools=objects.PciDevicePoolList(objects=pools),
+            cpu_info='{}', metrics='[]', updated_at=None,
+            stats={'num_instances': str(args.instances_per_host),
+                   'io_workload': str(rand.randint(0, 4))},
+            running_vms=args.instances_per_host, current_workload=0)
+
+    def stub_out_db(self):
+        """Return the patchers replacing the database accesses of the
+        scheduler by lookups in this cloud.
+        """
+        return [
+            mock.patch.object(objects.ServiceList, 'get_by_binary',
+                              return_value=self.services),
+            mock.patch.object(objects.ComputeNodeList, 'get_all',
+                              return_value=self.compute_nodes),
+            mock.patch.object(objects.AggregateList, 'get_all',
+                              return_value=self.aggregates),
+            mock.patch.object(objects.InstanceList, 'get_by_host',
+                              side_effect=lambda ctxt, host, **kwargs:
+                              self.instances[host]),
+            mock.patch.object(servicegroup.API, 'service_is_up',
+                              return_value=True),
+            mock.patch.object(host_manager.HostManager,
+                              '_init_instance_info'),
+            mock.patch('nova.rpc.get_notifier'),
+        ]
+
+
+def synthetic_requests(num_requests, args, rand):
+    for _ in range(num_requests):
+        flavor = rand.choice(FLAVORS)
+        num_instances = rand.randint(1, args.max_instances)
+        zone = None
+        if args.zones and rand.random() < 0.5:
+            zone = 'az%d' % rand.randrange(args.zones)
+        instance_properties = {
+            'project_id': 'tenant%d' % rand.randrange(args.aggregates or 1),
+            'memory_mb': flavor['memory_mb'], 'vcpus': flavor['vcpus'],
+            'root_gb': flavor['root_gb'],
+            'ephemeral_gb': flavor['ephemeral_gb'],
+            'availability_zone': zone, 'os_type': 'linux',
+            'numa_topology': None, 'pci_requests': None,
+            'uuid': str(uuid.uuid4())}
+        request_spec = {
+            'instance_properties': instance_properties,
+            'instance_type': flavor,
+            'image': rand.choice(IMAGES),
+            'num_instances': num_instances,
+            'instance_uuids': [str(uuid.uuid4())
+                               for _ in range(num_instances)]}
+        yield request_spec, {'scheduler_hints': {}}
+
+
+def recorded_requests(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                request = json.loads(line)
+                yield request['request_spec'], request['filter_properties']
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_benchmark(num_hosts, args):
+    rand = random.Random(args.seed)
+    rss_start = _max_rss_mb()
+    cloud = SyntheticCloud(num_hosts, args, rand)
+    if args.requests_file:
+        requests = list(recorded_requests(args.requests_file))
+    else:
+        requests = list(synthetic_requests(args.requests, args, rand))
+
+    patchers = cloud.stub_out_db()
+    for patcher in patchers:
+        patcher.start()
+    try:
+        driver = importutils.import_object(args.driver)
+        if not args.no_instance_tracking:
+            driver.host_manager._instance_info = {
+                host: {'instances': {inst.uuid: inst for inst in instances},
+                       'updated': True}
+                for host, instances in cloud.instances.items()}
+        ctxt = context.get_admin_context()
+        stats.STATS.reset()
+
+        latencies = []
+        failures = 0
+        start = time.time()
+        for request_spec, filter_properties in requests:
+            request_spec = copy.deepcopy(request_spec)
+            filter_properties = copy.deepcopy(filter_properties)
+            request_start = time.time()
+            try:
+                driver.select_destinations(ctxt, request_spec,
+                                           filter_properties)
+            except exception.NoValidHost:
+                failures += 1
+            latencies.append(time.time() - request_start)
+        elapsed = time.time() - start
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+    latencies.sort()
+    print('%d hosts, %d requests (%d failed): %.1f requests/s, '
+          'p50 %.1f ms, p99 %.1f ms, max RSS growth %.1f MB'
+          % (num_hosts, len(requests), failures,
+             len(requests) / elapsed if elapsed else 0.0,
+             _percentile(latencies, 50) * 1000,
+             _percentile(latencies, 99) * 1000,
+             _max_rss_mb() - rss_start))
+
+    results = stats.STATS.to_dict()
+    for name in sorted(results, key=lambda n: -results[n]['total']):
+        result = results[name]
+        print('    %-48s %8d calls %10.1f ms total %8.3f ms avg'
+              % (name, result['count'], result['total'] * 1000,
+                 result['total'] * 1000 / result['count']))
+
+
+def main(argv):
+    args = _parse_args(argv)
+    CONF([], project='nova', default_config_files=args.config_file)
+    objects.register_all()
+    if args.filters:
+        CONF.set_override('scheduler_default_filters',
+                          args.filters.split(','))
+    for num_hosts in args.hosts:
+        run_benchmark(num_hosts, args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))